@@ -0,0 +1,281 @@
+"""
+Micro-Batching Tagging Server
+An asyncio HTTP service that merges concurrent /tag requests into one Viterbi batch
+
+Usage:
+    python batching_service.py --model model_dir --port 8000 --max-wait-ms 5 --max-batch 512
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from tagging_service import MAX_REQUEST_BYTES, _add_model_arguments, _model_from_arguments, tag_sentences
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+
+
+class MicroBatcher:
+    """
+    Collects sentences from concurrent callers and decodes them together
+
+    The dispatcher waits for the first request, then keeps collecting until
+    max_wait_ms have passed or max_batch sentences are queued, decodes the
+    whole group as one padded batch and resolves every caller's future with
+    its own slice of the results. Decoding runs on a worker thread, so the
+    event loop keeps accepting and queueing the next batch meanwhile.
+    """
+
+    def __init__(self, model, max_batch=256, max_wait_ms=5.0, keep_punctuation=True):
+        """
+        Parameters:
+        -----------
+        model : HMMModel
+            Model with its decoder tables built (see tagging_service.load_model)
+        max_batch : int
+            Sentences that trigger a batch immediately
+        max_wait_ms : float
+            Longest time the first request of a batch waits for company
+        keep_punctuation : bool
+            Tag punctuation marks as tokens, or drop them
+        """
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.keep_punctuation = keep_punctuation
+
+        self.queue = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._dispatcher = None
+
+        # Running totals, handy for checking how well requests are being merged
+        self.batches = 0
+        self.sentences = 0
+
+    def start(self):
+        """Start the dispatcher task on the running event loop"""
+        self.queue = asyncio.Queue()
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def stop(self):
+        """Cancel the dispatcher and release the decoding thread"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def tag(self, sentences):
+        """
+        Queue sentences for the next batch and wait for their results
+
+        Parameters:
+        -----------
+        sentences : list
+            Raw sentence strings
+
+        Returns:
+        --------
+        list
+            One result per sentence (see tagging_service.tag_sentences)
+        """
+        if not sentences:
+            return []
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((sentences, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or the wait is over"""
+        pending = [await self.queue.get()]
+        queued = len(pending[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while queued < self.max_batch:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            pending.append(request)
+            queued += len(request[0])
+
+        return pending
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            pending = await self._collect()
+            batch = [sentence for sentences, _ in pending for sentence in sentences]
+
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, tag_sentences, self.model, batch, self.keep_punctuation
+                )
+            except Exception as error:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.sentences += len(batch)
+
+            # Hand every caller back its own slice, in the order it was queued
+            start = 0
+            for sentences, future in pending:
+                if not future.done():
+                    future.set_result(results[start:start + len(sentences)])
+                start += len(sentences)
+
+
+# ===== HTTP =====
+
+async def _read_request(reader):
+    """Read one HTTP/1.1 request; returns None when the client closes the connection"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    return method, path, headers
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_STATUS_TEXT[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _handle_request(batcher, method, path, body):
+    """Route one request, returning (status, payload)"""
+    if method == "GET" and path == "/health":
+        return 200, {
+            "status": "ok",
+            "tags": list(batcher.model.tags),
+            "vocabulary_size": len(batcher.model.vocabulary),
+            "batches": batcher.batches,
+            "sentences": batcher.sentences
+        }
+
+    if method != "POST" or path != "/tag":
+        return 404, {"error": f"Unknown path {path}"}
+
+    try:
+        request = json.loads(body)
+        sentences = request["sentences"]
+        if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+            raise TypeError("'sentences' must be a list of strings")
+    except (ValueError, KeyError, TypeError) as error:
+        return 400, {"error": f"Expected {{\"sentences\": [\"...\", ...]}}: {error}"}
+
+    return 200, {"results": await batcher.tag(sentences)}
+
+
+async def serve(model, host="127.0.0.1", port=8000, max_batch=256, max_wait_ms=5.0, keep_punctuation=True,
+                ready=None):
+    """
+    Run the micro-batching HTTP service until cancelled
+    Same API as tagging_service: GET /health and POST /tag with {"sentences": [...]}
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Model with its decoder tables built
+    host : str
+        Interface to listen on
+    port : int
+        Port to listen on (0 picks a free one)
+    max_batch : int
+        Sentences that trigger a batch immediately
+    max_wait_ms : float
+        Longest time a request waits for others to join its batch
+    keep_punctuation : bool
+        Tag punctuation marks as tokens, or drop them
+    ready : asyncio.Future, optional
+        Resolved with the bound (host, port) once the server is listening
+    """
+    batcher = MicroBatcher(model, max_batch, max_wait_ms, keep_punctuation)
+    batcher.start()
+
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+
+                method, path, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_REQUEST_BYTES:
+                    # The body is never read, so the connection cannot be reused
+                    status, payload = 413, {"error": f"Request body over {MAX_REQUEST_BYTES} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, payload = await _handle_request(batcher, method, path, body)
+
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle_connection, host, port)
+    if ready is not None:
+        ready.set_result(server.sockets[0].getsockname()[:2])
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Micro-batching HMM POS tagging service")
+    _add_model_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--max-batch", type=int, default=256, help="Sentences that trigger a batch immediately")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest wait for a batch to fill")
+    arguments = parser.parse_args(argv)
+
+    model = _model_from_arguments(arguments)
+    print(f"Serving POST /tag on http://{arguments.host}:{arguments.port} "
+          f"(batches of up to {arguments.max_batch} sentences or {arguments.max_wait_ms} ms)", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(model, arguments.host, arguments.port, arguments.max_batch,
+                          arguments.max_wait_ms, not arguments.drop_punctuation))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Baum-Welch Training
+Refines an HMM on untagged text with EM, the expected counts of each iteration
+are computed chunk by chunk in one process pool and summed as they arrive
+"""
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from mathematical_calculation import encode_sentences, expected_counts_batch, smooth_emission_counts
+from hmm_model import HMMModel
+from instrumentation import timer
+from word2vec_corpus import read_text_sentences
+
+# Table entries the E-step reads, the only ones sent to the workers with each chunk
+_E_STEP_TABLES = ("log_emission", "log_start", "log_transition", "log_end")
+
+
+def _chunk_expected_counts(task):
+    """Worker: E-step of one (token_ids, lengths, tables) chunk"""
+    token_ids, lengths, viterbi_tables = task
+    return expected_counts_batch(token_ids, lengths, viterbi_tables)
+
+
+def _sum_expected_counts(partial_counts):
+    """
+    Add up the expected counts of every chunk as they arrive
+    Only the running total and the chunk being added are held at a time
+    """
+    total = None
+    for counts in partial_counts:
+        if total is None:
+            total = dict(counts)
+        else:
+            for name in ("emission", "start", "transition", "end", "log_likelihood", "sentences"):
+                total[name] += counts[name]
+    return total
+
+
+def _log_tables(model, emission, transition):
+    """Decoder tables (build_viterbi_tables format) from probability matrices"""
+    with np.errstate(divide='ignore'):
+        return {
+            "tags": model.tags,
+            "word_to_id": model.word_to_id,
+            "log_emission": np.log(emission),
+            "log_start": np.log(transition[model.start_id, :model.end_id]),
+            "log_transition": np.log(transition[:model.start_id, :model.end_id]),
+            "log_end": np.log(transition[:model.start_id, model.end_id])
+        }
+
+
+def _normalize_rows(counts):
+    """Divide every row by its total (rows without counts stay 0)"""
+    totals = counts.sum(axis=1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+
+def initial_tables(model, k=1.0):
+    """
+    Starting parameters for EM: add-k smoothed emissions and transitions of a model
+    Smoothing keeps every (word, tag) and (tag, tag) pair possible, otherwise EM
+    could never move probability onto them
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Model whose vocabulary already holds every word of the untagged corpus
+    k : float
+        Pseudo-count added to every emission and transition count
+
+    Returns:
+    --------
+    dict
+        Decoder tables in the build_viterbi_tables format
+    """
+    emission, _ = smooth_emission_counts(model.emission_counts, method="add_k", k=k)
+    transition = _normalize_rows(model.transition_counts + float(k))
+    return _log_tables(model, emission, transition)
+
+
+def _chunk_corpus(sentences, word_to_id, chunk_size):
+    """
+    Encode the corpus once as padded id matrices
+    Sentences are sorted by length first, so each chunk is padded to almost nothing.
+    Every chunk stays in memory for all iterations, about 8 bytes per token.
+    """
+    sentences = sorted((words for words in sentences if words), key=len)
+    return [
+        encode_sentences(sentences[i:i + chunk_size], word_to_id)
+        for i in range(0, len(sentences), chunk_size)
+    ]
+
+
+def _expected_counts(chunks, viterbi_tables, pool=None):
+    """E-step over every chunk, in the process pool when one is given"""
+    tables = {name: viterbi_tables[name] for name in _E_STEP_TABLES}
+    tasks = ((token_ids, lengths, tables) for token_ids, lengths in chunks)
+
+    if pool is None:
+        return _sum_expected_counts(map(_chunk_expected_counts, tasks))
+    return _sum_expected_counts(pool.imap_unordered(_chunk_expected_counts, tasks))
+
+
+def baum_welch(model, sentences, iterations=5, processes=None, chunk_size=1000,
+               supervised_weight=1.0, k=1.0, tolerance=1e-4):
+    """
+    Re-estimate emission and transition probabilities on untagged sentences with EM
+
+    Each iteration runs the E-step (expected_counts_batch) on chunks of
+    length-sorted sentences in parallel and adds the chunk totals up; the
+    M-step is one vectorized normalization of the summed counts. One worker
+    pool serves every iteration.
+
+    The whole corpus is read into memory once to build the vocabulary and the
+    length-sorted chunks; after that only the encoded chunks are kept.
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Model trained on tagged sentences, used as the starting point (not modified)
+    sentences : iterable
+        Untagged sentences, each a list of words (lowercased here)
+    iterations : int
+        Maximum number of EM iterations
+    processes : int, optional
+        Number of worker processes (default: number of CPUs)
+    chunk_size : int
+        Sentences per E-step chunk
+    supervised_weight : float
+        Weight of the model's own tagged counts added to the expected counts on
+        every M-step, 0 for purely unsupervised re-estimation
+    k : float
+        Pseudo-count for the starting parameters, see initial_tables
+    tolerance : float
+        Stop when the log likelihood improves by less than this fraction
+
+    Returns:
+    --------
+    tuple
+        (refined model, log likelihood of the corpus before each M-step)
+        The refined model holds the final expected counts (as floats) in place of
+        the tagged counts, so probabilities, decoding, save and load work as usual
+    """
+    refined = HMMModel(model.tags, model.tag_index["tag_to_short"]).merge(model)
+    refined.smoothing = model.smoothing
+
+    sentences = [[word.lower() for word in words] for words in sentences]
+    for words in sentences:
+        for word in words:
+            refined.add_word(word)
+
+    supervised_emission = supervised_weight * refined.emission_counts.astype(float)
+    supervised_transition = supervised_weight * refined.transition_counts.astype(float)
+
+    chunks = _chunk_corpus(sentences, refined.word_to_id, chunk_size)
+    del sentences
+    n_sentences = sum(len(lengths) for _, lengths in chunks)
+    processes = processes or os.cpu_count() or 1
+
+    viterbi_tables = initial_tables(refined, k)
+    history = []
+
+    pool = Pool(processes) if processes > 1 and len(chunks) > 1 else None
+    try:
+        for _ in range(iterations):
+            with timer("baum_welch.iteration", items=n_sentences):
+                counts = _expected_counts(chunks, viterbi_tables, pool)
+
+                # M-step: expected counts (plus the anchoring tagged counts) -> probabilities
+                emission_counts = supervised_emission + counts["emission"]
+                transition_counts = supervised_transition.copy()
+                transition_counts[:refined.start_id, :refined.end_id] += counts["transition"]
+                transition_counts[refined.start_id, :refined.end_id] += counts["start"]
+                transition_counts[:refined.start_id, refined.end_id] += counts["end"]
+
+                tag_totals = emission_counts.sum(axis=0)
+                emission = np.divide(emission_counts, tag_totals, out=np.zeros(emission_counts.shape),
+                                     where=tag_totals > 0)
+                viterbi_tables = _log_tables(refined, emission, _normalize_rows(transition_counts))
+
+            history.append(counts["log_likelihood"])
+            if len(history) > 1 and history[-1] - history[-2] < tolerance * abs(history[-2]):
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if history:
+        refined._emission_buffer = emission_counts
+        refined.tag_totals = tag_totals
+        refined.transition_counts = transition_counts
+        refined._probability_cache.clear()
+
+    return refined, history
+
+
+def baum_welch_from_text(model, path, **kwargs):
+    """
+    Refine a model on a plain-text corpus, one sentence per line
+    The file is read fully into memory once (EM needs every sentence on every
+    iteration), then kept as encoded chunks of about 8 bytes per token
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Starting model (not modified)
+    path : str
+        Text file path (.gz files are decompressed on the fly)
+    **kwargs
+        Passed on to baum_welch (iterations, processes, chunk_size, ...)
+
+    Returns:
+    --------
+    tuple
+        (refined model, log likelihood history), see baum_welch
+    """
+    return baum_welch(model, read_text_sentences(path), **kwargs)
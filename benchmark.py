@@ -0,0 +1,372 @@
+"""
+Benchmarks for the HMM Statistics Functions
+Times update_pos_count, calculate_emission_probability, calculate_transition_count,
+calculate_transition_probability and the exact vs beam-pruned Viterbi decoders on
+synthetic corpora and writes the results to JSON
+
+Usage:
+    python benchmark.py --sizes 1000 10000 100000 --tagset penn --output bench.json
+    python benchmark.py --sizes 1000 10000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from instrumentation import set_enabled
+
+from mathematical_calculation import (
+    DEFAULT_TAGSET,
+    PENN_TREEBANK_TAGSET,
+    UNIVERSAL_TAGSET,
+    build_tag_index,
+    calculate_emission_probability,
+    calculate_transition_count,
+    calculate_transition_probability,
+    update_pos_count,
+    viterbi_decode,
+    viterbi_decode_beam
+)
+from hmm_model import HMMModel
+
+TAGSETS = {
+    "default": DEFAULT_TAGSET,
+    "penn": PENN_TREEBANK_TAGSET,
+    "universal": UNIVERSAL_TAGSET
+}
+
+# Bump whenever the layout of the results file changes
+RESULTS_FORMAT_VERSION = 1
+
+# Sentences decoded per corpus, and the beam used for the pruned decoder
+DECODE_SAMPLE = 1000
+DECODE_BEAM_WIDTH = 5
+
+
+# ===== SYNTHETIC CORPORA =====
+
+def generate_corpus(n_sentences, tags=DEFAULT_TAGSET, vocabulary_size=5000, mean_length=12, seed=0,
+                    tags_per_word=None):
+    """
+    Generate random tagged sentences in the all_tagged_sentences format
+
+    Words follow a Zipf distribution like natural text and tags follow a
+    random first-order Markov chain, so the tables have realistic shapes.
+    With tags_per_word, every word can only appear with a few tags (like real
+    words), which gives the sparse emission tables that pruned decoding relies on.
+
+    Parameters:
+    -----------
+    n_sentences : int
+        Number of sentences
+    tags : sequence
+        Tagset to draw tags from
+    vocabulary_size : int
+        Number of distinct words
+    mean_length : int
+        Average sentence length (Poisson distributed, at least 1)
+    seed : int
+        Random seed
+    tags_per_word : int, optional
+        Tags each word can appear with (default: any tag)
+
+    Returns:
+    --------
+    list
+        Tagged sentences
+        Format: [{"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}, ...]
+    """
+    rng = np.random.default_rng(seed)
+    tags = list(tags)
+    n_tags = len(tags)
+
+    word_weights = 1.0 / np.arange(1, vocabulary_size + 1)
+    word_weights /= word_weights.sum()
+    transition = rng.dirichlet(np.full(n_tags, 0.5), size=n_tags)
+    cumulative_transition = transition.cumsum(axis=1)
+
+    lengths = np.maximum(1, rng.poisson(mean_length, size=n_sentences))
+    word_ids = rng.choice(vocabulary_size, size=int(lengths.sum()), p=word_weights)
+    draws = rng.random(int(lengths.sum()))
+
+    if tags_per_word is not None:
+        tag_to_id = {tag: tag_id for tag_id, tag in enumerate(tags)}
+        word_tags = np.argsort(rng.random((vocabulary_size, n_tags)), axis=1)[:, :tags_per_word]
+        # Every tag keeps at least one word, even with a tiny vocabulary
+        tag_words = [np.flatnonzero((word_tags == tag_id).any(axis=1)) if (word_tags == tag_id).any()
+                     else np.array([tag_id % vocabulary_size]) for tag_id in range(n_tags)]
+        tag_cumulative = [word_weights[words].cumsum() / word_weights[words].sum() for words in tag_words]
+        word_draws = rng.random(int(lengths.sum()))
+
+    corpus = []
+    position = 0
+    for length in lengths:
+        tag_id = int(rng.integers(n_tags))
+        sentence_tags = {}
+        for word_idx in range(length):
+            sentence_tags[word_idx] = tags[tag_id]
+            tag_id = min(int(np.searchsorted(cumulative_transition[tag_id], draws[position + word_idx])), n_tags - 1)
+
+        if tags_per_word is not None:
+            # Redraw each word among the words its tag allows, keeping the Zipf shape
+            sentence_tag_ids = [tag_to_id[tag] for tag in sentence_tags.values()]
+            word_ids[position:position + length] = [
+                tag_words[tag_id][min(int(np.searchsorted(tag_cumulative[tag_id], draw)), len(tag_words[tag_id]) - 1)]
+                for tag_id, draw in zip(sentence_tag_ids, word_draws[position:position + length])
+            ]
+
+        corpus.append({
+            "words": [f"w{word_id}" for word_id in word_ids[position:position + length]],
+            "tags": sentence_tags
+        })
+        position += length
+
+    return corpus
+
+
+# ===== MEASUREMENT =====
+
+def measure(function, repeats=3):
+    """
+    Time a zero-argument function and record its peak memory
+
+    The best of repeats untraced runs gives the time; one extra run under
+    tracemalloc gives the peak Python memory (tracing slows code down, so
+    the two are kept apart).
+
+    Parameters:
+    -----------
+    function : callable
+        Code to measure
+    repeats : int
+        Timed runs
+
+    Returns:
+    --------
+    dict
+        Format: {"seconds": best time, "peak_memory_bytes": peak traced allocation}
+    """
+    # Time the algorithms, not the dashboard's metrics recording around them
+    instrumentation_was_enabled = set_enabled(False)
+    try:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        set_enabled(instrumentation_was_enabled)
+
+    return {"seconds": min(timings), "peak_memory_bytes": peak}
+
+
+def _count_all(corpus, tag_index):
+    pos_count = {}
+    for sentence in corpus:
+        update_pos_count(pos_count, sentence["words"], sentence["tags"], tag_index)
+    return pos_count
+
+
+def benchmark_corpus(corpus, tag_index, repeats=3):
+    """
+    Measure every statistics function on one corpus
+
+    Parameters:
+    -----------
+    corpus : list
+        Tagged sentences
+    tag_index : dict
+        Tag index from build_tag_index
+    repeats : int
+        Timed runs per function
+
+    Returns:
+    --------
+    dict
+        Function name to {"seconds", "peak_memory_bytes", "sentences_per_second", "tokens_per_second"}
+        The decoders run over the first DECODE_SAMPLE sentences, their rates are per decoded sentence
+    """
+    pos_count = _count_all(corpus, tag_index)
+    transition_count = calculate_transition_count(corpus, tag_index)
+
+    model = HMMModel(tag_index["tags"], tag_index["tag_to_short"])
+    model.add_sentences(corpus)
+    viterbi_tables = model.viterbi_tables()
+    tag_dictionary = model.tag_dictionary()
+    decoded = [sentence["words"] for sentence in corpus[:DECODE_SAMPLE]]
+
+    counted = (len(corpus), sum(len(sentence["words"]) for sentence in corpus))
+    decoded_counts = (len(decoded), sum(len(words) for words in decoded))
+
+    # name: (code, (sentences, tokens) it handles)
+    steps = {
+        "update_pos_count": (lambda: _count_all(corpus, tag_index), counted),
+        "calculate_emission_probability": (lambda: calculate_emission_probability(pos_count, tag_index), counted),
+        "calculate_transition_count": (lambda: calculate_transition_count(corpus, tag_index), counted),
+        "calculate_transition_probability": (lambda: calculate_transition_probability(transition_count), counted),
+        "viterbi_decode": (lambda: [viterbi_decode(words, viterbi_tables) for words in decoded], decoded_counts),
+        "viterbi_decode_beam": (
+            lambda: [viterbi_decode_beam(words, viterbi_tables, beam_width=DECODE_BEAM_WIDTH,
+                                         tag_dictionary=tag_dictionary) for words in decoded],
+            decoded_counts
+        )
+    }
+
+    results = {}
+    for name, (step, (n_sentences, n_tokens)) in steps.items():
+        result = measure(step, repeats)
+        seconds = max(result["seconds"], 1e-9)
+        result["sentences_per_second"] = n_sentences / seconds
+        result["tokens_per_second"] = n_tokens / seconds
+        results[name] = result
+
+    return results
+
+
+def _git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=(1000, 10000, 100000), tagset="default", vocabulary_size=5000, repeats=3, seed=0,
+                   tags_per_word=3):
+    """
+    Benchmark every statistics function across corpus sizes
+
+    Parameters:
+    -----------
+    sizes : sequence
+        Corpus sizes in sentences
+    tagset : str
+        Key of TAGSETS
+    vocabulary_size : int
+        Distinct words in the synthetic corpora
+    repeats : int
+        Timed runs per function
+    seed : int
+        Random seed for the corpora
+    tags_per_word : int or None
+        Tags each word can appear with, None for any tag (see generate_corpus)
+
+    Returns:
+    --------
+    dict
+        Results with run metadata
+        Format: {"format_version": 1, "commit": ..., "runs": [{"sentences": n, "tokens": n,
+                 "functions": {name: {...}, ...}}, ...], ...}
+    """
+    tags = TAGSETS[tagset]
+    tag_index = build_tag_index(tags)
+    runs = []
+
+    for size in sizes:
+        corpus = generate_corpus(size, tags, vocabulary_size, seed=seed, tags_per_word=tags_per_word)
+        runs.append({
+            "sentences": size,
+            "tokens": sum(len(sentence["words"]) for sentence in corpus),
+            "functions": benchmark_corpus(corpus, tag_index, repeats)
+        })
+
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "tagset": tagset,
+        "vocabulary_size": vocabulary_size,
+        "tags_per_word": tags_per_word,
+        "repeats": repeats,
+        "runs": runs
+    }
+
+
+def compare_results(baseline, current):
+    """
+    Speed ratio of current over baseline for every (corpus size, function) both runs share
+
+    Parameters:
+    -----------
+    baseline : dict
+        Earlier results from run_benchmarks
+    current : dict
+        New results from run_benchmarks
+
+    Returns:
+    --------
+    list
+        [(sentences, function name, baseline seconds, current seconds, speedup), ...]
+        speedup > 1 means current is faster
+    """
+    baseline_runs = {run["sentences"]: run["functions"] for run in baseline["runs"]}
+    rows = []
+
+    for run in current["runs"]:
+        old_functions = baseline_runs.get(run["sentences"], {})
+        for name, result in run["functions"].items():
+            if name in old_functions:
+                old_seconds = old_functions[name]["seconds"]
+                rows.append((run["sentences"], name, old_seconds, result["seconds"],
+                             old_seconds / max(result["seconds"], 1e-9)))
+
+    return rows
+
+
+def main(argv=None):
+    """Command line entry point, see the module docstring for examples"""
+    parser = argparse.ArgumentParser(description="Benchmark the HMM statistics functions")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Corpus sizes (sentences)")
+    parser.add_argument("--tagset", choices=sorted(TAGSETS), default="default", help="Tagset of the synthetic corpora")
+    parser.add_argument("--vocabulary-size", type=int, default=5000, help="Distinct words in the corpora")
+    parser.add_argument("--tags-per-word", type=int, default=3,
+                        help="Tags each word can appear with (0 for any tag)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per function (best is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results file to write")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    arguments = parser.parse_args(argv)
+
+    results = run_benchmarks(arguments.sizes, arguments.tagset, arguments.vocabulary_size,
+                             arguments.repeats, arguments.seed, arguments.tags_per_word or None)
+
+    with open(arguments.output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    print(f"{'sentences':>10}  {'function':<34}{'seconds':>10}{'sentences/s':>14}{'peak MiB':>10}")
+    for run in results["runs"]:
+        for name, result in run["functions"].items():
+            print(f"{run['sentences']:>10}  {name:<34}{result['seconds']:>10.4f}"
+                  f"{result['sentences_per_second']:>14,.0f}{result['peak_memory_bytes'] / 2 ** 20:>10.2f}")
+    print(f"Results written to {arguments.output}")
+
+    if arguments.compare:
+        with open(arguments.compare, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+        print(f"\nCompared with {arguments.compare} (commit {baseline.get('commit')}):")
+        corpus_settings = ("tagset", "vocabulary_size", "tags_per_word")
+        if any(baseline.get(setting) != results[setting] for setting in corpus_settings):
+            print("Warning: the baseline used a different tagset, vocabulary size or tags per word")
+        for sentences, name, old_seconds, new_seconds, speedup in compare_results(baseline, results):
+            print(f"{sentences:>10}  {name:<34}{old_seconds:>10.4f} -> {new_seconds:.4f}  ({speedup:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Streaming Corpus Loader for HMM Training
+Reads tagged corpora one sentence at a time so large files never sit in memory
+"""
+
+import gzip
+import json
+from itertools import islice
+
+from hmm_model import HMMModel
+
+CORPUS_FORMATS = ("conll", "conllu", "jsonl", "slash")
+
+
+def _open_text(path):
+    """Open a corpus file for reading, gzip-compressed files included"""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def detect_corpus_format(path):
+    """
+    Guess the corpus format from the file name
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path (a trailing .gz is ignored)
+
+    Returns:
+    --------
+    str
+        'conllu' for .conllu, 'conll' for .conll/.tsv, 'jsonl' for .jsonl/.json, otherwise 'slash'
+    """
+    name = str(path).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+
+    if name.endswith(".conllu"):
+        return "conllu"
+    if name.endswith((".conll", ".tsv")):
+        return "conll"
+    if name.endswith((".jsonl", ".json")):
+        return "jsonl"
+    return "slash"
+
+
+def read_conll(path, word_column=0, tag_column=1, id_column=None, delimiter=None):
+    """
+    Read a CoNLL-style corpus: one token per line, columns split by whitespace,
+    a blank line between sentences and '#' comment lines ignored
+    For CoNLL-U files use read_conllu (or word_column=1, tag_column=3, id_column=0, delimiter="\t")
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+    word_column : int
+        Column holding the word (default 0, CoNLL-U FORM is 1)
+    tag_column : int
+        Column holding the POS tag (default 1, CoNLL-U UPOS is 3)
+    id_column : int, optional
+        Column holding the token ID; lines whose ID is a range ("3-4", a multiword
+        token) or a decimal ("5.1", an empty node) are skipped so only the
+        syntactic words are tagged
+    delimiter : str, optional
+        Column separator (default: any whitespace, CoNLL-U uses tabs so words may contain spaces)
+
+    Yields:
+    -------
+    dict
+        Tagged sentence
+        Format: {"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}
+    """
+    words = []
+    tags = {}
+
+    with _open_text(path) as corpus:
+        for line in corpus:
+            line = line.strip()
+
+            if not line:
+                if words:
+                    yield {"words": words, "tags": tags}
+                    words = []
+                    tags = {}
+                continue
+
+            if line.startswith("#"):
+                continue
+
+            columns = line.split(delimiter)
+            if id_column is not None and ("-" in columns[id_column] or "." in columns[id_column]):
+                continue
+
+            tags[len(words)] = columns[tag_column]
+            words.append(columns[word_column])
+
+    if words:
+        yield {"words": words, "tags": tags}
+
+
+def read_conllu(path, word_column=1, tag_column=3):
+    """
+    Read a CoNLL-U (Universal Dependencies) corpus with its FORM and UPOS columns
+    Multiword token lines and empty nodes are skipped
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+    word_column : int
+        Column holding the word (default 1, FORM; 2 reads LEMMA)
+    tag_column : int
+        Column holding the POS tag (default 3, UPOS; 4 reads XPOS)
+
+    Yields:
+    -------
+    dict
+        Tagged sentence, tags from the universal tagset
+        Format: {"words": [...], "tags": {0: "NOUN", 1: "VERB", ...}}
+    """
+    return read_conll(path, word_column=word_column, tag_column=tag_column, id_column=0, delimiter="\t")
+
+
+def read_jsonl(path):
+    """
+    Read a JSON Lines corpus in the all_tagged_sentences format, one sentence per line
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+
+    Yields:
+    -------
+    dict
+        Tagged sentence with integer tag keys (JSON turns them into strings)
+        Format: {"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}
+    """
+    with _open_text(path) as corpus:
+        for line in corpus:
+            if not line.strip():
+                continue
+
+            sentence = json.loads(line)
+            yield {
+                "words": sentence["words"],
+                "tags": {int(idx): tag for idx, tag in sentence["tags"].items()}
+            }
+
+
+def read_slash_tagged(path):
+    """
+    Read a word/TAG corpus: one sentence per line, tokens split by whitespace
+    A token without a '/' separator raises ValueError instead of becoming an empty word
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+
+    Yields:
+    -------
+    dict
+        Tagged sentence
+        Format: {"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}
+    """
+    with _open_text(path) as corpus:
+        for line_number, line in enumerate(corpus, 1):
+            tokens = line.split()
+            if not tokens:
+                continue
+
+            words = []
+            tags = {}
+            for token in tokens:
+                # rpartition keeps slashes inside the word, e.g. "1/2/CD"
+                word, separator, tag = token.rpartition("/")
+                if not separator:
+                    raise ValueError(f"{path}:{line_number}: token '{token}' has no /TAG")
+                tags[len(words)] = tag
+                words.append(word)
+
+            yield {"words": words, "tags": tags}
+
+
+def read_tagged_corpus(path, corpus_format=None, **kwargs):
+    """
+    Read a tagged corpus in any supported format as a stream of sentences
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+    corpus_format : str, optional
+        One of CORPUS_FORMATS, guessed from the file name when not given
+    **kwargs
+        Extra options for the reader (e.g. word_column / tag_column for 'conll')
+
+    Yields:
+    -------
+    dict
+        Tagged sentence
+        Format: {"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}
+    """
+    corpus_format = corpus_format or detect_corpus_format(path)
+
+    if corpus_format == "conll":
+        return read_conll(path, **kwargs)
+    if corpus_format == "conllu":
+        return read_conllu(path, **kwargs)
+    if corpus_format == "jsonl":
+        return read_jsonl(path, **kwargs)
+    if corpus_format == "slash":
+        return read_slash_tagged(path, **kwargs)
+
+    raise ValueError(f"Unknown corpus format '{corpus_format}', expected one of {CORPUS_FORMATS}")
+
+
+def iter_chunks(sentences, chunk_size):
+    """
+    Group a stream of sentences into lists of at most chunk_size sentences
+
+    Parameters:
+    -----------
+    sentences : iterable
+        Stream of tagged sentences
+    chunk_size : int
+        Maximum sentences per chunk
+
+    Yields:
+    -------
+    list
+        Next chunk of sentences
+    """
+    sentences = iter(sentences)
+    while True:
+        chunk = list(islice(sentences, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def train_from_corpus(path, corpus_format=None, model=None, chunk_size=10000, **kwargs):
+    """
+    Train HMM counts from a tagged corpus file, chunk by chunk
+    Only one chunk of sentences is held in memory at a time
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+    corpus_format : str, optional
+        One of CORPUS_FORMATS, guessed from the file name when not given
+    model : HMMModel, optional
+        Model to add counts to (a new one with the default tagset if not given)
+    chunk_size : int
+        Sentences counted per step
+    **kwargs
+        Extra options for the reader
+
+    Returns:
+    --------
+    HMMModel
+        Model holding the corpus counts
+    """
+    if model is None:
+        model = HMMModel()
+
+    for chunk in iter_chunks(read_tagged_corpus(path, corpus_format, **kwargs), chunk_size):
+        model.add_sentences(chunk)
+
+    return model
@@ -0,0 +1,252 @@
+"""
+Memory-Mapped Embedding Store
+Word vectors on disk as float32, float16 or per-row int8, queried straight from the mapped file
+"""
+
+import json
+import os
+
+import numpy as np
+
+from word_vectors import normalize_rows, top_k
+
+# Bump whenever the files written by save_embedding_store change
+STORE_FORMAT_VERSION = 1
+STORE_DTYPES = ("float32", "float16", "int8")
+
+# Rows scored per step; quantized rows are widened to float32 one block at a time
+_SCORE_BLOCK_ROWS = 65536
+
+
+def save_embedding_store(path, vocabulary, vectors, dtype="float32"):
+    """
+    Write an embedding store directory
+
+    Files:
+      embeddings.json          format version, dtype and shape
+      vocabulary.npy           UTF-8 bytes of every word, concatenated in row order
+      vocabulary_offsets.npy   (words + 1,) int64, word i is vocabulary[offsets[i]:offsets[i + 1]]
+      sorted_rows.npy          (words,) rows ordered by word, for binary-search lookup
+      vectors.npy              (words x dimensions) unit-length vectors in dtype
+      scales.npy               (words,) float32 per-row scale (int8 only)
+
+    Parameters:
+    -----------
+    path : str
+        Store directory (created if missing)
+    vocabulary : list
+        Words in row order
+    vectors : numpy.ndarray
+        (words x dimensions) matrix (normalized before storing)
+    dtype : str
+        'float32', 'float16' (half the size) or 'int8' (a quarter of the size)
+    """
+    if dtype not in STORE_DTYPES:
+        raise ValueError(f"Unknown store dtype '{dtype}', expected one of {STORE_DTYPES}")
+
+    os.makedirs(path, exist_ok=True)
+    normalized = normalize_rows(vectors)
+
+    encoded = [word.encode("utf-8") for word in vocabulary]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(word) for word in encoded])
+
+    # UTF-8 byte order matches code point order, so lookups can compare raw bytes
+    sorted_rows = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)
+
+    np.save(os.path.join(path, "vocabulary.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(path, "vocabulary_offsets.npy"), offsets)
+    np.save(os.path.join(path, "sorted_rows.npy"), sorted_rows)
+
+    if dtype == "int8":
+        # Per-row scalar quantization: each row uses the full -127..127 range
+        scales = np.abs(normalized).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(normalized / scales[:, None]).astype(np.int8)
+        np.save(os.path.join(path, "vectors.npy"), quantized)
+        np.save(os.path.join(path, "scales.npy"), scales.astype(np.float32))
+    else:
+        np.save(os.path.join(path, "vectors.npy"), normalized.astype(dtype))
+
+    with open(os.path.join(path, "embeddings.json"), "w", encoding="utf-8") as manifest:
+        json.dump({
+            "format_version": STORE_FORMAT_VERSION,
+            "dtype": dtype,
+            "words": len(encoded),
+            "dimensions": int(normalized.shape[1]) if normalized.ndim == 2 else 0
+        }, manifest)
+
+
+class EmbeddingStore:
+    """
+    Read-only word vectors served from memory-mapped files
+
+    Opening a store only maps the files: no dict is built and nothing is
+    copied, so startup is near-instant and every process shares the same
+    pages through the OS cache. Words are found by binary search over the
+    sorted row index.
+    """
+
+    def __init__(self, path):
+        """
+        Open a store written by save_embedding_store
+
+        Parameters:
+        -----------
+        path : str
+            Store directory
+        """
+        with open(os.path.join(path, "embeddings.json"), "r", encoding="utf-8") as manifest:
+            meta = json.load(manifest)
+
+        if meta.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported embedding store version {meta.get('format_version')}, "
+                f"expected {STORE_FORMAT_VERSION}"
+            )
+
+        self.dtype = meta["dtype"]
+        self.vocabulary_bytes = np.load(os.path.join(path, "vocabulary.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "vocabulary_offsets.npy"), mmap_mode="r")
+        self.sorted_rows = np.load(os.path.join(path, "sorted_rows.npy"), mmap_mode="r")
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.scales = (np.load(os.path.join(path, "scales.npy"), mmap_mode="r")
+                       if self.dtype == "int8" else None)
+
+    def __len__(self):
+        return len(self.sorted_rows)
+
+    def __contains__(self, word):
+        return self.word_id(word) is not None
+
+    def _word_bytes(self, row):
+        return self.vocabulary_bytes[self.offsets[row]:self.offsets[row + 1]].tobytes()
+
+    def word(self, row):
+        """Word stored in a row"""
+        return self._word_bytes(row).decode("utf-8")
+
+    def word_id(self, word):
+        """
+        Find the row of a word by binary search
+
+        Parameters:
+        -----------
+        word : str
+            Word to look up
+
+        Returns:
+        --------
+        int or None
+            Row id, or None if the word is not in the store
+        """
+        target = word.encode("utf-8")
+        low, high = 0, len(self.sorted_rows)
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._word_bytes(self.sorted_rows[middle]) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(self.sorted_rows) and self._word_bytes(self.sorted_rows[low]) == target:
+            return int(self.sorted_rows[low])
+        return None
+
+    def _rows(self, start, stop):
+        """Rows start:stop as float32 unit vectors (a view for float32 stores)"""
+        block = self.vectors[start:stop]
+        if self.dtype == "float32":
+            return block
+        block = block.astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return block
+
+    def vector(self, word):
+        """
+        Unit-length vector of a word (dequantized to float32)
+
+        Parameters:
+        -----------
+        word : str
+            Word to look up
+
+        Returns:
+        --------
+        numpy.ndarray
+            (dimensions,) float32 vector
+        """
+        row = self.word_id(word)
+        if row is None:
+            raise KeyError(word)
+        return np.array(self._rows(row, row + 1)[0], dtype=np.float32)
+
+    def scores(self, query):
+        """
+        Cosine similarity of a unit-length query to every stored word
+        Works block by block on the mapped file, so memory stays bounded
+
+        Parameters:
+        -----------
+        query : numpy.ndarray
+            (dimensions,) unit-length vector
+
+        Returns:
+        --------
+        numpy.ndarray
+            (words,) float32 similarities
+        """
+        query = np.asarray(query, dtype=np.float32)
+        return np.concatenate([
+            self._rows(start, start + _SCORE_BLOCK_ROWS) @ query
+            for start in range(0, len(self), _SCORE_BLOCK_ROWS)
+        ]) if len(self) else np.zeros(0, dtype=np.float32)
+
+    def most_similar(self, positive=(), negative=(), topn=10):
+        """
+        Find the words closest to the sum of positive minus negative word vectors
+        Same query semantics as WordVectors.most_similar
+
+        Parameters:
+        -----------
+        positive : str or list
+            Words added to the query
+        negative : list
+            Words subtracted from the query
+        topn : int
+            Number of results
+
+        Returns:
+        --------
+        list
+            [(word, cosine similarity), ...] best first, query words excluded
+        """
+        if isinstance(positive, str):
+            positive = [positive]
+
+        query_words = list(positive) + list(negative)
+        query_ids = [self.word_id(word) for word in query_words]
+        missing = [word for word, row in zip(query_words, query_ids) if row is None]
+        if missing:
+            raise KeyError(f"Words not in vocabulary: {missing}")
+
+        signs = np.array([1.0] * len(positive) + [-1.0] * len(negative), dtype=np.float32)
+        query = signs @ np.stack([self._rows(row, row + 1)[0] for row in query_ids])
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        scores = self.scores(query)
+        best = top_k(scores, topn, query_ids)
+        return [(self.word(row), float(scores[row])) for row in best]
+
+    def analogy(self, a, b, c, topn=1):
+        """
+        Answer "a is to b as c is to ?", i.e. b - a + c
+
+        Returns:
+        --------
+        list
+            [(word, cosine similarity), ...] best first
+        """
+        return self.most_similar(positive=[b, c], negative=[a], topn=topn)
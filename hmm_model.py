@@ -0,0 +1,613 @@
+"""
+Integer-Indexed HMM Model for POS Tagging
+Keeps word and tag counts in dense NumPy matrices instead of nested dicts
+"""
+
+import json
+import os
+
+import numpy as np
+
+from instrumentation import cache_lookup, cache_miss, timed, timer
+from mathematical_calculation import (
+    DEFAULT_TAGSET,
+    SMOOTHING_METHODS,
+    build_tag_index,
+    build_trigram_tables,
+    smooth_emission_counts,
+    build_unknown_word_emission
+)
+from sparse_emission import SparseEmissionTable
+
+# Bump whenever the files written by HMMModel.save change
+# 2: smoothing settings in model.json, unknown-word class rows in log_emission.npy
+# 3: trigram_counts.npy (older bundles load with empty trigram counts)
+MODEL_FORMAT_VERSION = 3
+SUPPORTED_FORMAT_VERSIONS = (1, 2, 3)
+
+# Arrays stored as .npy files in a model bundle
+_COUNT_ARRAYS = ("emission_counts", "tag_totals", "transition_counts")
+_VITERBI_ARRAYS = ("log_emission", "log_start", "log_transition", "log_end")
+# Not in format 1 and 2 bundles
+_TRIGRAM_ARRAY = "trigram_counts"
+
+
+class HMMModel:
+    """
+    HMM counts and probabilities stored as dense matrices
+
+    Words and tags are mapped to integer ids once, so every lookup is a
+    single array index and normalization is one vectorized divide.
+
+    Attributes:
+    -----------
+    tag_index : dict
+        Tag lookup tables from build_tag_index
+    tags : list
+        Tag names in id order (e.g. ["Noun", "Verb", "Modal Auxiliary"])
+    tag_to_id : dict
+        Tag name to column id
+    vocabulary : list
+        Words in id order
+    word_to_id : dict
+        Word to row id
+    emission_counts : numpy.ndarray
+        (words x tags) count of each word seen with each tag
+    tag_totals : numpy.ndarray
+        (tags,) running count of tokens seen with each tag
+    transition_counts : numpy.ndarray
+        (tags + 1 x tags + 1) transition counts, the extra row is 'start'
+        and the extra column is 'end'
+    trigram_counts : numpy.ndarray
+        (tags + 1 x tags + 1 x tags + 1) tag trigram counts, index len(tags) is
+        'start' on the first two axes and 'end' on the last
+    smoothing : dict or None
+        Emission smoothing used by viterbi_tables, see set_smoothing
+    """
+
+    def __init__(self, tags=DEFAULT_TAGSET, short_forms=None):
+        self.tag_index = build_tag_index(tags, short_forms)
+        self.tags = self.tag_index["tags"]
+        self.tag_to_id = self.tag_index["tag_to_id"]
+
+        self.vocabulary = []
+        self.word_to_id = {}
+
+        # Rows past len(vocabulary) are spare capacity so new words do not copy the matrix every time
+        self._emission_buffer = np.zeros((0, len(self.tags)), dtype=np.int32)
+        self.tag_totals = np.zeros(len(self.tags), dtype=np.int64)
+        self.transition_counts = np.zeros((len(self.tags) + 1, len(self.tags) + 1), dtype=np.int32)
+        self.trigram_counts = np.zeros((len(self.tags) + 1,) * 3, dtype=np.int32)
+
+        # None keeps the plain relative-frequency emissions
+        self.smoothing = None
+
+        # Probabilities are derived lazily and dropped whenever the counts change
+        self._probability_cache = {}
+
+    @property
+    def emission_counts(self):
+        """(words x tags) view of the emission counts without spare capacity"""
+        return self._emission_buffer[:len(self.vocabulary)]
+
+    @property
+    def start_id(self):
+        """Row of transition_counts holding the 'start' transitions"""
+        return len(self.tags)
+
+    @property
+    def end_id(self):
+        """Column of transition_counts holding the 'end' transitions"""
+        return len(self.tags)
+
+    # ===== CONVERTERS FROM THE DICT FORMATS =====
+
+    @classmethod
+    def from_pos_count(cls, pos_count, transition_count_table=None, tags=DEFAULT_TAGSET, short_forms=None):
+        """
+        Build a model from the dict tables used by the pages
+
+        Parameters:
+        -----------
+        pos_count : dict
+            POS count dictionary from update_pos_count
+            Format: {"word": {'n': count, 'v': count, 'm': count}}
+        transition_count_table : dict, optional
+            Transition count table from calculate_transition_count
+            Format: {"start": {"Noun": count, ..., "end": count}, "Noun": {...}, ...}
+        tags : sequence
+            Tagset of the tables (default: the dashboard's 3 tags)
+        short_forms : dict, optional
+            Tag name to pos_count key, see build_tag_index
+
+        Returns:
+        --------
+        HMMModel
+            Model holding the same counts
+        """
+        model = cls(tags, short_forms)
+        tag_shorts = model.tag_index["short_forms"]
+
+        model.vocabulary = list(pos_count.keys())
+        model.word_to_id = {word: word_id for word_id, word in enumerate(model.vocabulary)}
+        model._emission_buffer = np.array(
+            [[pos_count[word][short] for short in tag_shorts] for word in model.vocabulary],
+            dtype=np.int32
+        ).reshape(len(model.vocabulary), len(model.tags))
+        model.tag_totals = model._emission_buffer.sum(axis=0, dtype=np.int64)
+
+        if transition_count_table:
+            for current_pos, next_counts in transition_count_table.items():
+                row = model.start_id if current_pos == "start" else model.tag_to_id[current_pos]
+                for next_pos, count in next_counts.items():
+                    col = model.end_id if next_pos == "end" else model.tag_to_id[next_pos]
+                    model.transition_counts[row, col] = count
+
+        return model
+
+    # ===== INCREMENTAL UPDATES =====
+
+    def add_word(self, word):
+        """
+        Get the id of a word, adding it to the vocabulary if it is new
+
+        Parameters:
+        -----------
+        word : str
+            Word (already lowercased)
+
+        Returns:
+        --------
+        int
+            Row id of the word
+        """
+        word_id = self.word_to_id.get(word)
+        if word_id is not None:
+            return word_id
+
+        word_id = len(self.vocabulary)
+        if word_id == self._emission_buffer.shape[0]:
+            # Double the capacity so growing the vocabulary stays amortized O(1) per word
+            grown = np.zeros((max(16, 2 * word_id), len(self.tags)), dtype=self._emission_buffer.dtype)
+            grown[:word_id] = self._emission_buffer
+            self._emission_buffer = grown
+
+        self.vocabulary.append(word)
+        self.word_to_id[word] = word_id
+        return word_id
+
+    def _check_writeable(self):
+        """Refuse to count into read-only (memory-mapped) matrices, numpy does not always raise for them"""
+        if not all(counts.flags.writeable for counts in
+                   (self._emission_buffer, self.tag_totals, self.transition_counts, self.trigram_counts)):
+            raise ValueError("Model was loaded with mmap=True and is read-only; reload it with mmap=False "
+                             "to keep adding sentences")
+
+    def add_sentence(self, words, pos_tags):
+        """
+        Add one tagged sentence to the emission and transition counts
+        Costs O(sentence length), no matter how many sentences were added before
+
+        Parameters:
+        -----------
+        words : list
+            List of words
+        pos_tags : dict
+            Dictionary mapping word indices to POS tags
+            Tags outside the model's tagset are skipped, like update_pos_count does
+        """
+        self.add_sentences([{"words": words, "tags": pos_tags}])
+
+    def add_sentences(self, tagged_sentences):
+        """
+        Add a chunk of tagged sentences to the counts with one scatter-add per table
+
+        Parameters:
+        -----------
+        tagged_sentences : iterable
+            Tagged sentences
+            Format: [{"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}, ...]
+        """
+        self._check_writeable()
+        counting = timer("HMMModel.add_sentences")
+
+        word_ids = []
+        tag_ids = []
+        previous_ids = []
+        next_ids = []
+        trigram_ids = ([], [], [])
+
+        for sentence in tagged_sentences:
+            counting.items += 1
+            pos_tags = sentence["tags"]
+            sentence_tag_ids = []
+            for word_idx, word in enumerate(sentence["words"]):
+                tag_id = self.tag_to_id.get(pos_tags[word_idx])
+                if tag_id is None:
+                    continue
+                word_ids.append(self.add_word(word.lower()))
+                sentence_tag_ids.append(tag_id)
+
+            if not sentence_tag_ids:
+                continue
+
+            # start -> first tag, tag -> next tag, ..., last tag -> end
+            tag_ids.extend(sentence_tag_ids)
+            previous_ids.append(self.start_id)
+            previous_ids.extend(sentence_tag_ids)
+            next_ids.extend(sentence_tag_ids)
+            next_ids.append(self.end_id)
+
+            # start, start -> first tag, ..., second-to-last, last -> end
+            padded = [self.start_id, self.start_id] + sentence_tag_ids + [self.end_id]
+            for axis, ids in enumerate(trigram_ids):
+                ids.extend(padded[axis:len(padded) - 2 + axis])
+
+        if tag_ids:
+            np.add.at(self._emission_buffer, (word_ids, tag_ids), 1)
+            self.tag_totals += np.bincount(tag_ids, minlength=len(self.tags))
+            np.add.at(self.transition_counts, (previous_ids, next_ids), 1)
+            np.add.at(self.trigram_counts, trigram_ids, 1)
+
+            self._probability_cache.clear()
+
+        counting.stop()
+
+    def merge(self, other):
+        """
+        Add another model's counts into this one
+        Vocabularies are matched by word, so models counted on separate shards merge exactly
+
+        Parameters:
+        -----------
+        other : HMMModel
+            Model with the same tagset
+
+        Returns:
+        --------
+        HMMModel
+            This model, so merges can be chained or used with functools.reduce
+        """
+        if other.tags != self.tags:
+            raise ValueError(f"Cannot merge models with different tagsets: {self.tags} vs {other.tags}")
+        self._check_writeable()
+
+        word_ids = np.array([self.add_word(word) for word in other.vocabulary], dtype=np.intp)
+
+        # Ids are unique within one vocabulary, so a plain fancy-index add is safe
+        self._emission_buffer[word_ids] += other.emission_counts
+        self.tag_totals += other.tag_totals
+        self.transition_counts += other.transition_counts
+        self.trigram_counts += other.trigram_counts
+
+        self._probability_cache.clear()
+        return self
+
+    def __getstate__(self):
+        """Pickle only the used vocabulary rows and no cached probabilities"""
+        state = self.__dict__.copy()
+        state["_emission_buffer"] = self.emission_counts.copy()
+        state["_probability_cache"] = {}
+        return state
+
+    def set_smoothing(self, method=None, **options):
+        """
+        Choose how viterbi_tables handles unseen (word, tag) pairs and unseen words
+
+        With a method set, the decoder tables gain one precomputed row per
+        unknown-word class (see UNKNOWN_WORD_CLASSES), so an unseen word costs
+        a single array index while decoding instead of a zero path.
+
+        Parameters:
+        -----------
+        method : str or None
+            One of SMOOTHING_METHODS, or None for no smoothing
+        **options
+            Extra arguments for smooth_emission_counts (k, interpolation_weight, ...)
+        """
+        if method is not None and method not in SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing method '{method}', expected one of {SMOOTHING_METHODS}")
+
+        smoothing = {"method": method, **options} if method is not None else None
+        if smoothing != self.smoothing:
+            self.smoothing = smoothing
+            self._probability_cache.pop("viterbi", None)
+            self._probability_cache.pop("trigram", None)
+
+    # ===== PROBABILITIES =====
+
+    def emission_probabilities(self):
+        """
+        Calculate P(word | tag) for every word and tag
+
+        Returns:
+        --------
+        numpy.ndarray
+            (words x tags) matrix, each column sums to 1 (or 0 for unseen tags)
+        """
+        if "emission" not in self._probability_cache:
+            self._probability_cache["emission"] = np.divide(
+                self.emission_counts, self.tag_totals,
+                out=np.zeros(self.emission_counts.shape), where=self.tag_totals > 0
+            )
+        return self._probability_cache["emission"]
+
+    def transition_probabilities(self):
+        """
+        Calculate P(next tag | current tag) including 'start' and 'end'
+
+        Returns:
+        --------
+        numpy.ndarray
+            (tags + 1 x tags + 1) matrix, each row sums to 1 (or 0 for unseen tags)
+        """
+        if "transition" not in self._probability_cache:
+            row_totals = self.transition_counts.sum(axis=1, keepdims=True)
+            self._probability_cache["transition"] = np.divide(
+                self.transition_counts, row_totals,
+                out=np.zeros(self.transition_counts.shape), where=row_totals > 0
+            )
+        return self._probability_cache["transition"]
+
+    def viterbi_tables(self):
+        """
+        Build decoder tables for viterbi_decode / viterbi_decode_batch
+
+        Returns:
+        --------
+        dict
+            Same format as build_viterbi_tables, computed straight from the matrices
+        """
+        cache_lookup("HMMModel.viterbi_tables")
+        if "viterbi" not in self._probability_cache:
+            cache_miss("HMMModel.viterbi_tables")
+            transition = self.transition_probabilities()
+
+            if self.smoothing is None:
+                emission = self.emission_probabilities()
+            else:
+                emission, unseen_probability = smooth_emission_counts(self.emission_counts, **self.smoothing)
+                unknown_emission = build_unknown_word_emission(
+                    self.vocabulary, self.emission_counts, unseen_probability
+                )
+                emission = np.vstack([emission, unknown_emission])
+
+            with np.errstate(divide='ignore'):
+                viterbi_tables = {
+                    "tags": self.tags,
+                    "word_to_id": self.word_to_id,
+                    "log_emission": np.log(emission),
+                    "log_start": np.log(transition[self.start_id, :self.end_id]),
+                    "log_transition": np.log(transition[:self.start_id, :self.end_id]),
+                    "log_end": np.log(transition[:self.start_id, self.end_id])
+                }
+
+            if self.smoothing is not None:
+                viterbi_tables["unknown_class_offset"] = len(self.vocabulary)
+
+            self._probability_cache["viterbi"] = viterbi_tables
+        return self._probability_cache["viterbi"]
+
+    def trigram_tables(self):
+        """
+        Build decoder tables for viterbi_decode_trigram
+        The emissions are the ones of viterbi_tables (smoothing included), the
+        trigram/bigram/unigram weights come from deleted interpolation
+
+        Returns:
+        --------
+        dict
+            Same format as build_trigram_tables
+        """
+        cache_lookup("HMMModel.trigram_tables")
+        if "trigram" not in self._probability_cache:
+            cache_miss("HMMModel.trigram_tables")
+            self._probability_cache["trigram"] = build_trigram_tables(self.viterbi_tables(), self.trigram_counts)
+        return self._probability_cache["trigram"]
+
+    def tag_dictionary(self, min_count=1):
+        """
+        Allowed tags per word for viterbi_decode_beam, straight from the emission counts
+        Cached until the counts change, like the decoder tables
+
+        Parameters:
+        -----------
+        min_count : int
+            Times a word must be seen with a tag for the tag to be allowed
+
+        Returns:
+        --------
+        dict
+            Same format as build_tag_dictionary
+        """
+        key = ("tag_dictionary", min_count)
+        if key not in self._probability_cache:
+            allowed = self.emission_counts >= min_count
+            self._probability_cache[key] = {
+                self.vocabulary[word_id]: np.flatnonzero(allowed[word_id])
+                for word_id in np.flatnonzero(allowed.any(axis=1))
+            }
+        return self._probability_cache[key]
+
+    def sparse_emissions(self):
+        """
+        Compress the emission counts into a SparseEmissionTable
+
+        Returns:
+        --------
+        SparseEmissionTable
+            CSR copy of emission_counts holding only the seen (word, tag) pairs
+        """
+        return SparseEmissionTable.from_dense(self.emission_counts, self.vocabulary, self.tag_index)
+
+    # ===== CONVERTERS TO THE DICT FORMATS =====
+
+    def _seen_transition_rows(self):
+        """Transition rows in the order the dict tables use: 'start' plus every tag with counts"""
+        row_totals = self.transition_counts.sum(axis=1)
+        rows = [("start", self.start_id)]
+        rows.extend((tag, tag_id) for tag_id, tag in enumerate(self.tags) if row_totals[tag_id] > 0)
+        return rows
+
+    def _table_columns(self):
+        """Transition columns in the order the dict tables use: every tag, then 'end'"""
+        return [(tag, tag_id) for tag_id, tag in enumerate(self.tags)] + [("end", self.end_id)]
+
+    def to_pos_count(self):
+        """
+        Convert emission counts back to the POS count dictionary
+
+        Returns:
+        --------
+        dict
+            Format: {"word": {'n': count, 'v': count, 'm': count}}
+        """
+        tag_shorts = self.tag_index["short_forms"]
+        return {
+            word: dict(zip(tag_shorts, counts))
+            for word, counts in zip(self.vocabulary, self.emission_counts.tolist())
+        }
+
+    def to_emission_probability_table(self):
+        """
+        Convert emission probabilities to the dict format of calculate_emission_probability
+
+        Returns:
+        --------
+        dict
+            Format: {"word": {'n': probability, 'v': probability, 'm': probability}}
+        """
+        tag_shorts = self.tag_index["short_forms"]
+        return {
+            word: dict(zip(tag_shorts, probs))
+            for word, probs in zip(self.vocabulary, self.emission_probabilities().tolist())
+        }
+
+    def to_transition_count_table(self):
+        """
+        Convert transition counts to the dict format of calculate_transition_count
+
+        Returns:
+        --------
+        dict
+            Format: {"start": {"Noun": count, ..., "end": count}, "Noun": {...}, ...}
+        """
+        columns = self._table_columns()
+        return {
+            pos: {next_pos: int(self.transition_counts[row, col]) for next_pos, col in columns}
+            for pos, row in self._seen_transition_rows()
+        }
+
+    def to_transition_probability_table(self):
+        """
+        Convert transition probabilities to the dict format of calculate_transition_probability
+
+        Returns:
+        --------
+        dict
+            Format: {"start": {"Noun": probability, ..., "end": probability}, "Noun": {...}, ...}
+        """
+        transition = self.transition_probabilities()
+        columns = self._table_columns()
+        return {
+            pos: {next_pos: float(transition[row, col]) for next_pos, col in columns}
+            for pos, row in self._seen_transition_rows()
+        }
+
+    # ===== SAVE / LOAD =====
+
+    def save(self, path):
+        """
+        Save the model as a bundle directory
+        Holds model.json (format version and tags), vocabulary.txt (one word per line),
+        the count matrices and the log-space decoder tables as .npy files
+
+        Parameters:
+        -----------
+        path : str
+            Bundle directory (created if missing, existing files are overwritten)
+        """
+        os.makedirs(path, exist_ok=True)
+
+        with open(os.path.join(path, "model.json"), "w", encoding="utf-8") as manifest:
+            json.dump({
+                "format_version": MODEL_FORMAT_VERSION,
+                "tags": self.tags,
+                "short_forms": self.tag_index["tag_to_short"],
+                "vocabulary_size": len(self.vocabulary),
+                "smoothing": self.smoothing
+            }, manifest)
+
+        # newline="" on both sides, so a word holding '\r' is written and read back unchanged
+        with open(os.path.join(path, "vocabulary.txt"), "w", encoding="utf-8", newline="") as vocabulary_file:
+            vocabulary_file.writelines(word + "\n" for word in self.vocabulary)
+
+        for name in _COUNT_ARRAYS + (_TRIGRAM_ARRAY,):
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name))
+
+        viterbi_tables = self.viterbi_tables()
+        for name in _VITERBI_ARRAYS:
+            np.save(os.path.join(path, name + ".npy"), viterbi_tables[name])
+
+    @classmethod
+    @timed("HMMModel.load")
+    def load(cls, path, mmap=True):
+        """
+        Load a model bundle written by save
+
+        With mmap=True the matrices are opened read-only with np.load(mmap_mode='r'),
+        so processes loading the same bundle share one copy through the OS page cache
+        and nothing is retrained or re-normalized. Memory-mapped models are for
+        decoding; load with mmap=False to keep adding sentences.
+
+        Parameters:
+        -----------
+        path : str
+            Bundle directory
+        mmap : bool
+            Memory-map the arrays instead of reading them into memory
+
+        Returns:
+        --------
+        HMMModel
+            Loaded model with its decoder tables ready
+        """
+        with open(os.path.join(path, "model.json"), "r", encoding="utf-8") as manifest:
+            meta = json.load(manifest)
+
+        if meta.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+            raise ValueError(
+                f"Unsupported model format version {meta.get('format_version')}, "
+                f"expected one of {SUPPORTED_FORMAT_VERSIONS}"
+            )
+
+        model = cls(meta["tags"], meta["short_forms"])
+
+        with open(os.path.join(path, "vocabulary.txt"), "r", encoding="utf-8", newline="") as vocabulary_file:
+            model.vocabulary = vocabulary_file.read().split("\n")[:meta["vocabulary_size"]]
+        model.word_to_id = {word: word_id for word_id, word in enumerate(model.vocabulary)}
+
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode)
+            for name in _COUNT_ARRAYS + _VITERBI_ARRAYS
+        }
+
+        model._emission_buffer = arrays["emission_counts"]
+        model.tag_totals = arrays["tag_totals"]
+        model.transition_counts = arrays["transition_counts"]
+
+        trigram_path = os.path.join(path, _TRIGRAM_ARRAY + ".npy")
+        if os.path.exists(trigram_path):
+            model.trigram_counts = np.load(trigram_path, mmap_mode=mmap_mode)
+
+        model.smoothing = meta.get("smoothing")
+        model._probability_cache["viterbi"] = {
+            "tags": model.tags,
+            "word_to_id": model.word_to_id,
+            **{name: arrays[name] for name in _VITERBI_ARRAYS}
+        }
+        if model.smoothing is not None:
+            model._probability_cache["viterbi"]["unknown_class_offset"] = len(model.vocabulary)
+
+        return model
@@ -0,0 +1,270 @@
+"""
+Timing and Counter Instrumentation
+Lightweight metrics for the hot paths, kept process-wide and per dashboard session
+"""
+
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+
+import numpy as np
+
+# Latest timings kept per metric, so percentiles follow recent behaviour
+MAX_SAMPLES = 2048
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of timings and counters
+
+    Attributes:
+    -----------
+    timings : dict
+        Metric name to {"calls", "total_seconds", "items", "samples" (recent durations)}
+    counters : dict
+        Counter name to value
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = {}
+        self.counters = {}
+
+    def record(self, name, seconds, items=0):
+        """
+        Add one timing sample
+
+        Parameters:
+        -----------
+        name : str
+            Metric name
+        seconds : float
+            Duration of the call
+        items : int
+            Units of work done (sentences, tokens, ...), for throughput
+        """
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = {
+                    "calls": 0, "total_seconds": 0.0, "items": 0, "samples": deque(maxlen=MAX_SAMPLES)
+                }
+            timing["calls"] += 1
+            timing["total_seconds"] += seconds
+            timing["items"] += items
+            timing["samples"].append(seconds)
+
+    def count(self, name, value=1):
+        """Add value to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        """Forget every timing and counter"""
+        with self._lock:
+            self.timings = {}
+            self.counters = {}
+
+    def summary(self):
+        """
+        Aggregate the timings into one row per metric
+
+        Returns:
+        --------
+        list
+            [{"metric", "calls", "total_ms", "p50_ms", "p99_ms", "items_per_second"}, ...]
+            slowest total first
+        """
+        with self._lock:
+            snapshot = [(name, dict(timing, samples=list(timing["samples"])))
+                        for name, timing in self.timings.items()]
+
+        rows = []
+        for name, timing in snapshot:
+            samples_ms = np.array(timing["samples"]) * 1000.0
+            rows.append({
+                "metric": name,
+                "calls": timing["calls"],
+                "total_ms": timing["total_seconds"] * 1000.0,
+                "p50_ms": float(np.percentile(samples_ms, 50)),
+                "p99_ms": float(np.percentile(samples_ms, 99)),
+                "items_per_second": (timing["items"] / timing["total_seconds"]
+                                     if timing["items"] and timing["total_seconds"] > 0 else None)
+            })
+
+        return sorted(rows, key=lambda row: -row["total_ms"])
+
+    def cache_summary(self):
+        """
+        Hit rates of the caches reported through cache_lookup / cache_miss
+
+        Returns:
+        --------
+        list
+            [{"cache", "lookups", "misses", "hit_rate"}, ...]
+        """
+        with self._lock:
+            counters = dict(self.counters)
+
+        rows = []
+        for name, lookups in sorted(counters.items()):
+            if not name.endswith(".lookups"):
+                continue
+            cache = name[:-len(".lookups")]
+            misses = counters.get(cache + ".misses", 0)
+            rows.append({
+                "cache": cache,
+                "lookups": lookups,
+                "misses": misses,
+                "hit_rate": 1.0 - misses / lookups if lookups else None
+            })
+
+        return rows
+
+
+# Shared by every session and thread of the process
+PROCESS_METRICS = MetricsRegistry()
+
+# When False, timed functions run bare and timers record nothing (see set_enabled)
+_enabled = True
+
+
+def set_enabled(enabled):
+    """
+    Switch all recording on or off, e.g. while benchmarking the undecorated cost
+
+    Parameters:
+    -----------
+    enabled : bool
+        Record timings and counters
+
+    Returns:
+    --------
+    bool
+        The previous setting, to restore afterwards
+    """
+    global _enabled
+    previous, _enabled = _enabled, bool(enabled)
+    return previous
+
+# Registry of the dashboard session running on the current thread, if any
+_session_metrics = ContextVar("session_metrics", default=None)
+
+
+def activate_session_metrics(registry):
+    """
+    Also record metrics from the current thread into a session's registry
+    Called at the top of every page run (see page_utils.track_session)
+
+    Parameters:
+    -----------
+    registry : MetricsRegistry or None
+        Session registry, or None to record process-wide only
+    """
+    _session_metrics.set(registry)
+
+
+def record(name, seconds, items=0):
+    """Record a timing process-wide and in the active session (see MetricsRegistry.record)"""
+    if not _enabled:
+        return
+    PROCESS_METRICS.record(name, seconds, items)
+    session = _session_metrics.get()
+    if session is not None:
+        session.record(name, seconds, items)
+
+
+def count(name, value=1):
+    """Add to a counter process-wide and in the active session"""
+    if not _enabled:
+        return
+    PROCESS_METRICS.count(name, value)
+    session = _session_metrics.get()
+    if session is not None:
+        session.count(name, value)
+
+
+def cache_lookup(name):
+    """Count one lookup of a cache (pair with cache_miss inside the cached function)"""
+    count(name + ".lookups")
+
+
+def cache_miss(name):
+    """Count one miss of a cache, i.e. one run of the cached function body"""
+    count(name + ".misses")
+
+
+class timer:
+    """
+    Time a block of code, either as a context manager
+
+        with timer("viterbi", items=len(sentences)):
+            ...
+
+    or by hand for top-level page sections that should not be re-indented
+
+        section = timer("page.user_pos_tagging")
+        ...
+        section.stop()
+
+    The clock starts when the timer is created. A block that exits with an
+    exception (including Streamlit's rerun and stop signals) is not recorded.
+    """
+
+    def __init__(self, name, items=0):
+        self.name = name
+        self.items = items
+        self.start = time.perf_counter()
+        self.stopped = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.stop()
+        return False
+
+    def stop(self):
+        """Record the elapsed time (only the first call counts)"""
+        if not self.stopped:
+            self.stopped = True
+            record(self.name, time.perf_counter() - self.start, self.items)
+
+
+def timed(name=None, items=None):
+    """
+    Decorator recording every call of a function
+    Each call costs two registry updates, so decorate batch-level entry points
+    (a whole batch, a model load), not functions called once per sentence
+
+    Parameters:
+    -----------
+    name : str, optional
+        Metric name (default: the function name)
+    items : callable, optional
+        Called with the function's arguments to get the units of work done,
+        e.g. items=lambda sentences, *args, **kwargs: len(sentences)
+
+    Returns:
+    --------
+    callable
+        Decorator
+    """
+    def decorator(function):
+        metric = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            record(metric, time.perf_counter() - start, items(*args, **kwargs) if items else 0)
+            return result
+
+        return wrapper
+
+    return decorator
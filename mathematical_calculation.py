@@ -3,7 +3,86 @@ Mathematical Calculations for POS Tagging
 Handles all probability calculations and data aggregation
 """
 
-def map_tag_to_short(tag):
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from instrumentation import timed
+
+# ===== TAGSETS =====
+# The dashboard's own 3-tag set, with the short forms used as pos_count keys
+DEFAULT_TAGSET = ("Noun", "Verb", "Modal Auxiliary")
+DEFAULT_SHORT_FORMS = {"Noun": 'n', "Verb": 'v', "Modal Auxiliary": 'm'}
+
+# 45-tag Penn Treebank set
+PENN_TREEBANK_TAGSET = (
+    "CC", "CD", "DT", "EX", "FW", "IN", "JJ", "JJR", "JJS", "LS", "MD", "NN", "NNS", "NNP", "NNPS",
+    "PDT", "POS", "PRP", "PRP$", "RB", "RBR", "RBS", "RP", "SYM", "TO", "UH", "VB", "VBD", "VBG",
+    "VBN", "VBP", "VBZ", "WDT", "WP", "WP$", "WRB", "#", "$", "''", "``", "(", ")", ",", ".", ":"
+)
+
+# 17-tag Universal Dependencies set
+UNIVERSAL_TAGSET = (
+    "ADJ", "ADP", "ADV", "AUX", "CCONJ", "DET", "INTJ", "NOUN", "NUM", "PART", "PRON", "PROPN",
+    "PUNCT", "SCONJ", "SYM", "VERB", "X"
+)
+
+
+def build_tag_index(tags=DEFAULT_TAGSET, short_forms=None):
+    """
+    Precompute the tag lookup tables used by every calculation
+    Build it once per tagset and pass it around instead of branching on tag names
+
+    Parameters:
+    -----------
+    tags : sequence
+        Tag names in column order (e.g. DEFAULT_TAGSET, PENN_TREEBANK_TAGSET)
+    short_forms : dict, optional
+        Full tag name to the key used in pos_count / emission tables
+        Defaults to 'n'/'v'/'m' for the dashboard tags and the tag itself otherwise
+
+    Returns:
+    --------
+    dict
+        Tag index
+        Format: {"tags": [...], "tag_to_id": {"Noun": 0, ...},
+                 "short_forms": ['n', ...], "tag_to_short": {"Noun": 'n', ...}}
+    """
+    if short_forms is None:
+        short_forms = DEFAULT_SHORT_FORMS
+
+    tags = list(tags)
+    shorts = [short_forms.get(tag, tag) for tag in tags]
+
+    return {
+        "tags": tags,
+        "tag_to_id": {tag: tag_id for tag_id, tag in enumerate(tags)},
+        "short_forms": shorts,
+        "tag_to_short": dict(zip(tags, shorts))
+    }
+
+
+DEFAULT_TAG_INDEX = build_tag_index()
+
+# ===== SMOOTHING & UNKNOWN WORDS =====
+SMOOTHING_METHODS = ("add_k", "good_turing", "interpolated")
+
+# Suffixes checked in order, so longer ones come before the suffixes they end with
+UNKNOWN_WORD_SUFFIXES = (
+    "tion", "sion", "ness", "ment", "able", "ible", "less", "ing", "ous", "ive", "ful",
+    "ity", "est", "ed", "ly", "er", "al", "s"
+)
+UNKNOWN_WORD_CLASSES = (
+    ("<number>", "<has-digit>", "<punct>", "<hyphen>")
+    + tuple("-" + suffix for suffix in UNKNOWN_WORD_SUFFIXES)
+    + ("<unk>",)
+)
+_UNKNOWN_CLASS_ID = {name: class_id for class_id, name in enumerate(UNKNOWN_WORD_CLASSES)}
+_NUMBER_PATTERN = re.compile(r"[+-]?\d[\d.,:/]*%?")
+
+
+def map_tag_to_short(tag, tag_index=DEFAULT_TAG_INDEX):
     """
     Convert full tag name to short form
 
@@ -11,22 +90,18 @@ def map_tag_to_short(tag):
     -----------
     tag : str
         Full tag name ('Noun', 'Verb', 'Modal Auxiliary')
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
 
     Returns:
     --------
     str
         Short form ('n', 'v', 'm') or None if invalid
     """
-    if tag == "Noun":
-        return 'n'
-    elif tag == "Verb":
-        return 'v'
-    elif tag == "Modal Auxiliary":
-        return 'm'
-    return None
+    return tag_index["tag_to_short"].get(tag)
 
 
-def update_pos_count(pos_count, words, pos_tags):
+def update_pos_count(pos_count, words, pos_tags, tag_index=DEFAULT_TAG_INDEX):
     """
     Update POS count dictionary based on tagged words
 
@@ -38,29 +113,32 @@ def update_pos_count(pos_count, words, pos_tags):
         List of words
     pos_tags : dict
         Dictionary mapping word indices to POS tags
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
 
     Returns:
     --------
     dict
         Updated POS count dictionary
     """
-    for word_idx, word in enumerate(words):
-        word_lower = word.lower()
-        tag = pos_tags[word_idx]
+    tag_to_short = tag_index["tag_to_short"]
 
-        tag_short = map_tag_to_short(tag)
+    for word_idx, word in enumerate(words):
+        tag_short = tag_to_short.get(pos_tags[word_idx])
         if tag_short is None:
             continue
 
-        if word_lower not in pos_count:
-            pos_count[word_lower] = {'n': 0, 'v': 0, 'm': 0}
+        word_counts = pos_count.get(word.lower())
+        if word_counts is None:
+            word_counts = pos_count[word.lower()] = dict.fromkeys(tag_index["short_forms"], 0)
 
-        pos_count[word_lower][tag_short] += 1
+        word_counts[tag_short] += 1
 
     return pos_count
 
 
-def calculate_emission_probability(pos_count):
+@timed()
+def calculate_emission_probability(pos_count, tag_index=DEFAULT_TAG_INDEX):
     """
     Calculate emission probability table from POS counts
 
@@ -68,38 +146,49 @@ def calculate_emission_probability(pos_count):
     -----------
     pos_count : dict
         POS count dictionary
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
 
     Returns:
     --------
     dict
         Emission probability table with probabilities for each word
     """
-    n_total = sum(pos_count[word]['n'] for word in pos_count.keys())
-    v_total = sum(pos_count[word]['v'] for word in pos_count.keys())
-    m_total = sum(pos_count[word]['m'] for word in pos_count.keys())
-
-    emission_probability_table = {}
+    tag_totals = [(short, sum(word_counts[short] for word_counts in pos_count.values()))
+                  for short in tag_index["short_forms"]]
 
-    for word in pos_count.keys():
-        emission_probability_table[word] = {
-            'n': pos_count[word]['n'] / n_total if n_total > 0 else 0,
-            'v': pos_count[word]['v'] / v_total if v_total > 0 else 0,
-            'm': pos_count[word]['m'] / m_total if m_total > 0 else 0
+    # The dashboard's 3 tags: one literal dict per word, no inner loop
+    if len(tag_totals) == 3:
+        (first, first_total), (second, second_total), (third, third_total) = tag_totals
+        return {
+            word: {
+                first: word_counts[first] / first_total if first_total > 0 else 0,
+                second: word_counts[second] / second_total if second_total > 0 else 0,
+                third: word_counts[third] / third_total if third_total > 0 else 0
+            }
+            for word, word_counts in pos_count.items()
         }
 
-    return emission_probability_table
+    return {
+        word: {short: word_counts[short] / total if total > 0 else 0 for short, total in tag_totals}
+        for word, word_counts in pos_count.items()
+    }
 
 
-def calculate_transition_count(all_tagged_sentences):
+@timed(items=lambda all_tagged_sentences, *args, **kwargs: len(all_tagged_sentences))
+def calculate_transition_count(all_tagged_sentences, tag_index=DEFAULT_TAG_INDEX):
     """
     Calculate transition count table from tagged sentences
     Counts how many times each POS tag transitions to another POS tag
 
     Parameters:
     -----------
-    all_tagged_sentences : list
+    all_tagged_sentences : list or TaggedSentenceStore
         List of dictionaries containing tagged sentences
         Format: [{"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}, ...]
+        A TaggedSentenceStore is counted straight from its flat tag arrays
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
 
     Returns:
     --------
@@ -107,46 +196,62 @@ def calculate_transition_count(all_tagged_sentences):
         Transition count table
         Format: {"start": {"Noun": count, "Verb": count, ...}, "Noun": {...}, ...}
     """
-    # Initialize transition table with all POS tags including 'start' and 'end'
-    pos_tags = {"start"}
+    tags = tag_index["tags"]
+    tag_to_id = tag_index["tag_to_id"]
+
+    # Row/column len(tags) holds 'start' (as a row) and 'end' (as a column)
+    boundary = len(tags)
+    previous_ids = []
+    next_ids = []
+
+    if hasattr(all_tagged_sentences, "tag_arrays"):
+        previous_ids, next_ids = _flat_transition_ids(all_tagged_sentences, tag_to_id, boundary)
+        all_tagged_sentences = []
 
-    # Collect all unique POS tags from sentences
     for sentence in all_tagged_sentences:
-        for tag in sentence["tags"].values():
-            pos_tags.add(tag)
-
-    # Initialize transition count table
-    transition_table = {}
-    for pos in pos_tags:
-        transition_table[pos] = {
-            "Noun": 0,
-            "Verb": 0,
-            "Modal Auxiliary": 0,
-            "end": 0
-        }
+        sequence = [tag_to_id[tag] for tag in sentence["tags"].values()]
+        if not sequence:
+            continue
+
+        # start -> first POS, POS -> next POS, ..., last POS -> end
+        previous_ids.append(boundary)
+        previous_ids.extend(sequence)
+        next_ids.extend(sequence)
+        next_ids.append(boundary)
 
-    # Extract POS sequences from tagged sentences
-    pos_sequences = [list(sentence["tags"].values()) for sentence in all_tagged_sentences]
+    counts = np.zeros((boundary + 1, boundary + 1), dtype=np.int64)
+    np.add.at(counts, (previous_ids, next_ids), 1)
 
-    # Count transitions
-    for sequence in pos_sequences:
-        # Count transition from 'start' to first POS
-        first_pos = sequence[0]
-        transition_table["start"][first_pos] += 1
+    # Rows: 'start' plus every POS that appeared, columns: every POS plus 'end'
+    columns = tags + ["end"]
+    rows = [("start", boundary)] + [(tag, tag_id) for tag_id, tag in enumerate(tags) if counts[tag_id].any()]
 
-        # Count transitions between consecutive POS tags
-        for i in range(len(sequence) - 1):
-            current_pos = sequence[i]
-            next_pos = sequence[i + 1]
-            transition_table[current_pos][next_pos] += 1
+    return {pos: dict(zip(columns, counts[row].tolist())) for pos, row in rows}
 
-        # Count transition from last POS to 'end'
-        last_pos = sequence[-1]
-        transition_table[last_pos]["end"] += 1
 
-    return transition_table
+def _flat_transition_ids(sentence_store, tag_to_id, boundary):
+    """
+    (previous, next) tag id pairs of every transition in a TaggedSentenceStore
+    Built with array operations over the flat tag ids, no per-sentence Python
+    """
+    store_tag_ids, offsets = sentence_store.tag_arrays()
+    tag_ids = np.array([tag_to_id[tag] for tag in sentence_store.tags], dtype=np.intp)[store_tag_ids]
+
+    starts = offsets[:-1][offsets[1:] > offsets[:-1]]
+    ends = offsets[1:][offsets[1:] > offsets[:-1]]
 
+    # Every token is entered from the token before it, or from 'start' at a sentence start
+    entered_from = np.empty_like(tag_ids)
+    entered_from[1:] = tag_ids[:-1]
+    entered_from[starts] = boundary
 
+    # ... and the last token of every sentence moves on to 'end'
+    previous_ids = np.concatenate([entered_from, tag_ids[ends - 1]])
+    next_ids = np.concatenate([tag_ids, np.full(len(ends), boundary, dtype=np.intp)])
+    return previous_ids, next_ids
+
+
+@timed()
 def calculate_transition_probability(transition_table):
     """
     Calculate transition probability table from transition counts
@@ -176,4 +281,1116 @@ def calculate_transition_probability(transition_table):
             else:
                 transition_probability_table[current_pos][next_pos] = 0
 
-    return transition_probability_table
\ No newline at end of file
+    return transition_probability_table
+
+
+def unknown_word_class(word):
+    """
+    Map a word to its unknown-word class by shape and suffix
+    Words never seen while training borrow the emission probabilities of their class
+
+    Parameters:
+    -----------
+    word : str
+        Any word (case is ignored)
+
+    Returns:
+    --------
+    int
+        Index into UNKNOWN_WORD_CLASSES
+    """
+    return _unknown_word_class(word.lower())
+
+
+@lru_cache(maxsize=100000)
+def _unknown_word_class(word):
+    if _NUMBER_PATTERN.fullmatch(word):
+        return _UNKNOWN_CLASS_ID["<number>"]
+    if any(char.isdigit() for char in word):
+        return _UNKNOWN_CLASS_ID["<has-digit>"]
+    if not any(char.isalnum() for char in word):
+        return _UNKNOWN_CLASS_ID["<punct>"]
+    if "-" in word:
+        return _UNKNOWN_CLASS_ID["<hyphen>"]
+
+    for suffix in UNKNOWN_WORD_SUFFIXES:
+        if word.endswith(suffix) and len(word) > len(suffix) + 1:
+            return _UNKNOWN_CLASS_ID["-" + suffix]
+
+    return _UNKNOWN_CLASS_ID["<unk>"]
+
+
+@timed()
+def smooth_emission_counts(emission_counts, method="add_k", k=1.0, interpolation_weight=0.9,
+                           good_turing_max_count=5):
+    """
+    Turn (words x tags) emission counts into smoothed P(word | tag)
+    Every column keeps some probability for words never seen with that tag
+
+    Parameters:
+    -----------
+    emission_counts : numpy.ndarray
+        (words x tags) count matrix, e.g. HMMModel.emission_counts
+    method : str
+        'add_k'       - add k to every count
+        'good_turing' - discount counts up to good_turing_max_count with the
+                        Good-Turing estimate, unseen mass = hapax count / tag total
+                        (the add-one mass when a tag has no hapax words or only hapax words)
+        'interpolated' - mix P(word | tag) with the add-one unigram P(word)
+    k : float
+        Pseudo-count for 'add_k'
+    interpolation_weight : float
+        Weight of P(word | tag) for 'interpolated'
+    good_turing_max_count : int
+        Counts above this are trusted as they are for 'good_turing'
+
+    Returns:
+    --------
+    tuple
+        (probabilities, unseen_probability)
+        probabilities is (words x tags), unseen_probability is (tags,) and is the
+        probability a single new word gets under each tag
+    """
+    counts = np.asarray(emission_counts, dtype=float)
+    n_words, n_tags = counts.shape
+    tag_totals = counts.sum(axis=0)
+
+    if method == "add_k":
+        # One extra pseudo-word row stands for every word not in the vocabulary
+        denominators = tag_totals + k * (n_words + 1)
+        return (counts + k) / denominators, k / denominators
+
+    if method == "interpolated":
+        word_totals = counts.sum(axis=1)
+        unigram_denominator = tag_totals.sum() + n_words + 1
+        conditional = np.divide(counts, tag_totals, out=np.zeros_like(counts), where=tag_totals > 0)
+        unigram = (word_totals + 1) / unigram_denominator
+        probabilities = interpolation_weight * conditional + (1 - interpolation_weight) * unigram[:, None]
+        unseen = np.full(n_tags, (1 - interpolation_weight) / unigram_denominator)
+        return probabilities, unseen
+
+    if method == "good_turing":
+        probabilities = np.zeros_like(counts)
+        unseen = np.zeros(n_tags)
+        int_counts = counts.astype(np.int64)
+
+        for tag_id in range(n_tags):
+            column = int_counts[:, tag_id]
+            if tag_totals[tag_id] == 0:
+                # Nothing seen with this tag: every word (and a new one) is equally likely
+                unseen[tag_id] = 1.0 / (n_words + 1)
+                probabilities[:, tag_id] = unseen[tag_id]
+                continue
+
+            # freq_of_freq[c] = number of words seen exactly c times with this tag
+            freq_of_freq = np.bincount(column, minlength=good_turing_max_count + 2)
+            observed = np.arange(len(freq_of_freq))
+            next_freq = np.append(freq_of_freq[1:], 0)
+            discount = ((observed >= 1) & (observed <= good_turing_max_count)
+                        & (freq_of_freq > 0) & (next_freq > 0))
+
+            adjusted = observed.astype(float)
+            adjusted[discount] = (observed[discount] + 1) * next_freq[discount] / freq_of_freq[discount]
+
+            seen = adjusted[column]
+            if 0 < freq_of_freq[1] < tag_totals[tag_id]:
+                unseen_mass = freq_of_freq[1] / tag_totals[tag_id]
+            else:
+                # No hapax words gives no unseen mass and only hapax words leaves none for the seen
+                # ones, so reserve the add-one mass of the zero cells and the new-word slot instead
+                unseen_mass = (freq_of_freq[0] + 1) / (tag_totals[tag_id] + n_words + 1)
+
+            # Share the unseen mass between zero cells and the new-word slot
+            unseen[tag_id] = unseen_mass / (freq_of_freq[0] + 1)
+            probabilities[:, tag_id] = np.where(
+                column > 0, seen / seen.sum() * (1 - unseen_mass), unseen[tag_id]
+            )
+
+        return probabilities, unseen
+
+    raise ValueError(f"Unknown smoothing method '{method}', expected one of {SMOOTHING_METHODS}")
+
+
+def build_unknown_word_emission(vocabulary, emission_counts, unseen_probability):
+    """
+    Precompute P(word | tag) for each unknown-word class
+
+    The class distribution per tag is learned from hapax words (seen exactly once),
+    which behave most like words that were never seen, and scaled by the
+    probability reserved for a new word under that tag.
+
+    Parameters:
+    -----------
+    vocabulary : list
+        Words in row order of emission_counts
+    emission_counts : numpy.ndarray
+        (words x tags) count matrix
+    unseen_probability : numpy.ndarray
+        (tags,) probability of a single new word, from smooth_emission_counts
+
+    Returns:
+    --------
+    numpy.ndarray
+        (classes x tags) emission probabilities, row order of UNKNOWN_WORD_CLASSES
+    """
+    counts = np.asarray(emission_counts, dtype=float)
+    n_classes = len(UNKNOWN_WORD_CLASSES)
+
+    hapax = counts.sum(axis=1) == 1
+    class_ids = np.array([unknown_word_class(word) for word, is_hapax in zip(vocabulary, hapax) if is_hapax],
+                         dtype=np.intp)
+
+    class_counts = np.zeros((n_classes, counts.shape[1]))
+    np.add.at(class_counts, class_ids, counts[hapax])
+
+    # Add-one over classes so every class stays possible under every tag
+    class_given_tag = (class_counts + 1) / (class_counts.sum(axis=0) + n_classes)
+    return class_given_tag * unseen_probability
+
+
+@timed()
+def build_viterbi_tables(emission_probability_table, transition_probability_table, tag_index=DEFAULT_TAG_INDEX):
+    """
+    Pack emission and transition probability tables into dense log-space arrays
+    Build this once after training and reuse it for every sentence you decode
+
+    Parameters:
+    -----------
+    emission_probability_table : dict
+        Emission probability table from calculate_emission_probability
+        Format: {"word": {'n': probability, 'v': probability, 'm': probability}}
+    transition_probability_table : dict
+        Transition probability table from calculate_transition_probability
+        Format: {"start": {"Noun": probability, ..., "end": probability}, "Noun": {...}, ...}
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
+
+    Returns:
+    --------
+    dict
+        Decoder tables
+        Format: {"tags": [...], "word_to_id": {"word": row}, "log_emission": (V x T),
+                 "log_start": (T,), "log_transition": (T x T), "log_end": (T,)}
+        Smoothed tables (HMMModel.set_smoothing) also hold "unknown_class_offset": the row
+        where the UNKNOWN_WORD_CLASSES rows start in log_emission
+    """
+    tags = tag_index["tags"]
+    tag_shorts = tag_index["short_forms"]
+
+    words = list(emission_probability_table.keys())
+    word_to_id = {word: row for row, word in enumerate(words)}
+
+    emission = np.zeros((len(words), len(tags)))
+    for row, word in enumerate(words):
+        emission[row] = [emission_probability_table[word][short] for short in tag_shorts]
+
+    # log(0) = -inf marks an impossible step, so zero paths drop out of the max
+    with np.errstate(divide='ignore'):
+        return {
+            "tags": tags,
+            "word_to_id": word_to_id,
+            "log_emission": np.log(emission),
+            **transition_log_tables(transition_probability_table, tags)
+        }
+
+
+def transition_log_tables(transition_probability_table, tags):
+    """
+    Log-space start, transition and end tables from the transition probability dict
+
+    Parameters:
+    -----------
+    transition_probability_table : dict
+        Transition probability table
+        Format: {"start": {"Noun": probability, ..., "end": probability}, "Noun": {...}, ...}
+    tags : list
+        Tag names in id order
+
+    Returns:
+    --------
+    dict
+        {"log_start": (T,), "log_transition": (T x T), "log_end": (T,)}, -inf for zero probabilities
+    """
+    # Rows missing from the transition table (tags never seen) stay all zero
+    start = np.zeros(len(tags))
+    transition = np.zeros((len(tags), len(tags)))
+    end = np.zeros(len(tags))
+
+    start_row = transition_probability_table.get("start", {})
+    for col, tag in enumerate(tags):
+        start[col] = start_row.get(tag, 0)
+
+    for row, current_pos in enumerate(tags):
+        next_probs = transition_probability_table.get(current_pos, {})
+        for col, next_pos in enumerate(tags):
+            transition[row, col] = next_probs.get(next_pos, 0)
+        end[row] = next_probs.get("end", 0)
+
+    with np.errstate(divide='ignore'):
+        return {
+            "log_start": np.log(start),
+            "log_transition": np.log(transition),
+            "log_end": np.log(end)
+        }
+
+
+def lookup_word_row(word, word_to_id, unknown_class_offset=None):
+    """
+    Find the log_emission row of a word
+
+    Parameters:
+    -----------
+    word : str
+        Word as typed (lowercased before lookup)
+    word_to_id : dict
+        Word to row mapping of the decoder tables
+    unknown_class_offset : int, optional
+        First unknown-word class row, if the tables have them
+
+    Returns:
+    --------
+    int
+        Row id, or -1 for an unseen word without unknown-word rows
+    """
+    word_lower = word.lower()
+    row = word_to_id.get(word_lower)
+    if row is not None:
+        return row
+    if unknown_class_offset is None:
+        return -1
+    return unknown_class_offset + _unknown_word_class(word_lower)
+
+
+def viterbi_decode(words, viterbi_tables):
+    """
+    Find the most likely POS tag sequence for a sentence with the Viterbi algorithm
+    Each step keeps only the best path into every tag, so the work grows
+    linearly with sentence length instead of exponentially like brute force
+
+    Parameters:
+    -----------
+    words : list
+        List of words in the sentence
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables
+
+    Returns:
+    --------
+    tuple
+        (best tag sequence as a list of full tag names, log probability of that path)
+        The score is -inf when every path has a zero probability (e.g. unseen words
+        with unsmoothed tables)
+    """
+    if not words:
+        return [], 0.0
+
+    tags = viterbi_tables["tags"]
+    word_to_id = viterbi_tables["word_to_id"]
+    unknown_class_offset = viterbi_tables.get("unknown_class_offset")
+    log_emission = viterbi_tables["log_emission"]
+    log_transition = viterbi_tables["log_transition"]
+
+    # Without unknown-word rows, unseen words emit with probability 0 under every tag
+    unseen = np.full(len(tags), -np.inf)
+    rows = [lookup_word_row(word, word_to_id, unknown_class_offset) for word in words]
+    emissions = [log_emission[row] if row >= 0 else unseen for row in rows]
+
+    backpointers = np.zeros((len(words), len(tags)), dtype=np.intp)
+    delta = viterbi_tables["log_start"] + emissions[0]
+
+    for position in range(1, len(words)):
+        # scores[i, j] = best path ending in tag i, then moving to tag j
+        scores = delta[:, None] + log_transition
+        backpointers[position] = scores.argmax(axis=0)
+        delta = scores.max(axis=0) + emissions[position]
+
+    delta = delta + viterbi_tables["log_end"]
+
+    best_last = int(delta.argmax())
+    best_score = float(delta[best_last])
+
+    path = [best_last]
+    for position in range(len(words) - 1, 0, -1):
+        path.append(int(backpointers[position, path[-1]]))
+    path.reverse()
+
+    return [tags[tag_id] for tag_id in path], best_score
+
+
+def encode_sentences(sentences, word_to_id, unknown_class_offset=None, lowercase=True):
+    """
+    Map a batch of sentences to a padded matrix of word ids
+
+    Parameters:
+    -----------
+    sentences : list
+        List of sentences, each a list of words
+    word_to_id : dict
+        Word to row mapping from build_viterbi_tables
+    unknown_class_offset : int, optional
+        First unknown-word class row, if the tables have them (see lookup_word_row)
+    lowercase : bool
+        Lowercase every word before the lookup; False when the words already are
+        (e.g. tokenizer.normalize_sentences output)
+
+    Returns:
+    --------
+    tuple
+        (token_ids, lengths)
+        token_ids is a (batch x longest sentence) int matrix, -1 for unseen words and padding
+        lengths is a (batch,) int array with the real length of each sentence
+    """
+    lengths = np.array([len(words) for words in sentences], dtype=np.intp)
+    max_length = int(lengths.max()) if len(sentences) else 0
+
+    # One flat pass over every token, then a single scatter into the padded matrix
+    if lowercase:
+        words = [word.lower() for sentence in sentences for word in sentence]
+    else:
+        words = [word for sentence in sentences for word in sentence]
+    get_row = word_to_id.get
+    rows = [get_row(word, -1) for word in words]
+    if unknown_class_offset is not None:
+        rows = [row if row >= 0 else unknown_class_offset + _unknown_word_class(word)
+                for row, word in zip(rows, words)]
+
+    token_ids = np.full((len(sentences), max_length), -1, dtype=np.intp)
+    sentence_ids = np.repeat(np.arange(len(sentences)), lengths)
+    positions = np.arange(len(words)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    token_ids[sentence_ids, positions] = rows
+
+    return token_ids, lengths
+
+
+# A batch is split whenever the padded (sentences x longest) block would be more than
+# BATCH_PADDING_FACTOR times its real tokens, or larger than BATCH_MAX_TOKENS cells
+BATCH_PADDING_FACTOR = 2
+BATCH_MAX_TOKENS = 65536
+
+
+def _viterbi_decode_bucket(token_ids, lengths, viterbi_tables):
+    """
+    Viterbi over one padded block of sentences sorted longest first (no empty ones)
+
+    Returns:
+    --------
+    tuple
+        (paths, best_scores): (sentences x longest) tag ids and (sentences,) log probabilities
+    """
+    log_transition = viterbi_tables["log_transition"]
+    n_sentences, max_length = token_ids.shape
+
+    # (sentences x length x tags) emission scores, unseen words get -inf
+    emissions = viterbi_tables["log_emission"][np.maximum(token_ids, 0)]
+    emissions[token_ids < 0] = -np.inf
+
+    # running[position] = number of sentences that still have a word at that position
+    running = np.searchsorted(-lengths, -np.arange(max_length), side="left")
+    backpointers = np.zeros((n_sentences, max_length, log_transition.shape[0]), dtype=np.intp)
+    delta = viterbi_tables["log_start"] + emissions[:, 0]
+
+    for position in range(1, max_length):
+        active = running[position]
+
+        # Finished sentences keep their last delta and are not touched again
+        scores = delta[:active, :, None] + log_transition
+        best_previous = scores.argmax(axis=1)
+        backpointers[:active, position] = best_previous
+        delta[:active] = scores.max(axis=1) + emissions[:active, position]
+
+    delta = delta + viterbi_tables["log_end"]
+
+    batch_rows = np.arange(n_sentences)
+    paths = np.zeros((n_sentences, max_length), dtype=np.intp)
+    last_tags = delta.argmax(axis=1)
+    best_scores = delta[batch_rows, last_tags]
+    paths[batch_rows, lengths - 1] = last_tags
+
+    for position in range(max_length - 1, 0, -1):
+        active = running[position]
+        paths[:active, position - 1] = backpointers[batch_rows[:active], position, paths[:active, position]]
+
+    return paths, best_scores
+
+
+@timed(items=lambda sentences, *args, **kwargs: len(sentences))
+def viterbi_decode_batch(sentences, viterbi_tables):
+    """
+    Decode many sentences at once with the Viterbi algorithm
+    Every step runs on the batch as (batch x tags x tags) array operations,
+    so short sentences do not pay the per-sentence Python overhead of viterbi_decode.
+    Sentences are decoded longest first in buckets of similar length (see
+    BATCH_PADDING_FACTOR and BATCH_MAX_TOKENS), so one long sentence never pads
+    the whole batch and each step only touches the sentences that still have a
+    word at that position; results come back in input order.
+
+    Parameters:
+    -----------
+    sentences : list
+        List of sentences, each a list of words
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables
+
+    Returns:
+    --------
+    list
+        One (tag sequence, log probability) tuple per sentence, same as viterbi_decode
+    """
+    tags = viterbi_tables["tags"]
+    results = [([], 0.0) for _ in sentences]
+
+    # Longest sentences first, so the sentences still running at any position are a prefix
+    lengths = np.array([len(words) for words in sentences], dtype=np.intp)
+    order = np.argsort(-lengths, kind="stable")
+    decoded = int(np.count_nonzero(lengths))
+
+    start = 0
+    while start < decoded:
+        longest = int(lengths[order[start]])
+        # Bucket ends at the first sentence short enough to be mostly padding, or at the size cap
+        end = int(np.searchsorted(-lengths[order], -(longest / BATCH_PADDING_FACTOR), side="right"))
+        end = min(end, decoded, start + max(1, BATCH_MAX_TOKENS // longest))
+
+        bucket = order[start:end]
+        token_ids, bucket_lengths = encode_sentences(
+            [sentences[index] for index in bucket], viterbi_tables["word_to_id"],
+            viterbi_tables.get("unknown_class_offset")
+        )
+        paths, best_scores = _viterbi_decode_bucket(token_ids, bucket_lengths, viterbi_tables)
+
+        for row, (index, length) in enumerate(zip(bucket, bucket_lengths)):
+            results[index] = ([tags[tag_id] for tag_id in paths[row, :length]], float(best_scores[row]))
+
+        start = end
+
+    return results
+
+
+# ===== BEAM SEARCH, N-BEST & TAG DICTIONARY =====
+
+def build_tag_dictionary(pos_count, tag_index=DEFAULT_TAG_INDEX, min_count=1):
+    """
+    Map every tagged word to the tags it was seen with
+
+    Parameters:
+    -----------
+    pos_count : dict
+        POS count dictionary
+        Format: {"word": {'n': count, 'v': count, 'm': count}}
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
+    min_count : int
+        Times a word must be seen with a tag for the tag to be allowed
+
+    Returns:
+    --------
+    dict
+        Format: {"word": numpy array of allowed tag ids}
+        Words seen with no tag at least min_count times are left out, so they
+        are decoded like unseen words
+    """
+    tag_shorts = tag_index["short_forms"]
+    tag_dictionary = {}
+
+    for word, counts in pos_count.items():
+        allowed = np.flatnonzero([counts.get(tag_short, 0) >= min_count for tag_short in tag_shorts])
+        if len(allowed):
+            tag_dictionary[word.lower()] = allowed
+
+    return tag_dictionary
+
+
+def viterbi_decode_beam(words, viterbi_tables, beam_width=None, score_threshold=None, n_best=1,
+                        tag_dictionary=None):
+    """
+    Decode a sentence keeping only the most promising partial paths, optionally returning the n best
+
+    Every step only extends the surviving paths with the candidate tags of the
+    next word: tags allowed by the tag dictionary (all tags for words it does not
+    know) whose emission is not ZERO. Each tag keeps its n_best best paths, then
+    the beam drops paths scoring more than score_threshold below the best one and
+    keeps at most beam_width of the rest.
+
+    Without a beam, threshold or dictionary the result is exact: n_best=1 gives
+    the same path as viterbi_decode and n_best=k the k most likely paths.
+
+    Parameters:
+    -----------
+    words : list
+        List of words in the sentence
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables
+    beam_width : int, optional
+        Paths kept after each word (default: no limit)
+    score_threshold : float, optional
+        Drop paths whose log probability is this far below the best path (default: no limit)
+    n_best : int
+        Number of tag sequences to return
+    tag_dictionary : dict, optional
+        Allowed tag ids per word from build_tag_dictionary
+
+    Returns:
+    --------
+    list
+        Up to n_best (tag sequence, log probability) tuples, best first
+        Empty when no path survives (e.g. unseen words with unsmoothed tables)
+    """
+    if not words:
+        return [([], 0.0)]
+
+    tags = viterbi_tables["tags"]
+    all_tags = np.arange(len(tags))
+    log_emission = viterbi_tables["log_emission"]
+    log_transition = viterbi_tables["log_transition"]
+    unknown_class_offset = viterbi_tables.get("unknown_class_offset")
+    tag_dictionary = tag_dictionary or {}
+
+    # Surviving paths: score, last tag, and the path they extend at the previous position
+    scores = np.zeros(1)
+    path_tags = None
+    history = []
+
+    for position, word in enumerate(words):
+        row = lookup_word_row(word, viterbi_tables["word_to_id"], unknown_class_offset)
+        if row < 0:
+            return []
+
+        # Tags the dictionary allows always have counts, so only the full tagset needs the ZERO check
+        emission = log_emission[row]
+        candidates = tag_dictionary.get(word.lower())
+        if candidates is None:
+            candidates = all_tags[emission > -np.inf]
+        emission = emission.take(candidates)
+        if not len(candidates):
+            return []
+
+        # (paths x candidate tags) scores of every extension
+        if path_tags is None:
+            extended = (viterbi_tables["log_start"].take(candidates) + emission)[None, :]
+        else:
+            extended = log_transition.take(path_tags, axis=0).take(candidates, axis=1)
+            extended += scores[:, None]
+            extended += emission
+
+        if n_best == 1:
+            # One path per tag: a plain max over the surviving paths, like viterbi_decode.
+            # Paths that became ZERO are not filtered here (the beam drops them first and
+            # the final step ignores them), which keeps this loop to a few small array calls
+            if len(extended) == 1:
+                previous = np.zeros(len(candidates), dtype=np.intp)
+                scores = extended[0]
+            else:
+                previous = extended.argmax(axis=0)
+                scores = extended.max(axis=0)
+            path_tags = candidates
+
+            if score_threshold is not None:
+                alive = np.flatnonzero(scores >= scores.max() - score_threshold)
+                if len(alive) < len(scores):
+                    previous, scores, path_tags = previous.take(alive), scores.take(alive), path_tags.take(alive)
+            if beam_width is not None and len(scores) > beam_width:
+                kept = np.argpartition(-scores, beam_width - 1)[:beam_width]
+                previous, scores, path_tags = previous.take(kept), scores.take(kept), path_tags.take(kept)
+
+            history.append((path_tags, previous))
+            continue
+
+        # The n_best best paths into each candidate tag
+        if extended.shape[0] > n_best:
+            kept = np.argpartition(-extended, n_best - 1, axis=0)[:n_best]
+        else:
+            kept = np.broadcast_to(np.arange(extended.shape[0])[:, None], extended.shape)
+        columns = np.broadcast_to(np.arange(len(candidates)), kept.shape)
+
+        previous = kept.ravel()
+        scores = extended[kept, columns].ravel()
+        path_tags = candidates[columns.ravel()]
+
+        alive = np.isfinite(scores)
+        if alive.any() and score_threshold is not None:
+            alive &= scores >= scores[alive].max() - score_threshold
+        order = np.flatnonzero(alive)
+        if beam_width is not None and len(order) > beam_width:
+            order = order[np.argpartition(-scores[order], beam_width - 1)[:beam_width]]
+
+        if not len(order):
+            return []
+
+        previous, scores, path_tags = previous[order], scores[order], path_tags[order]
+        history.append((path_tags, previous))
+
+    final = scores + viterbi_tables["log_end"][path_tags]
+    finished = np.flatnonzero(np.isfinite(final))
+    finished = finished[np.argsort(-final[finished], kind="stable")[:n_best]]
+
+    results = []
+    for path_id in finished:
+        score = float(final[path_id])
+        path = []
+        for step_tags, step_previous in reversed(history):
+            path.append(int(step_tags[path_id]))
+            path_id = step_previous[path_id]
+        path.reverse()
+        results.append(([tags[tag_id] for tag_id in path], score))
+
+    return results
+
+
+# ===== FORWARD-BACKWARD (TAG POSTERIORS) =====
+
+def _emission_likelihoods(token_ids, log_emission):
+    """
+    (batch x length x tags) P(word | tag) for a padded id matrix
+    Unseen words and padding get 1 for every tag, so they carry no evidence
+    """
+    emissions = np.exp(log_emission[np.maximum(token_ids, 0)])
+    emissions[token_ids < 0] = 1.0
+    return emissions
+
+
+def _forward_backward(emissions, lengths, viterbi_tables):
+    """
+    Scaled forward-backward over a padded batch
+
+    Every forward step is renormalized to sum to 1 and the backward pass is divided
+    by the same factors, so nothing underflows however long the sentence is and
+    alpha * beta is directly the tag posterior.
+
+    Parameters:
+    -----------
+    emissions : numpy.ndarray
+        (batch x length x tags) emission likelihoods from _emission_likelihoods
+    lengths : numpy.ndarray
+        (batch,) real sentence lengths, all at least 1
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables
+
+    Returns:
+    --------
+    dict
+        {"alpha", "beta": (batch x length x tags), "scales": (batch x length),
+         "valid": (batch x length) mask of real tokens, "log_likelihood": (batch,)}
+        Padding positions of alpha and beta are 0, and so is every position of a
+        sentence the model gives no path (log likelihood -inf)
+    """
+    start = np.exp(viterbi_tables["log_start"])
+    transition = np.exp(viterbi_tables["log_transition"])
+    end = np.exp(viterbi_tables["log_end"])
+
+    batch_size, max_length, n_tags = emissions.shape
+    batch_rows = np.arange(batch_size)
+    valid = np.arange(max_length) < lengths[:, None]
+
+    # Forward: alpha_t = (alpha_t-1 @ A) * E_t, scaled by c_t = sum(alpha_t)
+    alpha = np.zeros((batch_size, max_length, n_tags))
+    scales = np.ones((batch_size, max_length))
+    impossible = np.zeros(batch_size, dtype=bool)
+    current = start * emissions[:, 0]
+    for position in range(max_length):
+        if position > 0:
+            current = (alpha[:, position - 1] @ transition) * emissions[:, position]
+        scale = current.sum(axis=1)
+        impossible |= valid[:, position] & (scale <= 0)
+        scale = np.where(valid[:, position] & (scale > 0), scale, 1.0)
+        scales[:, position] = scale
+        alpha[:, position] = np.where(valid[:, position, None], current / scale[:, None], 0.0)
+
+    last_position = lengths - 1
+    end_scale = alpha[batch_rows, last_position] @ end
+    impossible |= end_scale <= 0
+    end_scale = np.where(impossible, 1.0, end_scale)
+
+    # Backward: beta_t = A @ (E_t+1 * beta_t+1) / c_t+1, starting from the 'end' transitions
+    beta = np.zeros((batch_size, max_length, n_tags))
+    for position in range(max_length - 1, -1, -1):
+        if position + 1 < max_length:
+            following = emissions[:, position + 1] * beta[:, position + 1] / scales[:, position + 1, None]
+            beta[:, position] = np.where(valid[:, position, None], following @ transition.T, 0.0)
+        is_last = last_position == position
+        beta[is_last, position] = end / end_scale[is_last, None]
+
+    alpha[impossible] = 0.0
+    beta[impossible] = 0.0
+
+    return {
+        "alpha": alpha,
+        "beta": beta,
+        "scales": scales,
+        "valid": valid,
+        "log_likelihood": np.where(impossible, -np.inf, np.log(scales).sum(axis=1) + np.log(end_scale))
+    }
+
+
+@timed(items=lambda sentences, *args, **kwargs: len(sentences))
+def forward_backward_batch(sentences, viterbi_tables):
+    """
+    Per-token tag posteriors P(tag at position | whole sentence) for a batch of sentences
+    Runs scaled forward-backward on the whole padded batch with one
+    (batch x tags) @ (tags x tags) product per position and direction
+
+    Parameters:
+    -----------
+    sentences : list
+        List of sentences, each a list of words
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables
+        Words without a row (unseen and no smoothing) only get their posterior from the transitions
+
+    Returns:
+    --------
+    list
+        One (posteriors, log likelihood) tuple per sentence
+        posteriors is a (sentence length x tags) array whose rows sum to 1,
+        log likelihood is log P(sentence)
+        A sentence the model gives no path has all-zero posteriors and -inf
+    """
+    results = [(np.zeros((0, len(viterbi_tables["tags"]))), 0.0) for _ in sentences]
+    rows = [row for row, words in enumerate(sentences) if words]
+    if not rows:
+        return results
+
+    token_ids, lengths = encode_sentences(
+        [sentences[row] for row in rows], viterbi_tables["word_to_id"], viterbi_tables.get("unknown_class_offset")
+    )
+    passes = _forward_backward(_emission_likelihoods(token_ids, viterbi_tables["log_emission"]),
+                               lengths, viterbi_tables)
+    posteriors = passes["alpha"] * passes["beta"]
+
+    for batch_row, (row, length) in enumerate(zip(rows, lengths)):
+        results[row] = (posteriors[batch_row, :length], float(passes["log_likelihood"][batch_row]))
+
+    return results
+
+
+@timed(items=lambda token_ids, *args, **kwargs: len(token_ids))
+def expected_counts_batch(token_ids, lengths, viterbi_tables):
+    """
+    E-step of Baum-Welch: expected emission and transition counts of a batch
+
+    The transition counts are summed over the batch and every position with one
+    (tags x batch*length) @ (batch*length x tags) product, the emission counts
+    with one scatter-add of the token posteriors.
+
+    Parameters:
+    -----------
+    token_ids : numpy.ndarray
+        (batch x longest sentence) word rows from encode_sentences, -1 for padding
+    lengths : numpy.ndarray
+        (batch,) real sentence lengths
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables holding the current parameters
+
+    Returns:
+    --------
+    dict
+        {"emission": (rows of log_emission x tags), "start": (tags,),
+         "transition": (tags x tags), "end": (tags,), "log_likelihood": float,
+         "sentences": int}
+        Sentences the model gives no path are skipped and not counted
+    """
+    n_rows, n_tags = viterbi_tables["log_emission"].shape
+    counts = {
+        "emission": np.zeros((n_rows, n_tags)),
+        "start": np.zeros(n_tags),
+        "transition": np.zeros((n_tags, n_tags)),
+        "end": np.zeros(n_tags),
+        "log_likelihood": 0.0,
+        "sentences": 0
+    }
+
+    keep = lengths > 0
+    token_ids, lengths = token_ids[keep], lengths[keep]
+    if not len(lengths):
+        return counts
+
+    max_length = int(lengths.max())
+    token_ids = token_ids[:, :max_length]
+    emissions = _emission_likelihoods(token_ids, viterbi_tables["log_emission"])
+    passes = _forward_backward(emissions, lengths, viterbi_tables)
+
+    # Drop sentences with no path, they would only add -inf to the likelihood
+    possible = np.isfinite(passes["log_likelihood"])
+    if not possible.all():
+        token_ids, lengths, emissions = token_ids[possible], lengths[possible], emissions[possible]
+        passes = {name: values[possible] for name, values in passes.items()}
+    if not len(lengths):
+        return counts
+
+    alpha, beta, valid = passes["alpha"], passes["beta"], passes["valid"]
+    posteriors = alpha * beta
+    batch_rows = np.arange(len(lengths))
+
+    seen = valid & (token_ids >= 0)
+    np.add.at(counts["emission"], token_ids[seen], posteriors[seen])
+    counts["start"] = posteriors[:, 0].sum(axis=0)
+    counts["end"] = posteriors[batch_rows, lengths - 1].sum(axis=0)
+
+    # xi_t(i, j) = alpha_t(i) A(i, j) E_t+1(j) beta_t+1(j) / c_t+1, summed over every pair at once
+    following = emissions[:, 1:] * beta[:, 1:] / passes["scales"][:, 1:, None]
+    counts["transition"] = np.exp(viterbi_tables["log_transition"]) * (
+        alpha[:, :-1].reshape(-1, n_tags).T @ following.reshape(-1, n_tags)
+    )
+    counts["log_likelihood"] = float(passes["log_likelihood"].sum())
+    counts["sentences"] = int(len(lengths))
+
+    return counts
+
+
+# ===== TRIGRAM (SECOND-ORDER) HMM =====
+
+def calculate_trigram_count(all_tagged_sentences, tag_index=DEFAULT_TAG_INDEX):
+    """
+    Count tag trigrams (tag_{i-2}, tag_{i-1} -> tag_i) from tagged sentences
+
+    Every sentence is padded with two 'start' tags in front and one 'end' tag
+    behind, so "Noun Verb" gives (start, start, Noun), (start, Noun, Verb)
+    and (Noun, Verb, end).
+
+    Parameters:
+    -----------
+    all_tagged_sentences : list
+        List of dictionaries containing tagged sentences
+        Format: [{"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}, ...]
+    tag_index : dict
+        Tag index from build_tag_index (default: the dashboard's 3 tags)
+
+    Returns:
+    --------
+    numpy.ndarray
+        (tags + 1 x tags + 1 x tags + 1) counts; index len(tags) is 'start'
+        on the first two axes and 'end' on the last
+    """
+    tag_to_id = tag_index["tag_to_id"]
+    boundary = len(tag_index["tags"])
+    first, second, third = [], [], []
+
+    for sentence in all_tagged_sentences:
+        pos_tags = sentence["tags"]
+        tag_ids = [tag_to_id[pos_tags[word_idx]] for word_idx in range(len(sentence["words"]))
+                   if pos_tags[word_idx] in tag_to_id]
+        if not tag_ids:
+            continue
+
+        padded = [boundary, boundary] + tag_ids + [boundary]
+        first.extend(padded[:-2])
+        second.extend(padded[1:-1])
+        third.extend(padded[2:])
+
+    trigram_counts = np.zeros((boundary + 1,) * 3, dtype=np.int64)
+    np.add.at(trigram_counts, (first, second, third), 1)
+    return trigram_counts
+
+
+def _ngram_marginals(trigram_counts):
+    """Bigram, unigram and context counts implied by a trigram count tensor"""
+    bigram_counts = trigram_counts.sum(axis=0)
+    unigram_counts = bigram_counts.sum(axis=0)
+    return {
+        "bigram": bigram_counts,
+        "unigram": unigram_counts,
+        "pair_context": trigram_counts.sum(axis=2),
+        "single_context": bigram_counts.sum(axis=1),
+        "total": unigram_counts.sum()
+    }
+
+
+def deleted_interpolation_weights(trigram_counts):
+    """
+    Estimate trigram/bigram/unigram mixing weights by deleted interpolation (Brants, 2000)
+
+    Every seen trigram is removed from the counts once and votes, with its
+    count, for whichever of the unigram, bigram or trigram estimates would
+    still have predicted it best. All trigrams are scored at once.
+
+    Parameters:
+    -----------
+    trigram_counts : numpy.ndarray
+        Tensor from calculate_trigram_count (or HMMModel.trigram_counts)
+
+    Returns:
+    --------
+    tuple
+        (unigram weight, bigram weight, trigram weight), summing to 1
+        (plain bigram weights (0, 1, 0) when there are no trigrams yet)
+    """
+    marginals = _ngram_marginals(trigram_counts)
+    first, second, third = np.nonzero(trigram_counts)
+    counts = trigram_counts[first, second, third].astype(float)
+
+    def held_out(numerator, denominator):
+        return np.divide(numerator - 1.0, denominator - 1.0,
+                         out=np.zeros(len(counts)), where=denominator > 1)
+
+    estimates = np.stack([
+        held_out(marginals["unigram"][third].astype(float), np.full(len(counts), float(marginals["total"]))),
+        held_out(marginals["bigram"][second, third].astype(float), marginals["single_context"][second].astype(float)),
+        held_out(counts, marginals["pair_context"][first, second].astype(float))
+    ])
+
+    weights = np.bincount(estimates.argmax(axis=0), weights=counts, minlength=3)
+    if weights.sum() == 0:
+        return 0.0, 1.0, 0.0
+
+    weights = weights / weights.sum()
+    return float(weights[0]), float(weights[1]), float(weights[2])
+
+
+def build_trigram_tables(viterbi_tables, trigram_counts, weights=None):
+    """
+    Add interpolated second-order transitions to a set of decoder tables
+    P(c | a, b) = w3 * P(c | a, b) + w2 * P(c | b) + w1 * P(c), each estimated from the counts
+
+    Parameters:
+    -----------
+    viterbi_tables : dict
+        Decoder tables from build_viterbi_tables or HMMModel.viterbi_tables (emissions are reused)
+    trigram_counts : numpy.ndarray
+        Tensor from calculate_trigram_count
+    weights : tuple, optional
+        (unigram, bigram, trigram) weights (default: deleted_interpolation_weights)
+
+    Returns:
+    --------
+    dict
+        The decoder tables plus "log_trigram" ((tags + 1)^3, index len(tags) is
+        'start' on the first two axes and 'end' on the last) and "interpolation_weights"
+    """
+    if weights is None:
+        weights = deleted_interpolation_weights(trigram_counts)
+
+    marginals = _ngram_marginals(trigram_counts)
+    trigram_probability = np.divide(
+        trigram_counts, marginals["pair_context"][:, :, None],
+        out=np.zeros(trigram_counts.shape), where=marginals["pair_context"][:, :, None] > 0
+    )
+    bigram_probability = np.divide(
+        marginals["bigram"], marginals["single_context"][:, None],
+        out=np.zeros(marginals["bigram"].shape), where=marginals["single_context"][:, None] > 0
+    )
+    unigram_probability = marginals["unigram"] / max(marginals["total"], 1)
+
+    # Histories never seen as a context share their weight out among the estimates that exist,
+    # so every row stays a proper distribution
+    unigram_weight, bigram_weight, trigram_weight = weights
+    trigram_weights = trigram_weight * (marginals["pair_context"] > 0)[:, :, None]
+    bigram_weights = np.broadcast_to(bigram_weight * (marginals["single_context"] > 0)[None, :, None],
+                                     trigram_weights.shape)
+    weight_totals = trigram_weights + bigram_weights + unigram_weight
+    weight_totals[weight_totals == 0] = 1.0
+
+    probability = (trigram_weights * trigram_probability
+                   + bigram_weights * bigram_probability[None, :, :]
+                   + unigram_weight * unigram_probability[None, None, :]) / weight_totals
+
+    with np.errstate(divide='ignore'):
+        return {
+            **viterbi_tables,
+            "log_trigram": np.log(probability),
+            "interpolation_weights": tuple(weights)
+        }
+
+
+def viterbi_decode_trigram(words, trigram_tables, beam=None, tag_dictionary=None):
+    """
+    Find the most likely tag sequence under the second-order (trigram) HMM
+
+    Lattice states are (previous tag, current tag) pairs. Each step only scores
+    the live pairs, gathered as flat index arrays, against the candidate next
+    tags: pairs that are already impossible (or, with a beam, far behind the
+    best one) are never touched, and neither are tags the next word cannot
+    emit or the tag dictionary rules out. The best history for every
+    (current, next) pair is then a grouped max over the pairs sharing the
+    current tag, so the work per token follows the live pairs x candidates
+    instead of T^3.
+
+    Parameters:
+    -----------
+    words : list
+        List of words in the sentence
+    trigram_tables : dict
+        Tables from build_trigram_tables or HMMModel.trigram_tables
+    beam : float, optional
+        Drop pairs scoring more than beam below the best pair (log space);
+        None keeps every possible pair, which is exact
+    tag_dictionary : dict, optional
+        Allowed tag ids per word from build_tag_dictionary
+
+    Returns:
+    --------
+    tuple
+        (best tag sequence as a list of full tag names, log probability of that path)
+    """
+    if not words:
+        return [], 0.0
+
+    tags = trigram_tables["tags"]
+    n_tags = len(tags)
+    boundary = n_tags
+    log_trigram = trigram_tables["log_trigram"]
+    log_emission = trigram_tables["log_emission"]
+    word_to_id = trigram_tables["word_to_id"]
+    unknown_class_offset = trigram_tables.get("unknown_class_offset")
+    tag_dictionary = tag_dictionary or {}
+
+    unseen = np.full(n_tags, -np.inf)
+    rows = [lookup_word_row(word, word_to_id, unknown_class_offset) for word in words]
+    emissions = [log_emission[row] if row >= 0 else unseen for row in rows]
+    all_tags = np.arange(n_tags)
+    all_pairs = np.indices((n_tags + 1, n_tags)).reshape(2, -1)
+
+    # delta[a, b] = best path ending with tags (a, b); row 'start' is only used before the first word
+    # The first word is restricted by the tag dictionary like every later one
+    delta = np.full((n_tags + 1, n_tags), -np.inf)
+    candidates = tag_dictionary.get(words[0].lower(), all_tags)
+    delta[boundary, candidates] = log_trigram[boundary, boundary, candidates] + emissions[0][candidates]
+    backpointers = []
+
+    for position in range(1, len(words)):
+        if beam is not None:
+            delta[delta < delta.max() - beam] = -np.inf
+
+        candidates = tag_dictionary.get(words[position].lower(), all_tags)
+        candidates = candidates[np.isfinite(emissions[position][candidates])]
+
+        # Live pairs sorted by their current tag b, so every b is one contiguous group
+        current_ids, history_ids = np.nonzero(np.isfinite(delta.T))
+
+        # Nothing is possible any more: keep going over every state so a path is still returned
+        if len(current_ids) == 0 or len(candidates) == 0:
+            history_ids, current_ids = all_pairs
+            order = np.argsort(current_ids, kind="stable")
+            history_ids, current_ids = history_ids[order], current_ids[order]
+            candidates = all_tags
+
+        # (live pairs x candidates) scores, then the best pair per (b, c)
+        scores = delta[history_ids, current_ids][:, None] + log_trigram[history_ids, current_ids][:, candidates]
+        group_starts = np.flatnonzero(np.r_[True, current_ids[1:] != current_ids[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, len(current_ids)])
+        best_scores = np.maximum.reduceat(scores, group_starts, axis=0)
+
+        is_best = scores == np.repeat(best_scores, group_sizes, axis=0)
+        best_rows = np.minimum.reduceat(np.where(is_best, np.arange(len(scores))[:, None], len(scores)),
+                                         group_starts, axis=0)
+
+        group_currents = current_ids[group_starts][:, None]
+        delta = np.full((n_tags + 1, n_tags), -np.inf)
+        delta[group_currents, candidates] = best_scores + emissions[position][candidates]
+
+        backpointer = np.zeros((n_tags, n_tags), dtype=np.intp)
+        backpointer[group_currents, candidates] = history_ids[best_rows]
+        backpointers.append(backpointer)
+
+    final = delta + log_trigram[:, :n_tags, boundary]
+    previous, current = np.unravel_index(int(final.argmax()), final.shape)
+    best_score = float(final[previous, current])
+
+    path = [int(current)]
+    if len(words) > 1:
+        path.append(int(previous))
+    for position in range(len(words) - 1, 1, -1):
+        earlier = int(backpointers[position - 1][previous, current])
+        path.append(earlier)
+        previous, current = earlier, previous
+    path.reverse()
+
+    return [tags[tag_id] for tag_id in path], best_score
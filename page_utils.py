@@ -0,0 +1,163 @@
+"""
+Shared Page Helpers
+Caches the assets, models and tables that every Streamlit rerun would otherwise rebuild
+"""
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from instrumentation import MetricsRegistry, activate_session_metrics, cache_lookup, cache_miss, timer
+from word2vec import Word2Vec
+
+
+def _file_key(path):
+    """Cheap cache key that changes whenever the file is edited (modification time and size)"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# ===== METRICS =====
+
+def track_session():
+    """
+    Record this session's metrics in its own registry as well as process-wide
+    Call once at the top of every page, the diagnostics page shows both
+
+    Returns:
+    --------
+    MetricsRegistry
+        The session's registry
+    """
+    if "metrics" not in st.session_state:
+        st.session_state.metrics = MetricsRegistry()
+    activate_session_metrics(st.session_state.metrics)
+    return st.session_state.metrics
+
+
+# ===== STATIC ASSETS (read once per process) =====
+
+@st.cache_resource(show_spinner=False)
+def _read_text(path, file_key):
+    cache_miss("asset_files")
+    with open(path, "r") as text_file:
+        return text_file.read()
+
+
+@st.cache_resource(show_spinner=False)
+def _read_bytes(path, file_key):
+    cache_miss("asset_files")
+    with open(path, "rb") as binary_file:
+        return binary_file.read()
+
+
+def load_css(path="styles.css"):
+    """
+    Inject the dashboard CSS into the page
+    The file is read from disk once per process and again only after it changes
+
+    Parameters:
+    -----------
+    path : str
+        CSS file path (default: styles.css)
+    """
+    cache_lookup("asset_files")
+    st.markdown(f"<style>{_read_text(path, _file_key(path))}</style>", unsafe_allow_html=True)
+
+
+def load_image(path):
+    """
+    Read an image once per process for st.image
+
+    Parameters:
+    -----------
+    path : str
+        Image file path
+
+    Returns:
+    --------
+    bytes
+        Raw image file contents
+    """
+    cache_lookup("asset_files")
+    return _read_bytes(path, _file_key(path))
+
+
+# ===== MODELS (shared by every session in the process) =====
+
+# Models are keyed on user-typed text, so only the most recent few are kept
+WORD2VEC_CACHE_ENTRIES = 8
+WORD2VEC_CACHE_TTL = 3600
+
+
+@st.cache_resource(show_spinner="Training Word2Vec...", max_entries=WORD2VEC_CACHE_ENTRIES,
+                   ttl=WORD2VEC_CACHE_TTL)
+def _train_word2vec(corpus_text, architecture, vector_size, window, epochs):
+    cache_miss("word2vec_models")
+    sentences = [line.lower().split() for line in corpus_text.splitlines() if line.strip()]
+    model = Word2Vec(vector_size=vector_size, window=window, architecture=architecture, batch_size=64)
+    with timer("Word2Vec.train", items=len(sentences)):
+        return model.train(sentences, epochs=epochs)
+
+
+def train_word2vec(corpus_text, architecture="skipgram", vector_size=50, window=2, epochs=20):
+    """
+    Train a small Word2Vec model on text typed into a page
+    Cached by corpus and settings, so reruns and other sessions reuse the same model
+    (at most WORD2VEC_CACHE_ENTRIES models are kept, each for WORD2VEC_CACHE_TTL seconds)
+
+    Parameters:
+    -----------
+    corpus_text : str
+        One sentence per line
+    architecture : str
+        'cbow' or 'skipgram'
+    vector_size : int
+        Embedding dimensions
+    window : int
+        Context window
+    epochs : int
+        Passes over the corpus
+
+    Returns:
+    --------
+    Word2Vec
+        Trained model
+    """
+    cache_lookup("word2vec_models")
+    return _train_word2vec(corpus_text, architecture, vector_size, window, epochs)
+
+
+# ===== TABLES (rebuilt only when their contents change) =====
+
+# Session tables land in the same process-wide cache, so keep it bounded:
+# the least recently used tables are evicted and idle ones expire
+DATAFRAME_CACHE_ENTRIES = 256
+DATAFRAME_CACHE_TTL = 3600
+
+
+@st.cache_data(show_spinner=False, max_entries=DATAFRAME_CACHE_ENTRIES, ttl=DATAFRAME_CACHE_TTL)
+def _build_dataframe(table_data):
+    cache_miss("dataframes")
+    return pd.DataFrame(table_data)
+
+
+def build_dataframe(table_data):
+    """
+    Build a DataFrame from table data, cached by the content hash of the data
+    Static example tables are built once, session tables only when they change
+    (at most DATAFRAME_CACHE_ENTRIES tables are kept, each for DATAFRAME_CACHE_TTL seconds)
+
+    Parameters:
+    -----------
+    table_data : dict or list
+        Column dict or list of row dicts, as accepted by pd.DataFrame
+
+    Returns:
+    --------
+    pandas.DataFrame
+        New DataFrame (a fresh copy per call, safe to style)
+    """
+    cache_lookup("dataframes")
+    return _build_dataframe(table_data)
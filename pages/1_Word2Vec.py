@@ -1,10 +1,14 @@
 import streamlit as st
+from instrumentation import timer
+from page_utils import load_css, load_image, train_word2vec, track_session
 
 st.set_page_config(page_title="Word2Vec", layout="wide", initial_sidebar_state="collapsed")
 
-# Load CSS from external file
-with open("styles.css", "r") as css_file:
-    st.markdown(f"<style>{css_file.read()}</style>", unsafe_allow_html=True)
+track_session()
+
+# Load CSS from external file (read once per process)
+load_css()
+render = timer("page.word2vec")
 
 # ===== HEADER =====
 st.markdown("# 🔤 Word2Vec – CBOW & Skip-Gram", unsafe_allow_html=True)
@@ -90,7 +94,7 @@ Example Sentence: <strong>Watch Campusx for</strong> Data Science
     <div class='image-wrapper'>
 """, unsafe_allow_html=True)
 
-st.image("images/image_1.png")
+st.image(load_image("images/image_1.png"))
 
 st.markdown("""
     </div>
@@ -161,6 +165,63 @@ with col2:
     """, unsafe_allow_html=True)
 
 
+# ===== TRAIN YOUR OWN SECTION =====
+# Train CBOW or Skip-Gram on a small corpus and look up the nearest words
+st.markdown("## 🧪 Train Your Own Word2Vec")
+
+demo_corpus = "\n".join([
+    "the king rules the kingdom",
+    "the queen rules the kingdom",
+    "the king is a man",
+    "the queen is a woman",
+    "the prince is a young man",
+    "the princess is a young woman",
+    "a man walks the dog",
+    "a woman walks the dog",
+    "the dog chases the cat",
+    "the cat chases the mouse",
+    "the dog eats food",
+    "the cat eats food",
+])
+
+corpus_text = st.text_area("Corpus (one sentence per line):", value=demo_corpus, height=250, key="w2v_corpus")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    architecture = st.radio("Architecture", options=["skipgram", "cbow"], horizontal=True, key="w2v_architecture")
+with col2:
+    window = st.slider("Window", min_value=1, max_value=5, value=2, key="w2v_window")
+with col3:
+    epochs = st.slider("Epochs", min_value=1, max_value=100, value=50, key="w2v_epochs")
+
+if corpus_text.strip():
+    w2v_model = train_word2vec(corpus_text, architecture=architecture, window=window, epochs=epochs)
+
+    if w2v_model.vocabulary:
+        query_word = st.selectbox("Find words similar to:", options=w2v_model.vocabulary, key="w2v_query")
+        st.markdown(" • ".join(
+            f"<span class='highlight'>{word}</span> ({similarity:.2f})"
+            for word, similarity in w2v_model.most_similar(query_word, topn=5)
+        ), unsafe_allow_html=True)
+
+        # Vector arithmetic, like king − man + woman ≈ queen
+        st.markdown("**Vector Arithmetic:** A − B + C ≈ ?")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            word_a = st.selectbox("A", options=w2v_model.vocabulary, key="w2v_analogy_a")
+        with col2:
+            word_b = st.selectbox("− B", options=w2v_model.vocabulary, key="w2v_analogy_b")
+        with col3:
+            word_c = st.selectbox("+ C", options=w2v_model.vocabulary, key="w2v_analogy_c")
+
+        if len({word_a, word_b, word_c}) == 3:
+            answers = w2v_model.word_vectors().analogy(word_b, word_a, word_c, topn=3)
+            st.markdown(
+                f"<span class='highlight'>{word_a} − {word_b} + {word_c}</span> ≈ "
+                + ", ".join(f"{word} ({similarity:.2f})" for word, similarity in answers),
+                unsafe_allow_html=True
+            )
+
 # ===== FOOTER =====
 st.markdown("<hr style='border-color: rgba(0, 212, 255, 0.2); margin: 60px 0;'>", unsafe_allow_html=True)
 
@@ -173,4 +234,7 @@ with col2:
     st.page_link("pages/2_pos_tagging.py", label="🏷️ POS Tagging →")
 
 with col3:
-    pass
\ No newline at end of file
+    pass
+
+# ===== RENDER TIMING =====
+render.stop()
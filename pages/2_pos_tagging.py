@@ -4,16 +4,19 @@ Display-only examples of POS tagging without user interaction
 """
 
 import streamlit as st
-import pandas as pd
+from instrumentation import timer
+from page_utils import load_css, build_dataframe, track_session
 
 # ===== PAGE CONFIGURATION =====
 # Set up the Streamlit page with title and layout settings
 st.set_page_config(page_title="POS Tagging", layout="wide", initial_sidebar_state="collapsed")
 
+track_session()
+
 # ===== LOAD EXTERNAL CSS =====
-# Load custom CSS styles from styles.css file to style the application
-with open("styles.css", "r") as css_file:
-    st.markdown(f"<style>{css_file.read()}</style>", unsafe_allow_html=True)
+# Load custom CSS styles from styles.css file to style the application (read once per process)
+load_css()
+render = timer("page.pos_tagging")
 
 # ===== HEADER SECTION =====
 # Display the main title and subtitle with custom styling
@@ -159,7 +162,7 @@ emission_data = {
     "P(Modal Aux)": [0.0, 0.0, 0.0, 1.0, 1.0, 0.0]
 }
 
-emission_df = pd.DataFrame(emission_data)
+emission_df = build_dataframe(emission_data)
 
 
 # Style the emission probability table
@@ -194,7 +197,7 @@ transition_data = {
     "→ End": [0.5, 0.5, 0.5, 0.0]
 }
 
-transition_df = pd.DataFrame(transition_data)
+transition_df = build_dataframe(transition_data)
 
 styled_transition_df = transition_df.style.format({
     "→ Noun": "{:.1f}",
@@ -234,4 +237,7 @@ with col1:
 
 with col2:
     if st.button("← Back to Home", width='stretch'):
-        st.switch_page("streamlit_app.py")
\ No newline at end of file
+        st.switch_page("streamlit_app.py")
+
+# ===== RENDER TIMING =====
+render.stop()
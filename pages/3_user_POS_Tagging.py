@@ -11,22 +11,23 @@ For `use_container_width=True`, use `width='stretch'`. For `use_container_width=
 """
 
 import streamlit as st
-import pandas as pd
-from mathematical_calculation import (
-    update_pos_count,
-    calculate_emission_probability,
-    calculate_transition_count,
-    calculate_transition_probability
-)
+from instrumentation import timer
+from page_utils import load_css, build_dataframe, track_session
+from mathematical_calculation import update_pos_count
+from hmm_model import HMMModel
+from sentence_store import TaggedSentenceStore
+from tokenizer import tokenize
 
 # ===== PAGE CONFIGURATION =====
 # Set up the Streamlit page with title and layout settings
 st.set_page_config(page_title="POS Tagging", layout="wide", initial_sidebar_state="collapsed")
 
+track_session()
+
 # ===== LOAD EXTERNAL CSS =====
-# Load custom CSS styles from styles.css file to style the application
-with open("styles.css", "r") as css_file:
-    st.markdown(f"<style>{css_file.read()}</style>", unsafe_allow_html=True)
+# Load custom CSS styles from styles.css file to style the application (read once per process)
+load_css()
+render = timer("page.user_pos_tagging")
 
 # ===== HEADER SECTION =====
 # Display the main title and subtitle with custom styling
@@ -67,9 +68,9 @@ if 'pos_tags' not in st.session_state:
     st.session_state.pos_tags = {}
 
 # Stores all sentences that have been completely tagged
-# Each sentence contains: {"words": [...], "tags": {...}}
+# Each sentence reads as {"words": [...], "tags": {...}}, but is kept as flat word/tag id arrays
 if 'all_tagged_sentences' not in st.session_state:
-    st.session_state.all_tagged_sentences = []
+    st.session_state.all_tagged_sentences = TaggedSentenceStore()
 
 # Stores the count of each POS tag for each word
 # Format: {"word": {'n': count, 'v': count, 'm': count}}
@@ -81,7 +82,15 @@ if 'pos_count' not in st.session_state:
 if 'emission_probability_table' not in st.session_state:
     st.session_state.emission_probability_table = {}
 
+# Running emission/transition counts, updated once per tagged sentence
+# Probabilities are only derived from it when "Move Forward" reads them
+if 'hmm_model' not in st.session_state:
+    st.session_state.hmm_model = HMMModel()
+    for sentence in st.session_state.all_tagged_sentences:
+        st.session_state.hmm_model.add_sentence(sentence["words"], sentence["tags"])
+
 # ===== DISPLAY PREVIOUSLY TAGGED SENTENCES =====
+section = timer("page.user_pos_tagging.tagged_sentences")
 # Show all sentences that have been tagged so far with colored POS labels
 if st.session_state.all_tagged_sentences:
     st.markdown("### 📋 Tagged Sentences")
@@ -135,6 +144,8 @@ if st.session_state.all_tagged_sentences:
                     unsafe_allow_html=True
                 )
 
+section.stop()
+
 # ===== INPUT SECTION (Only shown when no words are currently being tagged) =====
 if not st.session_state.words:
     # Text input field for user to enter a sentence
@@ -146,9 +157,10 @@ if not st.session_state.words:
 
     # Button to split the sentence into words and start tagging
     if st.button("Split & Tag", width='content'):
-        if sentence_input.strip():
-            # Split the input sentence into individual words
-            st.session_state.words = sentence_input.strip().split()
+        # Split the input sentence into words, dropping punctuation ("cube." -> "cube")
+        words = tokenize(sentence_input, keep_punctuation=False)
+        if words:
+            st.session_state.words = words
 
             # Initialize POS tags for each word as None (not yet selected)
             st.session_state.pos_tags = {i: None for i in range(len(st.session_state.words))}
@@ -244,6 +256,13 @@ else:
                 st.session_state.pos_tags
             )
 
+            # ===== UPDATE RUNNING HMM COUNTS =====
+            # Only this sentence is added, nothing is recounted from earlier sentences
+            st.session_state.hmm_model.add_sentence(
+                st.session_state.words,
+                st.session_state.pos_tags
+            )
+
             # ===== CLEAR FOR NEXT SENTENCE =====
             # Clear the words and tags to reset for the next sentence
             st.session_state.words = []
@@ -256,15 +275,16 @@ else:
         st.info("👉 Tag all words before proceeding to the next sentence")
 
 # ===== MOVE FORWARD SECTION (Only shown after 5+ sentences are tagged) =====
+section = timer("page.user_pos_tagging.tables")
 # Check if at least 5 sentences have been tagged and no current tagging is in progress
 if len(st.session_state.all_tagged_sentences) >= 5 and not st.session_state.words:
     st.markdown("<br><br>", unsafe_allow_html=True)
 
     if st.button("Move Forward", width='stretch', type="primary", key="move_forward_btn"):
         # ===== CALCULATE EMISSION PROBABILITY =====
-        # Call the calculate_emission_probability function from mathematical_calculation.py
+        # Read the emission probabilities from the running HMM counts
         # This calculates the probability of each word appearing with each POS tag
-        st.session_state.emission_probability_table = calculate_emission_probability(st.session_state.pos_count)
+        st.session_state.emission_probability_table = st.session_state.hmm_model.to_emission_probability_table()
 
         # Display success message with count of tagged sentences
         st.success(f"✅ Successfully tagged {len(st.session_state.all_tagged_sentences)} sentences!")
@@ -289,7 +309,7 @@ if len(st.session_state.all_tagged_sentences) >= 5 and not st.session_state.word
             })
 
         # Convert table data to Pandas DataFrame
-        df = pd.DataFrame(table_data)
+        df = build_dataframe(table_data)
 
         # ===== STYLING FUNCTION =====
         # Function to color cells: red for zeros, green for non-zeros
@@ -312,15 +332,11 @@ if len(st.session_state.all_tagged_sentences) >= 5 and not st.session_state.word
         st.dataframe(styled_df, width='stretch', hide_index=True)
 
         # ===== CALCULATE TRANSITION TABLES =====
-        # Calculate transition count table from all tagged sentences
-        st.session_state.transition_count_table = calculate_transition_count(
-            st.session_state.all_tagged_sentences
-        )
+        # Read the transition counts kept up to date while tagging
+        st.session_state.transition_count_table = st.session_state.hmm_model.to_transition_count_table()
 
         # Calculate transition probability table from transition counts
-        st.session_state.transition_probability_table = calculate_transition_probability(
-            st.session_state.transition_count_table
-        )
+        st.session_state.transition_probability_table = st.session_state.hmm_model.to_transition_probability_table()
 
         # ===== DISPLAY TRANSITION PROBABILITY TABLE =====
         st.markdown("### 🔀 Transition Probability Table")
@@ -337,7 +353,7 @@ if len(st.session_state.all_tagged_sentences) >= 5 and not st.session_state.word
             })
 
         # Convert to DataFrame
-        transition_prob_df = pd.DataFrame(transition_prob_data)
+        transition_prob_df = build_dataframe(transition_prob_data)
 
         # ===== STYLING FUNCTION FOR TRANSITION PROBABILITY =====
         # Function to color cells: red for zeros, green for non-zeros
@@ -362,3 +378,8 @@ if len(st.session_state.all_tagged_sentences) >= 5 and not st.session_state.word
 
         # ===== NAVIGATION BUTTONS =====
         st.markdown("<br><br>", unsafe_allow_html=True)
+
+section.stop()
+
+# ===== RENDER TIMING =====
+render.stop()
@@ -4,13 +4,19 @@ Personal Notes Dashboard - Presentation Style
 """
 
 import streamlit as st
+from instrumentation import timer
+from page_utils import load_css, load_image, track_session
+from mathematical_calculation import viterbi_decode, viterbi_decode_beam
+from tokenizer import tokenize
 
 # ===== PAGE CONFIGURATION =====
 st.set_page_config(page_title="HMM & Viterbi Algorithm", layout="wide", initial_sidebar_state="collapsed")
 
+track_session()
+
 # ===== LOAD EXTERNAL CSS =====
-with open("styles.css", "r") as css_file:
-    st.markdown(f"<style>{css_file.read()}</style>", unsafe_allow_html=True)
+load_css()
+render = timer("page.hmm_viterbi")
 
 # ===== HEADER SECTION =====
 st.markdown("# 🤖 HMM & Viterbi Algorithm", unsafe_allow_html=True)
@@ -27,7 +33,7 @@ st.markdown("""
 """
 )
 
-st.image("images/image_3.png", width='stretch')
+st.image(load_image("images/image_3.png"), width='stretch')
 
 # ===== VITERBI ALGORITHM SECTION =====
 st.markdown("## Viterbi Algorithm")
@@ -59,7 +65,7 @@ st.markdown("""
 
 ## Mentos Life (Viterbi) - Smart elimination:
 """)
-st.image("images/image_4.png", width='stretch')
+st.image(load_image("images/image_4.png"), width='stretch')
 
 # Create visual comparison
 col1, col2 = st.columns(2)
@@ -126,9 +132,77 @@ st.markdown("""
 🎯 **That's the power of Viterbi - eliminate zeros early and keep only the best paths!**
 """)
 
+# ===== TRY THE DECODER SECTION =====
+# Decode a sentence with the tables calculated on the user POS Tagging page
+st.markdown("## 🧪 Try Viterbi on Your Own Tables")
+
+if st.session_state.get('transition_probability_table') and 'hmm_model' in st.session_state:
+    # Smoothing gives unseen words and unseen (word, tag) pairs a small probability instead of ZERO
+    smoothing_method = st.selectbox(
+        "Smoothing for unseen words:",
+        options=["None", "add_k", "good_turing", "interpolated"],
+        key="viterbi_smoothing"
+    )
+    st.session_state.hmm_model.set_smoothing(None if smoothing_method == "None" else smoothing_method)
+
+    # Beam search puts "eliminate zeros early and keep only the best paths" into practice
+    decode_mode = st.radio("Decoding mode:", options=["Exact Viterbi", "Beam search"], horizontal=True,
+                           key="viterbi_mode")
+    if decode_mode == "Beam search":
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            beam_width = st.number_input("Beam width (paths kept per word):", min_value=1, value=5,
+                                         key="viterbi_beam_width")
+        with col2:
+            score_threshold = st.number_input("Score threshold (log probability below the best path):",
+                                              min_value=0.0, value=10.0, key="viterbi_score_threshold")
+        with col3:
+            n_best = st.number_input("N-best sequences:", min_value=1, max_value=10, value=3, key="viterbi_n_best")
+        use_tag_dictionary = st.checkbox("Only try the tags each known word was tagged with", value=True,
+                                         key="viterbi_tag_dictionary")
+
+    decode_input = st.text_input(
+        "Enter a sentence to decode:",
+        placeholder="Example: will juliet love google",
+        key="viterbi_input"
+    )
+
+    if decode_input.strip():
+        # The model keeps its decoder tables until another sentence is tagged
+        viterbi_tables = st.session_state.hmm_model.viterbi_tables()
+        decode_words = tokenize(decode_input, keep_punctuation=False)
+
+        tag_dictionary = None
+        if decode_mode == "Beam search" and use_tag_dictionary:
+            # Cached on the model, rebuilt only after new sentences are tagged
+            tag_dictionary = st.session_state.hmm_model.tag_dictionary()
+
+        # One sentence per rerun, timed here rather than inside the decoders
+        with timer("page.hmm_viterbi.decode", items=1):
+            if decode_mode == "Beam search":
+                paths = viterbi_decode_beam(decode_words, viterbi_tables, beam_width=int(beam_width),
+                                            score_threshold=score_threshold, n_best=int(n_best),
+                                            tag_dictionary=tag_dictionary)
+            else:
+                paths = [viterbi_decode(decode_words, viterbi_tables)]
+
+        paths = [(path_tags, path_score) for path_tags, path_score in paths if path_score != float("-inf")]
+        if not paths:
+            st.warning("❌ Every path is ZERO (or was pruned) - some words or transitions were never seen "
+                       "while tagging. Try a smoothing method or a wider beam.")
+        else:
+            best_tags, best_score = paths[0]
+            st.success(f"Best POS sequence: {' → '.join(best_tags)} (log probability {best_score:.3f})")
+            for rank, (path_tags, path_score) in enumerate(paths[1:], start=2):
+                st.markdown(f"**#{rank}:** {' → '.join(path_tags)} (log probability {path_score:.3f})")
+else:
+    st.info("👉 Tag at least 5 sentences and click 'Move Forward' on the user POS Tagging page first")
 
 # ===== NAVIGATION SECTION =====
 st.markdown("<br><br>", unsafe_allow_html=True)
 
 if st.button("🏠 Home", width='content'):
-    st.switch_page("streamlit_app.py")
\ No newline at end of file
+    st.switch_page("streamlit_app.py")
+
+# ===== RENDER TIMING =====
+render.stop()
@@ -0,0 +1,136 @@
+"""
+Diagnostics
+Where the time goes on every rerun: hot-path timings, cache hit rates and table sizes
+"""
+
+import streamlit as st
+from instrumentation import PROCESS_METRICS
+from page_utils import load_css, track_session
+
+# ===== PAGE CONFIGURATION =====
+st.set_page_config(page_title="Diagnostics", layout="wide", initial_sidebar_state="collapsed")
+
+session_metrics = track_session()
+
+# ===== LOAD EXTERNAL CSS =====
+load_css()
+
+# ===== HEADER SECTION =====
+st.markdown("# 🩺 Diagnostics", unsafe_allow_html=True)
+st.markdown(
+    "<p style='color: #00d4ff; font-family: Space Mono; font-size: 1.2rem;'>Timings, cache hit rates and table sizes</p>",
+    unsafe_allow_html=True)
+
+# ===== SCOPE SELECTION =====
+scope = st.radio("Metrics from:", options=["This session", "Whole process"], horizontal=True, key="diagnostics_scope")
+registry = session_metrics if scope == "This session" else PROCESS_METRICS
+
+timings = {row["metric"]: row for row in registry.summary()}
+
+# ===== HEADLINE NUMBERS =====
+st.markdown("## ⚡ Throughput & Latency")
+
+col1, col2, col3, col4 = st.columns(4)
+
+
+def _throughput(*metrics):
+    rows = [timings[metric] for metric in metrics if metric in timings and timings[metric]["items_per_second"]]
+    if not rows:
+        return "-"
+    items = sum(row["items_per_second"] * row["total_ms"] / 1000.0 for row in rows)
+    return f"{items / sum(row['total_ms'] / 1000.0 for row in rows):,.0f}"
+
+
+def _latency(metric, percentile):
+    row = timings.get(metric)
+    return f"{row[percentile]:.2f} ms" if row else "-"
+
+
+with col1:
+    st.metric("Decoded sentences/sec", _throughput("viterbi_decode_batch", "page.hmm_viterbi.decode"))
+with col2:
+    st.metric("Counted sentences/sec", _throughput("HMMModel.add_sentences", "calculate_transition_count"))
+with col3:
+    st.metric("Tagging page p50", _latency("page.user_pos_tagging", "p50_ms"))
+with col4:
+    st.metric("Tagging page p99", _latency("page.user_pos_tagging", "p99_ms"))
+
+# ===== TIMINGS TABLE =====
+st.markdown("## ⏱️ Timings")
+
+if timings:
+    st.dataframe(
+        [
+            {
+                "Metric": row["metric"],
+                "Calls": row["calls"],
+                "Total (ms)": round(row["total_ms"], 2),
+                "p50 (ms)": round(row["p50_ms"], 3),
+                "p99 (ms)": round(row["p99_ms"], 3),
+                "Sentences/sec": round(row["items_per_second"]) if row["items_per_second"] else None
+            }
+            for row in timings.values()
+        ],
+        width='stretch', hide_index=True
+    )
+else:
+    st.info("👉 No timings yet - use the other pages and come back")
+
+# ===== CACHE HIT RATES =====
+st.markdown("## 🗄️ Cache Hit Rates")
+
+cache_rows = registry.cache_summary()
+if cache_rows:
+    st.dataframe(
+        [
+            {
+                "Cache": row["cache"],
+                "Lookups": row["lookups"],
+                "Misses": row["misses"],
+                "Hit rate": f"{row['hit_rate']:.1%}" if row["hit_rate"] is not None else "-"
+            }
+            for row in cache_rows
+        ],
+        width='stretch', hide_index=True
+    )
+else:
+    st.info("👉 No cache lookups yet")
+
+# ===== TABLE SIZES =====
+st.markdown("## 📐 Table Sizes (this session)")
+
+if 'hmm_model' in st.session_state:
+    model = st.session_state.hmm_model
+    viterbi_bytes = sum(
+        getattr(value, "nbytes", 0) for value in model._probability_cache.get("viterbi", {}).values()
+    )
+    st.dataframe(
+        [
+            {"Table": "Tagged sentences", "Size": len(st.session_state.get("all_tagged_sentences", []))},
+            {"Table": "Tagged sentence store (bytes)",
+             "Size": getattr(st.session_state.get("all_tagged_sentences"), "nbytes", 0)},
+            {"Table": "Vocabulary (words)", "Size": len(model.vocabulary)},
+            {"Table": "Tags", "Size": len(model.tags)},
+            {"Table": "Emission counts (bytes)", "Size": model.emission_counts.nbytes},
+            {"Table": "Transition counts (bytes)", "Size": model.transition_counts.nbytes},
+            {"Table": "Cached decoder tables (bytes)", "Size": viterbi_bytes},
+            {"Table": "pos_count entries", "Size": len(st.session_state.get("pos_count", {}))}
+        ],
+        width='stretch', hide_index=True
+    )
+else:
+    st.info("👉 Tag a sentence on the user POS Tagging page to build the HMM tables")
+
+# ===== NAVIGATION SECTION =====
+st.markdown("<br><br>", unsafe_allow_html=True)
+
+col1, col2 = st.columns(2)
+
+with col1:
+    if st.button("🧹 Reset session metrics", width='stretch'):
+        session_metrics.reset()
+        st.rerun()
+
+with col2:
+    if st.button("🏠 Home", width='stretch'):
+        st.switch_page("streamlit_app.py")
@@ -0,0 +1,116 @@
+"""
+Parallel HMM Training
+Counts shards of a corpus in a process pool and merges the partial count tables
+"""
+
+import os
+from collections import deque
+from functools import reduce
+from multiprocessing import Pool
+
+from mathematical_calculation import DEFAULT_TAGSET
+from hmm_model import HMMModel
+from corpus_loader import read_tagged_corpus, iter_chunks
+
+
+def _count_shard(tags, tagged_sentences):
+    """Worker: count one shard into a fresh model (pickled back as compact arrays)"""
+    model = HMMModel(tags)
+    model.add_sentences(tagged_sentences)
+    return model
+
+
+def merge_models(models, tags=DEFAULT_TAGSET):
+    """
+    Reduce partial models into a single model
+
+    Parameters:
+    -----------
+    models : iterable
+        HMMModel instances counted on separate shards
+    tags : sequence
+        Tagset shared by all models
+
+    Returns:
+    --------
+    HMMModel
+        Model holding the summed counts
+    """
+    return reduce(HMMModel.merge, models, HMMModel(tags))
+
+
+def train_parallel(all_tagged_sentences, processes=None, tags=DEFAULT_TAGSET):
+    """
+    Count an in-memory list of tagged sentences across a process pool
+
+    Parameters:
+    -----------
+    all_tagged_sentences : list
+        List of dictionaries containing tagged sentences
+        Format: [{"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}, ...]
+    processes : int, optional
+        Number of worker processes (default: number of CPUs)
+    tags : sequence
+        Tagset of the model
+
+    Returns:
+    --------
+    HMMModel
+        Model holding the counts of every sentence
+    """
+    processes = processes or os.cpu_count() or 1
+    shard_size = max(1, -(-len(all_tagged_sentences) // processes))
+    shards = [all_tagged_sentences[i:i + shard_size] for i in range(0, len(all_tagged_sentences), shard_size)]
+
+    if processes == 1 or len(shards) <= 1:
+        return merge_models((_count_shard(tags, shard) for shard in shards), tags)
+
+    with Pool(processes) as pool:
+        partial_models = pool.starmap(_count_shard, [(tags, shard) for shard in shards])
+
+    return merge_models(partial_models, tags)
+
+
+def train_from_corpus_parallel(path, corpus_format=None, processes=None, chunk_size=10000,
+                               tags=DEFAULT_TAGSET, **kwargs):
+    """
+    Train HMM counts from a tagged corpus file with a process pool
+    The file is streamed in chunks, and at most two chunks per worker are in flight,
+    so memory stays bounded no matter how large the corpus is
+
+    Parameters:
+    -----------
+    path : str
+        Corpus file path
+    corpus_format : str, optional
+        One of CORPUS_FORMATS, guessed from the file name when not given
+    processes : int, optional
+        Number of worker processes (default: number of CPUs)
+    chunk_size : int
+        Sentences per worker task
+    tags : sequence
+        Tagset of the model
+    **kwargs
+        Extra options for the reader
+
+    Returns:
+    --------
+    HMMModel
+        Model holding the corpus counts
+    """
+    processes = processes or os.cpu_count() or 1
+    model = HMMModel(tags)
+    pending = deque()
+
+    with Pool(processes) as pool:
+        for chunk in iter_chunks(read_tagged_corpus(path, corpus_format, **kwargs), chunk_size):
+            pending.append(pool.apply_async(_count_shard, (tags, chunk)))
+
+            # Merge finished chunks before reading more, so the reader never runs far ahead
+            if len(pending) >= 2 * processes:
+                model.merge(pending.popleft().get())
+
+        while pending:
+            model.merge(pending.popleft().get())
+
+    return model
@@ -0,0 +1,123 @@
+"""
+Parallel Word2Vec Training
+Hogwild-style training: worker processes update shared-memory embedding matrices without locks
+"""
+
+import copy
+import os
+from multiprocessing import Process, Value
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def _attach(shared_memory, shape):
+    """View a shared-memory block as a float32 matrix"""
+    return np.ndarray(shape, dtype=np.float32, buffer=shared_memory.buf)
+
+
+def _train_worker(model, input_name, output_name, shape, shard, epochs, total_tokens, progress, seed):
+    """Worker: train on one shard, writing straight into the shared matrices"""
+    input_memory = SharedMemory(name=input_name)
+    output_memory = SharedMemory(name=output_name)
+
+    try:
+        model.input_vectors = _attach(input_memory, shape)
+        model.output_vectors = _attach(output_memory, shape)
+        model.rng = np.random.default_rng(seed)
+
+        for _ in range(epochs):
+            for token_ids, sentence_ids in model._iter_chunks(shard):
+                # Every worker reads the same global progress, so they share one schedule
+                model.train_chunk(token_ids, sentence_ids, model.learning_rate_at(progress.value, total_tokens))
+
+                with progress.get_lock():
+                    progress.value += len(token_ids)
+    finally:
+        # Drop the views before closing, or the buffers stay exported
+        model.input_vectors = None
+        model.output_vectors = None
+        input_memory.close()
+        output_memory.close()
+
+
+def train_word2vec_parallel(model, sentences, epochs=5, workers=None, seed=0):
+    """
+    Train a Word2Vec model with one process per CPU core (Hogwild)
+
+    Both embedding matrices live in shared memory. Every worker trains on its
+    own shard of the sentences and writes updates without locking; collisions
+    are rare because each update only touches a few rows, which is why this
+    scales close to linearly with cores. The learning rate follows the global
+    token count across all workers.
+
+    Parameters:
+    -----------
+    model : Word2Vec
+        Model to train (its vocabulary is built first if needed)
+    sentences : list
+        Tokenized sentences, each a list of words
+    epochs : int
+        Passes over the corpus
+    workers : int, optional
+        Number of worker processes (default: number of CPUs)
+    seed : int
+        Base seed, worker i uses seed + i
+
+    Returns:
+    --------
+    Word2Vec
+        The trained model (vectors copied back into regular arrays)
+    """
+    if not model.vocabulary:
+        model.build_vocab(sentences)
+    if not model.vocabulary:
+        return model
+
+    workers = workers or os.cpu_count() or 1
+    shape = model.input_vectors.shape
+    total_tokens = epochs * int(model.counts.sum())
+
+    input_memory = SharedMemory(create=True, size=max(1, model.input_vectors.nbytes))
+    output_memory = SharedMemory(create=True, size=max(1, model.output_vectors.nbytes))
+
+    try:
+        shared_input = _attach(input_memory, shape)
+        shared_output = _attach(output_memory, shape)
+        shared_input[:] = model.input_vectors
+        shared_output[:] = model.output_vectors
+
+        # Workers get a copy of the model without its (possibly large) matrices
+        worker_model = copy.copy(model)
+        worker_model.input_vectors = None
+        worker_model.output_vectors = None
+
+        progress = Value("q", 0)
+        shard_size = -(-len(sentences) // workers)
+        processes = [
+            Process(target=_train_worker, args=(
+                worker_model, input_memory.name, output_memory.name, shape,
+                sentences[start:start + shard_size], epochs, total_tokens, progress, seed + worker_id
+            ))
+            for worker_id, start in enumerate(range(0, len(sentences), shard_size))
+        ]
+
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failed = [process.exitcode for process in processes if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} Word2Vec worker(s) failed with exit codes {failed}")
+
+        model.input_vectors = shared_input.copy()
+        model.output_vectors = shared_output.copy()
+    finally:
+        shared_input = shared_output = None
+        input_memory.close()
+        output_memory.close()
+        input_memory.unlink()
+        output_memory.unlink()
+
+    return model
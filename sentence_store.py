@@ -0,0 +1,148 @@
+"""
+Compact Tagged Sentence Store
+Keeps tagged sentences as flat arrays (interned word ids, uint8 tag ids, sentence
+offsets) while still reading like the list of {"words", "tags"} dicts the pages use
+"""
+
+from array import array
+
+import numpy as np
+
+from mathematical_calculation import DEFAULT_TAGSET
+
+
+class TaggedSentenceStore:
+    """
+    Append-only list of tagged sentences backed by flat arrays
+
+    Sentence i covers positions offsets[i]:offsets[i + 1] of word_ids and
+    tag_ids. Every distinct word string is stored once in vocabulary, so a
+    token costs 4 bytes for its word and 1 byte for its tag instead of a string
+    reference plus a dict entry holding the full tag name.
+
+    Attributes:
+    -----------
+    tags : list
+        Tag names in id order
+    tag_to_id : dict
+        Tag name to id
+    vocabulary : list
+        Distinct words in id order, exactly as typed
+    word_to_id : dict
+        Word to id
+    word_ids : array.array
+        ('i') word id of every token
+    tag_ids : array.array
+        ('B') tag id of every token
+    offsets : array.array
+        ('q') start of every sentence, plus the total token count at the end
+    """
+
+    def __init__(self, tags=DEFAULT_TAGSET, tagged_sentences=()):
+        if len(tags) > 256:
+            raise ValueError(f"At most 256 tags fit in uint8 tag ids, got {len(tags)}")
+
+        self.tags = list(tags)
+        self.tag_to_id = {tag: tag_id for tag_id, tag in enumerate(self.tags)}
+        self.vocabulary = []
+        self.word_to_id = {}
+        self.word_ids = array('i')
+        self.tag_ids = array('B')
+        self.offsets = array('q', [0])
+
+        self.extend(tagged_sentences)
+
+    # ===== ADDING SENTENCES =====
+
+    def _intern(self, word):
+        """Id of a word, adding it to the vocabulary if it is new"""
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            word_id = self.word_to_id[word] = len(self.vocabulary)
+            self.vocabulary.append(word)
+        return word_id
+
+    def append(self, tagged_sentence):
+        """
+        Add one tagged sentence
+
+        Parameters:
+        -----------
+        tagged_sentence : dict
+            Format: {"words": [...], "tags": {0: "Noun", 1: "Verb", ...}}
+            Every word needs a tag from the store's tagset
+        """
+        words = tagged_sentence["words"]
+        pos_tags = tagged_sentence["tags"]
+
+        unknown = [pos_tags[word_idx] for word_idx in range(len(words)) if pos_tags[word_idx] not in self.tag_to_id]
+        if unknown:
+            raise ValueError(f"Tags {unknown} are not in the store's tagset {self.tags}")
+
+        self.word_ids.extend(self._intern(word) for word in words)
+        self.tag_ids.extend(self.tag_to_id[pos_tags[word_idx]] for word_idx in range(len(words)))
+        self.offsets.append(len(self.tag_ids))
+
+    def extend(self, tagged_sentences):
+        """Add every sentence of an iterable of tagged sentences"""
+        for tagged_sentence in tagged_sentences:
+            self.append(tagged_sentence)
+
+    # ===== LIST-LIKE ACCESS =====
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _sentence(self, index):
+        """Rebuild sentence index in the dict format"""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return {
+            "words": [self.vocabulary[word_id] for word_id in self.word_ids[start:end]],
+            "tags": {word_idx: self.tags[tag_id] for word_idx, tag_id in enumerate(self.tag_ids[start:end])}
+        }
+
+    def __getitem__(self, index):
+        """
+        Sentence(s) in the all_tagged_sentences dict format
+
+        Parameters:
+        -----------
+        index : int or slice
+            Sentence position (negative positions count from the end)
+
+        Returns:
+        --------
+        dict or list
+            {"words": [...], "tags": {0: "Noun", ...}} for an int, a list of them for a slice
+        """
+        if isinstance(index, slice):
+            return [self._sentence(position) for position in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sentence index out of range")
+        return self._sentence(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._sentence(index)
+
+    # ===== FLAT ARRAYS =====
+
+    def tag_arrays(self):
+        """
+        Tag ids and sentence offsets as NumPy arrays, for vectorized counting
+
+        Returns:
+        --------
+        tuple
+            (tag_ids, offsets) as uint8 and int64 copies, so the store can keep growing
+        """
+        return (np.frombuffer(self.tag_ids, dtype=np.uint8).copy(),
+                np.frombuffer(self.offsets, dtype=np.int64).copy())
+
+    @property
+    def nbytes(self):
+        """Bytes used by the token arrays (the vocabulary strings are not counted)"""
+        return sum(buffer.itemsize * len(buffer) for buffer in (self.word_ids, self.tag_ids, self.offsets))
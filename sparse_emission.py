@@ -0,0 +1,260 @@
+"""
+Sparse Emission Store
+Compressed sparse row (CSR) emission counts: one row per word holding only the
+tags the word was seen with, normalized and expanded to dense rows on demand
+"""
+
+import numpy as np
+
+from mathematical_calculation import DEFAULT_TAG_INDEX, UNKNOWN_WORD_CLASSES, transition_log_tables
+
+
+class SparseEmissionTable:
+    """
+    (words x tags) emission counts in CSR form
+
+    Row w lives in indices[indptr[w]:indptr[w + 1]] (tag ids, ascending) and
+    counts[indptr[w]:indptr[w + 1]], so memory grows with the number of seen
+    (word, tag) pairs instead of words x tags.
+
+    Attributes:
+    -----------
+    tag_index : dict
+        Tag lookup tables from build_tag_index
+    vocabulary : list
+        Words in row order
+    word_to_id : dict
+        Word to row id
+    indptr : numpy.ndarray
+        (words + 1,) int64 start of every row in indices / counts
+    indices : numpy.ndarray
+        (pairs,) tag id of every stored cell, the smallest unsigned dtype that fits the tagset
+    counts : numpy.ndarray
+        (pairs,) count of every stored cell
+    tag_totals : numpy.ndarray
+        (tags,) tokens seen with each tag
+    """
+
+    def __init__(self, vocabulary, indptr, indices, counts, tag_index=DEFAULT_TAG_INDEX):
+        self.tag_index = tag_index
+        self.vocabulary = list(vocabulary)
+        self.word_to_id = {word: word_id for word_id, word in enumerate(self.vocabulary)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.min_scalar_type(max(len(tag_index["tags"]) - 1, 0)))
+        self.counts = np.asarray(counts)
+        self.tag_totals = np.bincount(self.indices, weights=self.counts, minlength=len(tag_index["tags"]))
+
+        # Normalized values per smoothing k, they only change with the counts
+        self._probability_cache = {}
+
+    # ===== CONSTRUCTORS =====
+
+    @classmethod
+    def from_pos_count(cls, pos_count, tag_index=DEFAULT_TAG_INDEX):
+        """
+        Build the table from the POS count dictionary without a dense intermediate
+
+        Parameters:
+        -----------
+        pos_count : dict
+            POS count dictionary
+            Format: {"word": {'n': count, 'v': count, 'm': count}}
+        tag_index : dict
+            Tag index from build_tag_index (default: the dashboard's 3 tags)
+
+        Returns:
+        --------
+        SparseEmissionTable
+            Table with one row per word of pos_count, in dict order
+        """
+        short_to_id = {short: tag_id for tag_id, short in enumerate(tag_index["short_forms"])}
+
+        indptr = [0]
+        indices = []
+        counts = []
+        for word_counts in pos_count.values():
+            cells = sorted((short_to_id[short], count) for short, count in word_counts.items()
+                           if count and short in short_to_id)
+            indices.extend(tag_id for tag_id, _ in cells)
+            counts.extend(count for _, count in cells)
+            indptr.append(len(indices))
+
+        return cls(pos_count.keys(), indptr, indices, np.array(counts, dtype=np.int64), tag_index)
+
+    @classmethod
+    def from_dense(cls, emission_counts, vocabulary, tag_index=DEFAULT_TAG_INDEX):
+        """
+        Compress a dense (words x tags) count matrix, e.g. HMMModel.emission_counts
+
+        Parameters:
+        -----------
+        emission_counts : numpy.ndarray
+            (words x tags) count matrix
+        vocabulary : list
+            Words in row order
+        tag_index : dict
+            Tag index from build_tag_index
+
+        Returns:
+        --------
+        SparseEmissionTable
+            Table holding the non-zero cells
+        """
+        emission_counts = np.asarray(emission_counts)
+        rows, indices = np.nonzero(emission_counts)
+        indptr = np.zeros(emission_counts.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=emission_counts.shape[0]), out=indptr[1:])
+        return cls(vocabulary, indptr, indices, emission_counts[rows, indices], tag_index)
+
+    # ===== SIZES =====
+
+    @property
+    def shape(self):
+        """(words, tags) of the equivalent dense matrix"""
+        return len(self.vocabulary), len(self.tag_index["tags"])
+
+    @property
+    def nbytes(self):
+        """Bytes used by the CSR arrays"""
+        return self.indptr.nbytes + self.indices.nbytes + self.counts.nbytes
+
+    # ===== PROBABILITIES =====
+
+    def probabilities(self, k=0.0):
+        """
+        P(word | tag) of every stored cell with one vectorized divide
+
+        Parameters:
+        -----------
+        k : float
+            Add-k pseudo-count, same estimate as smooth_emission_counts(method='add_k')
+            0 keeps plain relative frequencies
+
+        Returns:
+        --------
+        tuple
+            (values, background)
+            values is aligned with indices, background is the (tags,) probability
+            of every cell that is not stored (and of a word not in the vocabulary)
+        """
+        if k not in self._probability_cache:
+            # The extra pseudo-word slot stands for every word not in the vocabulary
+            denominators = self.tag_totals + k * (len(self.vocabulary) + 1)
+            background = np.divide(k, denominators, out=np.zeros(len(denominators)), where=denominators > 0)
+            # A stored cell means its tag was seen, so its denominator is never 0
+            values = (self.counts + k) / denominators[self.indices]
+            self._probability_cache[k] = (values, background)
+        return self._probability_cache[k]
+
+    def dense_rows(self, word_ids, k=0.0):
+        """
+        Expand rows to dense per-token emission vectors
+
+        Parameters:
+        -----------
+        word_ids : array-like
+            Word rows of any shape, -1 (or any row past the vocabulary) for unseen words
+        k : float
+            Add-k pseudo-count, see probabilities
+
+        Returns:
+        --------
+        numpy.ndarray
+            (*word_ids.shape, tags) P(word | tag)
+        """
+        values, background = self.probabilities(k)
+        word_ids = np.asarray(word_ids, dtype=np.int64)
+        flat_ids = word_ids.ravel()
+
+        dense = np.tile(background, (len(flat_ids), 1))
+        known = np.flatnonzero((flat_ids >= 0) & (flat_ids < len(self.vocabulary)))
+
+        # Gather every stored cell of the requested rows in one pass
+        starts = self.indptr[flat_ids[known]]
+        lengths = self.indptr[flat_ids[known] + 1] - starts
+        tokens = np.repeat(known, lengths)
+        cells = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        dense[tokens, self.indices[cells]] = values[cells]
+
+        return dense.reshape(word_ids.shape + (len(background),))
+
+    def log_emission(self, k=0.0):
+        """
+        Log-space view to use as the "log_emission" entry of decoder tables
+
+        Parameters:
+        -----------
+        k : float
+            Add-k pseudo-count, see probabilities
+
+        Returns:
+        --------
+        SparseLogEmission
+            Indexable like the dense (words x tags) log_emission matrix
+        """
+        return SparseLogEmission(self, k)
+
+
+class SparseLogEmission:
+    """
+    Read-only stand-in for a dense log_emission matrix backed by a SparseEmissionTable
+
+    Indexing with a row id, an array of row ids or (rows, tag columns) returns
+    dense log probabilities, so viterbi_decode, viterbi_decode_batch,
+    viterbi_decode_beam and forward-backward only ever expand the rows of the
+    tokens they decode. Rows past the vocabulary (the unknown-word class rows
+    of smoothed tables) get the background probability.
+    """
+
+    def __init__(self, table, k=0.0):
+        self.table = table
+        self.k = k
+
+    @property
+    def shape(self):
+        """(words + unknown-word classes, tags) when smoothed, else (words, tags)"""
+        n_words, n_tags = self.table.shape
+        return (n_words + len(UNKNOWN_WORD_CLASSES) if self.k > 0 else n_words), n_tags
+
+    def __getitem__(self, key):
+        columns = None
+        if isinstance(key, tuple):
+            key, columns = key
+
+        with np.errstate(divide='ignore'):
+            rows = np.log(self.table.dense_rows(key, self.k))
+        return rows if columns is None else rows[..., columns]
+
+
+def build_sparse_viterbi_tables(emission_table, transition_probability_table, k=0.0):
+    """
+    Decoder tables with a sparse emission store, same format as build_viterbi_tables
+
+    Parameters:
+    -----------
+    emission_table : SparseEmissionTable
+        Emission counts, e.g. SparseEmissionTable.from_pos_count(pos_count)
+    transition_probability_table : dict
+        Transition probability table from calculate_transition_probability
+        Format: {"start": {"Noun": probability, ..., "end": probability}, "Noun": {...}, ...}
+    k : float
+        Add-k emission pseudo-count; with k > 0 unseen words decode with the
+        background probability instead of a ZERO path
+
+    Returns:
+    --------
+    dict
+        Decoder tables whose "log_emission" is a SparseLogEmission
+    """
+    tags = emission_table.tag_index["tags"]
+    viterbi_tables = {
+        "tags": tags,
+        "word_to_id": emission_table.word_to_id,
+        "log_emission": emission_table.log_emission(k),
+        **transition_log_tables(transition_probability_table, tags)
+    }
+
+    if k > 0:
+        viterbi_tables["unknown_class_offset"] = len(emission_table.vocabulary)
+
+    return viterbi_tables
@@ -1,10 +1,14 @@
 import streamlit as st
+from instrumentation import timer
+from page_utils import load_css, track_session
 
 st.set_page_config(page_title="NLP Dashboard", layout="wide", initial_sidebar_state="collapsed")
 
-# Load CSS from external file
-with open("styles.css", "r") as css_file:
-    st.markdown(f"<style>{css_file.read()}</style>", unsafe_allow_html=True)
+track_session()
+
+# Load CSS from external file (read once per process)
+load_css()
+render = timer("page.home")
 
 # ===== HEADER SECTION =====
 st.markdown("# 🧠 NLP Learning Dashboard", unsafe_allow_html=True)
@@ -100,4 +104,7 @@ st.markdown("</div>", unsafe_allow_html=True)
 # ===== FOOTER =====
 st.markdown("<div style='text-align: center; margin-top: 80px; padding: 40px; color: #64748b; font-size: 0.95rem;'>", unsafe_allow_html=True)
 st.markdown("Built with ❤️ for NLP Learning | Powered by Streamlit")
-st.markdown("</div>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("</div>", unsafe_allow_html=True)
+
+# ===== RENDER TIMING =====
+render.stop()
@@ -0,0 +1,392 @@
+"""
+Headless POS Tagging
+Command line and HTTP entry points around the HMM tables, without Streamlit
+
+Usage:
+    python tagging_service.py train --corpus corpus.conll --output model_dir --tagset universal
+    python tagging_service.py tag --model model_dir < sentences.txt > tagged.jsonl
+    python tagging_service.py serve --model model_dir --port 8000
+
+    curl -X POST localhost:8000/tag -d '{"sentences": ["will juliet love google"]}'
+"""
+
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+
+from corpus_loader import CORPUS_FORMATS, read_tagged_corpus, train_from_corpus
+from hmm_model import HMMModel
+from mathematical_calculation import (
+    DEFAULT_TAGSET,
+    PENN_TREEBANK_TAGSET,
+    SMOOTHING_METHODS,
+    UNIVERSAL_TAGSET,
+    viterbi_decode_batch
+)
+from tokenizer import tokenize
+
+TAGSETS = {
+    "default": DEFAULT_TAGSET,
+    "penn": PENN_TREEBANK_TAGSET,
+    "universal": UNIVERSAL_TAGSET
+}
+
+# Largest request body accepted by the HTTP service
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+
+# Sentences read from the start of a corpus to guess its tagset
+TAGSET_SAMPLE_SENTENCES = 1000
+
+
+# ===== MODEL AND TAGGING =====
+
+def detect_tagset(corpus_path, corpus_format=None, sample_size=TAGSET_SAMPLE_SENTENCES):
+    """
+    Guess which of TAGSETS a tagged corpus uses from its first sentences
+
+    Parameters:
+    -----------
+    corpus_path : str
+        Tagged corpus file
+    corpus_format : str, optional
+        One of CORPUS_FORMATS (guessed from the file name if not given)
+    sample_size : int
+        Number of sentences to look at
+
+    Returns:
+    --------
+    str
+        Key of the first tagset holding every sampled tag, else of the one holding the most
+    """
+    seen = set()
+    for sentence in islice(read_tagged_corpus(corpus_path, corpus_format), sample_size):
+        seen.update(sentence["tags"].values())
+
+    for name, tags in TAGSETS.items():
+        if seen.issubset(tags):
+            return name
+
+    best = max(TAGSETS, key=lambda name: len(seen.intersection(TAGSETS[name])))
+    print(f"Warning: tags {sorted(seen - set(TAGSETS[best]))} are not in any tagset, "
+          f"training with '{best}' skips them", file=sys.stderr)
+    return best
+
+
+def train_model(corpus_path, corpus_format=None, tagset=None):
+    """
+    Train a model from a tagged corpus
+
+    Parameters:
+    -----------
+    corpus_path : str
+        Tagged corpus file
+    corpus_format : str, optional
+        One of CORPUS_FORMATS (guessed from the file name if not given)
+    tagset : str, optional
+        Key of TAGSETS (default: detect_tagset)
+
+    Returns:
+    --------
+    HMMModel
+        Model holding the corpus counts
+
+    Raises:
+    -------
+    ValueError
+        If no token of the corpus has a tag from the tagset, since every token would be skipped
+    """
+    tagset = tagset or detect_tagset(corpus_path, corpus_format)
+    model = train_from_corpus(corpus_path, corpus_format, model=HMMModel(tags=TAGSETS[tagset]))
+
+    if not model.tag_totals.any():
+        raise ValueError(f"No tag in {corpus_path} is in the '{tagset}' tagset, "
+                         f"choose the corpus tagset with --tagset")
+    return model
+
+
+def load_model(model_path=None, corpus_path=None, corpus_format=None, tagset=None, smoothing=None):
+    """
+    Load a saved model bundle, or train one from a tagged corpus
+
+    Parameters:
+    -----------
+    model_path : str, optional
+        Bundle directory written by HMMModel.save
+    corpus_path : str, optional
+        Tagged corpus to train from when no bundle is given
+    corpus_format : str, optional
+        One of CORPUS_FORMATS (guessed from the file name if not given)
+    tagset : str, optional
+        Key of TAGSETS used when training (default: detected from the corpus)
+    smoothing : str, optional
+        One of SMOOTHING_METHODS (default: keep the bundle's setting, none when training)
+
+    Returns:
+    --------
+    HMMModel
+        Model with its decoder tables already built
+    """
+    if model_path:
+        model = HMMModel.load(model_path, mmap=True)
+    elif corpus_path:
+        model = train_model(corpus_path, corpus_format, tagset)
+    else:
+        raise ValueError("Either a model bundle or a training corpus is required")
+
+    if smoothing is not None:
+        model.set_smoothing(smoothing)
+
+    # Build the tables now so request threads only ever read them
+    model.viterbi_tables()
+    return model
+
+
+def tag_sentences(model, sentences, keep_punctuation=True):
+    """
+    Tokenize and tag a batch of raw sentences in one batched Viterbi pass
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Trained model
+    sentences : list
+        Raw sentence strings
+    keep_punctuation : bool
+        Tag punctuation marks as tokens, or drop them
+
+    Returns:
+    --------
+    list
+        One result per sentence
+        Format: {"words": [...], "tags": [...], "score": log probability or None if every path is zero}
+    """
+    token_lists = [tokenize(sentence, keep_punctuation=keep_punctuation) for sentence in sentences]
+    decoded = viterbi_decode_batch(token_lists, model.viterbi_tables())
+
+    return [
+        {"words": words, "tags": tags, "score": score if score != float("-inf") else None}
+        for words, (tags, score) in zip(token_lists, decoded)
+    ]
+
+
+def tag_stream(model, lines, batch_size=256, keep_punctuation=True):
+    """
+    Tag a stream of sentences, one batch at a time
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Trained model
+    lines : iterable
+        Raw sentences, one per item (blank items are skipped)
+    batch_size : int
+        Sentences decoded per Viterbi batch
+    keep_punctuation : bool
+        Tag punctuation marks as tokens, or drop them
+
+    Yields:
+    -------
+    dict
+        Result for each non-blank sentence, in input order (see tag_sentences)
+    """
+    sentences = (line.strip() for line in lines if line.strip())
+    while True:
+        batch = list(islice(sentences, batch_size))
+        if not batch:
+            return
+        yield from tag_sentences(model, batch, keep_punctuation)
+
+
+def format_slash(result):
+    """
+    Render one tagging result as word/TAG text
+
+    Parameters:
+    -----------
+    result : dict
+        Result from tag_sentences
+
+    Returns:
+    --------
+    str
+        Space-separated word/TAG tokens; word/? for every word when the
+        sentence has no path (score None), like "score": null in jsonl
+    """
+    if result["score"] is None:
+        return " ".join(f"{word}/?" for word in result["words"])
+    return " ".join(f"{word}/{tag}" for word, tag in zip(result["words"], result["tags"]))
+
+
+# ===== HTTP SERVICE =====
+
+class TaggingRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API over a model shared by every request thread
+
+    GET  /health  ->  {"status": "ok", "tags": [...], "vocabulary_size": n}
+    POST /tag     {"sentences": ["...", ...]}  ->  {"results": [...]} (see tag_sentences)
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        model = self.server.model
+        self._send_json(200, {"status": "ok", "tags": list(model.tags), "vocabulary_size": len(model.vocabulary)})
+
+    def do_POST(self):
+        if self.path != "/tag":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        if "Content-Length" not in self.headers:
+            self._send_json(411, {"error": "Content-Length header required"})
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Content-Length must be a non-negative integer"})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self._send_json(413, {"error": f"Request body over {MAX_REQUEST_BYTES} bytes"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(length))
+            sentences = request["sentences"]
+            if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+                raise TypeError("'sentences' must be a list of strings")
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": f"Expected {{\"sentences\": [\"...\", ...]}}: {error}"})
+            return
+
+        results = tag_sentences(self.server.model, sentences, self.server.keep_punctuation)
+        self._send_json(200, {"results": results})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(model, host="127.0.0.1", port=8000, keep_punctuation=True, verbose=False):
+    """
+    Create the HTTP tagging service (one thread per connection)
+
+    Parameters:
+    -----------
+    model : HMMModel
+        Model loaded once and shared by every request
+    host : str
+        Interface to listen on
+    port : int
+        Port to listen on (0 picks a free one)
+    keep_punctuation : bool
+        Tag punctuation marks as tokens, or drop them
+    verbose : bool
+        Log every request to stderr
+
+    Returns:
+    --------
+    ThreadingHTTPServer
+        Server ready for serve_forever()
+    """
+    server = ThreadingHTTPServer((host, port), TaggingRequestHandler)
+    server.model = model
+    server.keep_punctuation = keep_punctuation
+    server.verbose = verbose
+    return server
+
+
+# ===== COMMAND LINE =====
+
+def _add_model_arguments(parser):
+    parser.add_argument("--model", help="Model bundle directory written by 'train' or HMMModel.save")
+    parser.add_argument("--corpus", help="Tagged corpus to train from when --model is not given")
+    parser.add_argument("--corpus-format", choices=CORPUS_FORMATS, help="Corpus format (default: from file name)")
+    parser.add_argument("--tagset", choices=sorted(TAGSETS),
+                        help="Tagset used when training (default: detected from the corpus)")
+    parser.add_argument("--smoothing", choices=SMOOTHING_METHODS, help="Smoothing for unseen words")
+    parser.add_argument("--drop-punctuation", action="store_true", help="Do not tag punctuation marks")
+
+
+def _model_from_arguments(arguments):
+    return load_model(arguments.model, arguments.corpus, arguments.corpus_format,
+                      arguments.tagset, arguments.smoothing)
+
+
+def main(argv=None):
+    """Command line entry point, see the module docstring for examples"""
+    parser = argparse.ArgumentParser(description="Headless HMM POS tagging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Count a tagged corpus and save a model bundle")
+    train_parser.add_argument("--corpus", required=True, help="Tagged corpus file")
+    train_parser.add_argument("--corpus-format", choices=CORPUS_FORMATS, help="Corpus format (default: from file name)")
+    train_parser.add_argument("--tagset", choices=sorted(TAGSETS),
+                              help="Tagset of the corpus (default: detected from its first sentences)")
+    train_parser.add_argument("--smoothing", choices=SMOOTHING_METHODS, help="Smoothing stored with the model")
+    train_parser.add_argument("--output", required=True, help="Bundle directory to write")
+
+    tag_parser = commands.add_parser("tag", help="Tag sentences from a file or stdin, one per line")
+    _add_model_arguments(tag_parser)
+    tag_parser.add_argument("input", nargs="?", help="Input file (default: stdin)")
+    tag_parser.add_argument("--batch-size", type=int, default=256, help="Sentences per Viterbi batch")
+    tag_parser.add_argument("--output-format", choices=("jsonl", "slash"), default="jsonl",
+                            help="JSON lines or word/TAG text (word/? when a sentence has no path)")
+
+    serve_parser = commands.add_parser("serve", help="Run the HTTP tagging service")
+    _add_model_arguments(serve_parser)
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    serve_parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    serve_parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == "train":
+        model = train_model(arguments.corpus, arguments.corpus_format, arguments.tagset)
+        model.set_smoothing(arguments.smoothing)
+        model.save(arguments.output)
+        print(f"Saved {len(model.vocabulary)} words x {len(model.tags)} tags to {arguments.output}",
+              file=sys.stderr)
+
+    elif arguments.command == "tag":
+        model = _model_from_arguments(arguments)
+        lines = open(arguments.input, "r", encoding="utf-8") if arguments.input else sys.stdin
+
+        try:
+            for result in tag_stream(model, lines, arguments.batch_size, not arguments.drop_punctuation):
+                if arguments.output_format == "jsonl":
+                    sys.stdout.write(json.dumps(result) + "\n")
+                else:
+                    sys.stdout.write(format_slash(result) + "\n")
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+    elif arguments.command == "serve":
+        server = make_server(_model_from_arguments(arguments), arguments.host, arguments.port,
+                             not arguments.drop_punctuation, arguments.verbose)
+        print(f"Serving POST /tag on http://{arguments.host}:{server.server_address[1]}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
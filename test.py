@@ -1,7 +1,51 @@
+import tempfile
+
 import mathematical_calculation as ms
+from hmm_model import HMMModel
 
-all_tagged_sentences = [{"words":["dev","love","cube"],"tags":{"0":"Noun","1":"Verb","2":"Noun"}},{"words":["can","dev","google","cube"],"tags":{"0":"Modal Auxiliary","1":"Noun","2":"Verb","3":"Noun"}},{"words":["will","juliet","google","cube"],"tags":{"0":"Modal Auxiliary","1":"Noun","2":"Verb","3":"Noun"}},{"words":["juliet","love","will"],"tags":{"0":"Noun","1":"Verb","2":"Noun"}},{"words":["will","love","google"],"tags":{"0":"Noun","1":"Verb","2":"Noun"}}]
+all_tagged_sentences = [{"words":["dev","love","cube"],"tags":{0:"Noun",1:"Verb",2:"Noun"}},{"words":["can","dev","google","cube"],"tags":{0:"Modal Auxiliary",1:"Noun",2:"Verb",3:"Noun"}},{"words":["will","juliet","google","cube"],"tags":{0:"Modal Auxiliary",1:"Noun",2:"Verb",3:"Noun"}},{"words":["juliet","love","will"],"tags":{0:"Noun",1:"Verb",2:"Noun"}},{"words":["will","love","google"],"tags":{0:"Noun",1:"Verb",2:"Noun"}}]
 
-result = ms.calculate_transition_probability(data= all_tagged_sentences)
+transition_count = ms.calculate_transition_count(all_tagged_sentences)
+result = ms.calculate_transition_probability(transition_count)
 
 print(result)
+
+# ===== CHECKS =====
+# A memory-mapped model is read-only: adding sentences must raise, not crash the process
+with tempfile.TemporaryDirectory() as bundle:
+    model = HMMModel()
+    model.add_sentences(all_tagged_sentences)
+    model.save(bundle)
+
+    mapped = HMMModel.load(bundle, mmap=True)
+    try:
+        mapped.add_sentence(["dev", "love", "google"], {0: "Noun", 1: "Verb", 2: "Noun"})
+        raise AssertionError("adding to a memory-mapped model did not raise")
+    except ValueError:
+        pass
+
+    writable = HMMModel.load(bundle, mmap=False)
+    writable.add_sentence(["dev", "love", "google"], {0: "Noun", 1: "Verb", 2: "Noun"})
+    assert writable.transition_counts.sum() == model.transition_counts.sum() + 4
+
+# A word holding '\r' must not split into two vocabulary entries on load
+with tempfile.TemporaryDirectory() as bundle:
+    model = HMMModel()
+    model.add_sentence(["dev\rops", "love", "cube"], {0: "Noun", 1: "Verb", 2: "Noun"})
+    model.save(bundle)
+    assert HMMModel.load(bundle, mmap=False).vocabulary == model.vocabulary
+
+# Every smoothing method keeps some probability for unseen words under every tag,
+# including tags with no hapax words (Good-Turing) and tags never seen at all
+model = HMMModel(list(ms.DEFAULT_TAGSET) + ["Adjective"])
+model.add_sentences(all_tagged_sentences)
+for method in ms.SMOOTHING_METHODS:
+    probabilities, unseen = ms.smooth_emission_counts(model.emission_counts, method=method)
+    assert (unseen > 0).all(), (method, unseen)
+    assert (probabilities > 0).all(), method
+
+    model.set_smoothing(method)
+    _, score = ms.viterbi_decode(["will", "zorro", "love", "cube"], model.viterbi_tables())
+    assert score > float("-inf"), method
+
+print("checks passed")
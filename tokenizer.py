@@ -0,0 +1,118 @@
+"""
+Sentence Tokenizer and Normalizer
+Splits text into words and punctuation with one precompiled regex and maps
+whole batches of sentences to HMM vocabulary ids
+"""
+
+import re
+
+from mathematical_calculation import encode_sentences
+
+# One alternative per token kind, tried in order:
+#   numbers with inner separators ("3.14", "1,000", "10:30")
+#   words and numbers, inner apostrophes and hyphens kept ("can't", "well-known", "x2")
+#   a single punctuation mark or symbol
+TOKEN_PATTERN = re.compile(
+    r"\d+(?:[.,:/]\d+)+"
+    r"|\w+(?:['’-]\w+)*"
+    r"|[^\w\s]"
+)
+
+# Same without the punctuation alternative, so punctuation is skipped while matching
+WORD_PATTERN = re.compile(
+    r"\d+(?:[.,:/]\d+)+"
+    r"|\w+(?:['’-]\w+)*"
+)
+
+
+def tokenize(sentence, lowercase=False, keep_punctuation=True):
+    """
+    Split a sentence into word and punctuation tokens
+    "The cube." gives ["The", "cube", "."] where str.split gives ["The", "cube."]
+
+    Parameters:
+    -----------
+    sentence : str
+        Raw text
+    lowercase : bool
+        Lowercase the tokens (done once on the whole sentence)
+    keep_punctuation : bool
+        Return punctuation marks as tokens, or drop them
+
+    Returns:
+    --------
+    list
+        Tokens in order
+    """
+    if lowercase:
+        sentence = sentence.lower()
+    pattern = TOKEN_PATTERN if keep_punctuation else WORD_PATTERN
+    return pattern.findall(sentence)
+
+
+def normalize_sentences(sentences, keep_punctuation=True):
+    """
+    Tokenize and lowercase a batch of sentences
+
+    Parameters:
+    -----------
+    sentences : list
+        Raw sentence strings
+    keep_punctuation : bool
+        Return punctuation marks as tokens, or drop them
+
+    Returns:
+    --------
+    list
+        One list of lowercase tokens per sentence
+    """
+    findall = (TOKEN_PATTERN if keep_punctuation else WORD_PATTERN).findall
+    return [findall(sentence.lower()) for sentence in sentences]
+
+
+def encode_normalized(token_lists, word_to_id, unknown_class_offset=None):
+    """
+    Map already-normalized token lists to a padded matrix of vocabulary ids
+    Same as mathematical_calculation.encode_sentences, without lowercasing again
+
+    Parameters:
+    -----------
+    token_lists : list
+        Lists of lowercase tokens (see normalize_sentences)
+    word_to_id : dict
+        Word to row mapping (HMMModel.word_to_id or viterbi_tables["word_to_id"])
+    unknown_class_offset : int, optional
+        First unknown-word class row, if the tables have them
+
+    Returns:
+    --------
+    tuple
+        ((sentences x longest) int array, -1 for unseen words and padding,
+         (sentences,) array of sentence lengths)
+    """
+    return encode_sentences(token_lists, word_to_id, unknown_class_offset, lowercase=False)
+
+
+def encode_batch(sentences, word_to_id, unknown_class_offset=None, keep_punctuation=True):
+    """
+    Tokenize, normalize and map a batch of raw sentences to vocabulary ids in one call
+
+    Parameters:
+    -----------
+    sentences : list
+        Raw sentence strings
+    word_to_id : dict
+        Word to row mapping (HMMModel.word_to_id or viterbi_tables["word_to_id"])
+    unknown_class_offset : int, optional
+        First unknown-word class row, if the tables have them
+    keep_punctuation : bool
+        Return punctuation marks as tokens, or drop them
+
+    Returns:
+    --------
+    tuple
+        (token lists, (sentences x longest) id matrix, (sentences,) lengths)
+    """
+    token_lists = normalize_sentences(sentences, keep_punctuation)
+    token_ids, lengths = encode_normalized(token_lists, word_to_id, unknown_class_offset)
+    return token_lists, token_ids, lengths
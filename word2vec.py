@@ -0,0 +1,440 @@
+"""
+Word2Vec Training
+CBOW and Skip-Gram with negative sampling, trained in NumPy minibatches
+"""
+
+from collections import Counter
+
+import numpy as np
+
+from word_vectors import WordVectors
+
+ARCHITECTURES = ("cbow", "skipgram")
+
+
+def build_alias_table(probabilities):
+    """
+    Build a Walker/Vose alias table so sampling from a discrete distribution is O(1)
+
+    Parameters:
+    -----------
+    probabilities : numpy.ndarray
+        (n,) probabilities that sum to 1
+
+    Returns:
+    --------
+    tuple
+        (accept, alias) arrays of length n for sample_alias
+    """
+    n = len(probabilities)
+    scaled = np.asarray(probabilities, dtype=float) * n
+    accept = np.ones(n)
+    alias = np.arange(n)
+
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+
+    while small and large:
+        less, more = small.pop(), large.pop()
+        accept[less] = scaled[less]
+        alias[less] = more
+
+        # The large entry gives away what the small one was missing
+        scaled[more] -= 1.0 - scaled[less]
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    return accept, alias
+
+
+def sample_alias(accept, alias, size, rng):
+    """
+    Draw samples from an alias table
+
+    Parameters:
+    -----------
+    accept : numpy.ndarray
+        Acceptance probabilities from build_alias_table
+    alias : numpy.ndarray
+        Alias indices from build_alias_table
+    size : int or tuple
+        Output shape
+    rng : numpy.random.Generator
+        Random generator
+
+    Returns:
+    --------
+    numpy.ndarray
+        Sampled indices
+    """
+    buckets = rng.integers(0, len(accept), size=size)
+    keep = rng.random(size) < accept[buckets]
+    return np.where(keep, buckets, alias[buckets])
+
+
+def build_training_examples(token_ids, sentence_ids, window, rng):
+    """
+    Build (center, context) pairs for every token within a random window
+    Like the original word2vec, each center uses a window shrunk to 1..window,
+    which weights near context words more than far ones
+
+    Parameters:
+    -----------
+    token_ids : numpy.ndarray
+        (n,) word ids of a chunk of the corpus
+    sentence_ids : numpy.ndarray
+        (n,) sentence number of each token, pairs never cross sentences
+    window : int
+        Maximum distance between center and context word
+    rng : numpy.random.Generator
+        Random generator
+
+    Returns:
+    --------
+    tuple
+        (positions, offsets) arrays: center index into token_ids and the context
+        offset from it (context index = positions + offsets)
+    """
+    n = len(token_ids)
+    reduced_window = rng.integers(1, window + 1, size=n)
+
+    positions = []
+    offsets = []
+    for offset in range(-window, window + 1):
+        if offset == 0 or abs(offset) >= n:
+            continue
+
+        centers = np.arange(max(0, -offset), min(n, n - offset))
+        valid = ((sentence_ids[centers] == sentence_ids[centers + offset])
+                 & (reduced_window[centers] >= abs(offset)))
+
+        positions.append(centers[valid])
+        offsets.append(np.full(int(valid.sum()), offset))
+
+    if not positions:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(positions), np.concatenate(offsets)
+
+
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _apply_updates(matrix, row_ids, updates):
+    """
+    Add per-example updates to matrix rows, averaging rows hit more than once
+    A frequent word can appear hundreds of times in one minibatch, and summing all
+    of those steps at once overshoots; averaging keeps large batches stable
+    """
+    unique_rows, inverse, occurrences = np.unique(row_ids, return_inverse=True, return_counts=True)
+    summed = np.zeros((len(unique_rows), matrix.shape[1]), dtype=matrix.dtype)
+    np.add.at(summed, inverse, updates)
+    matrix[unique_rows] += summed / occurrences[:, None].astype(matrix.dtype)
+
+
+class Word2Vec:
+    """
+    Word2Vec embeddings trained with negative sampling
+
+    Attributes:
+    -----------
+    vocabulary : list
+        Words in id order (most frequent first)
+    word_to_id : dict
+        Word to row id
+    counts : numpy.ndarray
+        (words,) corpus frequency of each word
+    input_vectors : numpy.ndarray
+        (words x vector_size) word embeddings (the ones you use)
+    output_vectors : numpy.ndarray
+        (words x vector_size) context embeddings used while training
+    keep_probability : numpy.ndarray or None
+        (words,) chance that a token of each word is kept by subsampling
+        (None when sample is 0)
+    """
+
+    def __init__(self, vector_size=100, window=5, negative=5, architecture="skipgram",
+                 learning_rate=0.025, min_learning_rate=0.0001, min_count=1,
+                 batch_size=256, chunk_tokens=100000, sample=0.0, seed=0):
+        if architecture not in ARCHITECTURES:
+            raise ValueError(f"Unknown architecture '{architecture}', expected one of {ARCHITECTURES}")
+
+        self.vector_size = vector_size
+        self.window = window
+        self.negative = negative
+        self.architecture = architecture
+        self.learning_rate = learning_rate
+        self.min_learning_rate = min_learning_rate
+        self.min_count = min_count
+        self.batch_size = batch_size
+        self.chunk_tokens = chunk_tokens
+        # Frequent-word subsampling threshold (1e-3 to 1e-5 for large corpora, 0 disables it)
+        self.sample = sample
+        self.rng = np.random.default_rng(seed)
+
+        self.vocabulary = []
+        self.word_to_id = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.input_vectors = np.zeros((0, vector_size), dtype=np.float32)
+        self.output_vectors = np.zeros((0, vector_size), dtype=np.float32)
+        self.keep_probability = None
+
+    # ===== VOCABULARY =====
+
+    def build_vocab(self, sentences):
+        """
+        Count words, drop the ones below min_count and initialize the vectors
+
+        Parameters:
+        -----------
+        sentences : iterable
+            Tokenized sentences, each a list of words
+        """
+        self.build_vocab_from_counts(Counter(word for sentence in sentences for word in sentence))
+
+    def build_vocab_from_counts(self, word_counts):
+        """
+        Build the vocabulary from precomputed word counts (e.g. from a streaming first pass)
+
+        Parameters:
+        -----------
+        word_counts : dict
+            Word to corpus frequency
+        """
+        kept = sorted((word for word, count in word_counts.items() if count >= self.min_count),
+                      key=lambda word: (-word_counts[word], word))
+
+        self.vocabulary = kept
+        self.word_to_id = {word: word_id for word_id, word in enumerate(kept)}
+        self.counts = np.array([word_counts[word] for word in kept], dtype=np.int64)
+
+        # Same initialization as the original word2vec: small random inputs, zero outputs
+        self.input_vectors = ((self.rng.random((len(kept), self.vector_size)) - 0.5)
+                              / self.vector_size).astype(np.float32)
+        self.output_vectors = np.zeros((len(kept), self.vector_size), dtype=np.float32)
+
+        # Negative samples follow the unigram distribution raised to 0.75
+        noise = self.counts ** 0.75
+        self._noise_accept, self._noise_alias = build_alias_table(noise / noise.sum())
+
+        # Subsampling as in the original word2vec: a word with corpus frequency f
+        # is kept with probability (sqrt(f / threshold) + 1) * threshold / f
+        self.keep_probability = None
+        if self.sample > 0 and len(kept):
+            threshold = self.sample * self.counts.sum()
+            self.keep_probability = np.minimum(
+                1.0, (np.sqrt(self.counts / threshold) + 1.0) * threshold / self.counts
+            )
+
+    # ===== TRAINING =====
+
+    def _iter_chunks(self, sentences):
+        """Yield (token_ids, sentence_ids) arrays of about chunk_tokens in-vocabulary tokens"""
+        token_ids = []
+        sentence_ids = []
+        for sentence_number, sentence in enumerate(sentences):
+            ids = [self.word_to_id[word] for word in sentence if word in self.word_to_id]
+            token_ids.extend(ids)
+            sentence_ids.extend([sentence_number] * len(ids))
+
+            if len(token_ids) >= self.chunk_tokens:
+                yield np.array(token_ids, dtype=np.intp), np.array(sentence_ids, dtype=np.intp)
+                token_ids = []
+                sentence_ids = []
+
+        if token_ids:
+            yield np.array(token_ids, dtype=np.intp), np.array(sentence_ids, dtype=np.intp)
+
+    def train(self, sentences, epochs=5):
+        """
+        Train the embeddings, building the vocabulary first if needed
+
+        Parameters:
+        -----------
+        sentences : list or re-iterable
+            Tokenized sentences (read once per epoch)
+        epochs : int
+            Passes over the corpus
+
+        Returns:
+        --------
+        Word2Vec
+            This model
+        """
+        if not self.vocabulary:
+            self.build_vocab(sentences)
+
+        return self.train_chunks(lambda: self._iter_chunks(sentences), epochs)
+
+    def train_chunks(self, chunk_source, epochs=5):
+        """
+        Train on a corpus that is already converted to word ids
+        (see word2vec_corpus.iter_token_stream)
+
+        Parameters:
+        -----------
+        chunk_source : callable
+            Returns a fresh iterator of (token_ids, sentence_ids) chunks, called once per epoch
+        epochs : int
+            Passes over the corpus
+
+        Returns:
+        --------
+        Word2Vec
+            This model
+        """
+        if not self.vocabulary:
+            return self
+
+        total_tokens = epochs * int(self.counts.sum())
+        processed_tokens = 0
+
+        for _ in range(epochs):
+            for token_ids, sentence_ids in chunk_source():
+                self.train_chunk(token_ids, sentence_ids, self.learning_rate_at(processed_tokens, total_tokens))
+                processed_tokens += len(token_ids)
+
+        return self
+
+    def learning_rate_at(self, processed_tokens, total_tokens):
+        """
+        Learning rate after processed_tokens of total_tokens
+        Falls linearly from learning_rate to min_learning_rate over the whole run
+
+        Parameters:
+        -----------
+        processed_tokens : int
+            Tokens trained on so far (across all workers when training in parallel)
+        total_tokens : int
+            Tokens in the whole run (corpus tokens x epochs)
+
+        Returns:
+        --------
+        float
+            Step size
+        """
+        progress = processed_tokens / max(1, total_tokens)
+        return max(self.min_learning_rate, self.learning_rate * (1.0 - progress))
+
+    def train_chunk(self, token_ids, sentence_ids, learning_rate):
+        """
+        Run minibatch updates over one chunk of the corpus
+
+        Parameters:
+        -----------
+        token_ids : numpy.ndarray
+            (n,) word ids
+        sentence_ids : numpy.ndarray
+            (n,) sentence number of each token
+        learning_rate : float
+            Step size for this chunk
+        """
+        if self.keep_probability is not None:
+            # Drawn again every epoch, so each pass sees a different subsample
+            kept = self.rng.random(len(token_ids)) < self.keep_probability[token_ids]
+            token_ids = token_ids[kept]
+            sentence_ids = sentence_ids[kept]
+
+        positions, offsets = build_training_examples(token_ids, sentence_ids, self.window, self.rng)
+        if len(positions) == 0:
+            return
+
+        if self.architecture == "skipgram":
+            order = self.rng.permutation(len(positions))
+            centers = token_ids[positions[order]]
+            contexts = token_ids[positions[order] + offsets[order]]
+
+            for start in range(0, len(centers), self.batch_size):
+                batch = slice(start, start + self.batch_size)
+                self._train_batch(centers[batch, None], contexts[batch], learning_rate)
+        else:
+            # CBOW: one example per center, its context words padded with -1
+            context_matrix = np.full((len(token_ids), 2 * self.window), -1, dtype=np.intp)
+            slots = offsets + self.window - (offsets > 0)
+            context_matrix[positions, slots] = token_ids[positions + offsets]
+
+            has_context = (context_matrix >= 0).any(axis=1)
+            targets = token_ids[has_context]
+            context_matrix = context_matrix[has_context]
+
+            order = self.rng.permutation(len(targets))
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                self._train_batch(context_matrix[batch], targets[batch], learning_rate)
+
+    def _train_batch(self, inputs, targets, learning_rate):
+        """
+        One negative-sampling step for a minibatch
+
+        Parameters:
+        -----------
+        inputs : numpy.ndarray
+            (batch x n) input word ids, -1 for padding; the hidden layer is their mean
+            (n = 1 for Skip-Gram, the context words for CBOW)
+        targets : numpy.ndarray
+            (batch,) word ids to predict
+        learning_rate : float
+            Step size
+        """
+        mask = inputs >= 0
+        n_inputs = mask.sum(axis=1, keepdims=True).astype(np.float32)
+        safe_inputs = np.where(mask, inputs, 0)
+
+        hidden = (self.input_vectors[safe_inputs] * mask[..., None]).sum(axis=1) / n_inputs
+
+        # Column 0 is the true target, the rest are negative samples
+        negatives = sample_alias(self._noise_accept, self._noise_alias, (len(targets), self.negative), self.rng)
+        outputs = np.concatenate([targets[:, None], negatives], axis=1)
+        labels = np.zeros(outputs.shape, dtype=np.float32)
+        labels[:, 0] = 1.0
+
+        output_vectors = self.output_vectors[outputs]
+        scores = np.einsum("bd,bkd->bk", hidden, output_vectors)
+        gradient = (labels - _sigmoid(scores)) * learning_rate
+
+        hidden_gradient = np.einsum("bk,bkd->bd", gradient, output_vectors)
+        _apply_updates(self.output_vectors, outputs.ravel(),
+                       (gradient[..., None] * hidden[:, None, :]).reshape(-1, self.vector_size))
+
+        # Every input word that fed the mean gets its share of the hidden-layer gradient
+        input_gradient = np.broadcast_to((hidden_gradient / n_inputs)[:, None, :], mask.shape + (self.vector_size,))
+        _apply_updates(self.input_vectors, inputs[mask], input_gradient[mask])
+
+    # ===== LOOKUP =====
+
+    def __contains__(self, word):
+        return word in self.word_to_id
+
+    def __getitem__(self, word):
+        return self.input_vectors[self.word_to_id[word]]
+
+    def word_vectors(self):
+        """
+        Snapshot of the trained embeddings as a similarity/analogy query service
+
+        Returns:
+        --------
+        WordVectors
+            Query service over the input vectors
+        """
+        return WordVectors(self.vocabulary, self.input_vectors)
+
+    def most_similar(self, word, topn=10):
+        """
+        Find the words whose vectors have the highest cosine similarity to a word
+
+        Parameters:
+        -----------
+        word : str
+            Query word (must be in the vocabulary)
+        topn : int
+            Number of neighbours to return
+
+        Returns:
+        --------
+        list
+            [(word, similarity), ...] best first, the query word excluded
+        """
+        return self.word_vectors().most_similar(word, topn=topn)
@@ -0,0 +1,230 @@
+"""
+Streaming Corpus Pipeline for Word2Vec
+Counts the vocabulary in one pass, writes the corpus once as an int32 word-id stream,
+then every training epoch reads that compact stream instead of re-tokenizing text
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from corpus_loader import _open_text
+from word2vec import Word2Vec
+
+# Marks the end of a sentence in a token stream (word ids are never negative)
+SENTENCE_END = -1
+STREAM_DTYPE = np.dtype("<i4")
+
+
+def read_text_sentences(path, lowercase=True):
+    """
+    Read plain text, one sentence per line, as lists of words
+
+    Parameters:
+    -----------
+    path : str
+        Text file path (.gz files are decompressed on the fly)
+    lowercase : bool
+        Lowercase every line before splitting
+
+    Yields:
+    -------
+    list
+        Words of the next non-empty line
+    """
+    with _open_text(path) as corpus:
+        for line in corpus:
+            if lowercase:
+                line = line.lower()
+            words = line.split()
+            if words:
+                yield words
+
+
+def count_vocabulary(sentences, min_count=1, max_vocab_size=10000000):
+    """
+    Count word frequencies with bounded memory (first pass)
+
+    Whenever the table grows past max_vocab_size, words seen at most
+    prune_at times are dropped and prune_at goes up by one, as in the
+    original word2vec. Rare words may lose a few early counts, frequent
+    words are counted exactly.
+
+    Parameters:
+    -----------
+    sentences : iterable
+        Tokenized sentences, each a list of words
+    min_count : int
+        Drop words seen fewer times than this at the end
+    max_vocab_size : int
+        Most distinct words held in memory at once
+
+    Returns:
+    --------
+    dict
+        Word to frequency
+    """
+    word_counts = {}
+    prune_at = 1
+
+    for sentence in sentences:
+        for word in sentence:
+            word_counts[word] = word_counts.get(word, 0) + 1
+
+        if len(word_counts) > max_vocab_size:
+            word_counts = {word: count for word, count in word_counts.items() if count > prune_at}
+            prune_at += 1
+
+    return {word: count for word, count in word_counts.items() if count >= min_count}
+
+
+def write_token_stream(sentences, word_to_id, path, buffer_tokens=1000000):
+    """
+    Convert tokenized sentences into an int32 word-id stream on disk (second pass)
+    Out-of-vocabulary words are dropped and every sentence ends with SENTENCE_END
+
+    Parameters:
+    -----------
+    sentences : iterable
+        Tokenized sentences, each a list of words
+    word_to_id : dict
+        Word to id, e.g. Word2Vec.word_to_id
+    path : str
+        Output file path
+    buffer_tokens : int
+        Ids collected in memory before each write
+
+    Returns:
+    --------
+    int
+        Number of word ids written (separators not included)
+    """
+    buffer = []
+    written = 0
+
+    with open(path, "wb") as stream:
+        for sentence in sentences:
+            ids = [word_to_id[word] for word in sentence if word in word_to_id]
+            written += len(ids)
+            buffer.extend(ids)
+            buffer.append(SENTENCE_END)
+
+            if len(buffer) >= buffer_tokens:
+                np.asarray(buffer, dtype=STREAM_DTYPE).tofile(stream)
+                buffer = []
+
+        if buffer:
+            np.asarray(buffer, dtype=STREAM_DTYPE).tofile(stream)
+
+    return written
+
+
+def iter_token_stream(path, chunk_tokens=100000):
+    """
+    Read a token stream back in chunks that end on sentence boundaries
+    The file is memory-mapped, so only the current chunk is materialized
+
+    Parameters:
+    -----------
+    path : str
+        Stream written by write_token_stream
+    chunk_tokens : int
+        Target chunk size (a single longer sentence makes a longer chunk)
+
+    Yields:
+    -------
+    tuple
+        (token_ids, sentence_ids) arrays, as expected by Word2Vec.train_chunk
+    """
+    if os.path.getsize(path) == 0:
+        return
+
+    stream = np.memmap(path, dtype=STREAM_DTYPE, mode="r")
+    start = 0
+
+    while start < len(stream):
+        stop = min(start + chunk_tokens, len(stream))
+        if stop < len(stream):
+            # Cut after the last complete sentence, or at the first one that ends later
+            ends = np.flatnonzero(stream[start:stop] == SENTENCE_END)
+            if len(ends):
+                stop = start + int(ends[-1]) + 1
+            else:
+                following = np.flatnonzero(stream[stop:] == SENTENCE_END)
+                stop = stop + int(following[0]) + 1 if len(following) else len(stream)
+
+        chunk = np.asarray(stream[start:stop])
+        is_end = chunk == SENTENCE_END
+        yield chunk[~is_end].astype(np.intp), np.cumsum(is_end)[~is_end]
+        start = stop
+
+
+def prepare_token_stream(text_path, stream_path, model, max_vocab_size=10000000, lowercase=True):
+    """
+    Run both preprocessing passes over a text corpus
+    Pass one builds the model vocabulary (min_count and subsampling come from the model),
+    pass two writes the token stream
+
+    Parameters:
+    -----------
+    text_path : str
+        Text corpus, one sentence per line
+    stream_path : str
+        Token stream output path
+    model : Word2Vec
+        Model whose vocabulary is built from the corpus
+    max_vocab_size : int
+        Memory bound for the first pass (see count_vocabulary)
+    lowercase : bool
+        Lowercase the text
+
+    Returns:
+    --------
+    int
+        Number of word ids in the stream
+    """
+    word_counts = count_vocabulary(read_text_sentences(text_path, lowercase),
+                                   min_count=model.min_count, max_vocab_size=max_vocab_size)
+    model.build_vocab_from_counts(word_counts)
+    return write_token_stream(read_text_sentences(text_path, lowercase), model.word_to_id, stream_path)
+
+
+def train_from_text(text_path, model=None, epochs=5, stream_path=None, **kwargs):
+    """
+    Train Word2Vec on a text file through a token stream
+
+    Parameters:
+    -----------
+    text_path : str
+        Text corpus, one sentence per line
+    model : Word2Vec, optional
+        Model to train (a default one if not given)
+    epochs : int
+        Passes over the corpus
+    stream_path : str, optional
+        Where to keep the token stream; a temporary file (deleted afterwards) if not given
+    **kwargs
+        Extra options for prepare_token_stream (max_vocab_size, lowercase)
+
+    Returns:
+    --------
+    Word2Vec
+        Trained model
+    """
+    if model is None:
+        model = Word2Vec()
+
+    temporary = stream_path is None
+    if temporary:
+        handle, stream_path = tempfile.mkstemp(suffix=".tokens")
+        os.close(handle)
+
+    try:
+        prepare_token_stream(text_path, stream_path, model, **kwargs)
+        model.train_chunks(lambda: iter_token_stream(stream_path, model.chunk_tokens), epochs)
+    finally:
+        if temporary:
+            os.remove(stream_path)
+
+    return model
@@ -0,0 +1,337 @@
+"""
+Word Vector Queries
+Similarity and analogy search over an embedding matrix, exact or through an IVF index
+"""
+
+import numpy as np
+
+
+# ===== WORD2VEC FILE FORMAT =====
+
+def load_word2vec_format(path, binary=False, limit=None):
+    """
+    Read embeddings in the original word2vec text or binary format
+    Both start with a "<words> <dimensions>" header line
+
+    Parameters:
+    -----------
+    path : str
+        Embedding file path
+    binary : bool
+        True for the binary format (word, a space, then float32 values)
+    limit : int, optional
+        Read only the first limit words (files are usually sorted by frequency)
+
+    Returns:
+    --------
+    tuple
+        (vocabulary list, (words x dimensions) float32 matrix)
+    """
+    with open(path, "rb") as embedding_file:
+        n_words, n_dims = (int(value) for value in embedding_file.readline().split())
+        if limit is not None:
+            n_words = min(n_words, limit)
+
+        vocabulary = []
+        vectors = np.zeros((n_words, n_dims), dtype=np.float32)
+        row_bytes = 4 * n_dims
+
+        for row in range(n_words):
+            if binary:
+                word = bytearray()
+                while True:
+                    char = embedding_file.read(1)
+                    if char == b" " or not char:
+                        break
+                    # Some writers end each vector with a newline, which belongs to no word
+                    if char != b"\n":
+                        word.extend(char)
+                vocabulary.append(word.decode("utf-8", errors="replace"))
+                vectors[row] = np.frombuffer(embedding_file.read(row_bytes), dtype="<f4")
+            else:
+                parts = embedding_file.readline().decode("utf-8", errors="replace").rstrip().split(" ")
+                vocabulary.append(parts[0])
+                vectors[row] = np.asarray(parts[1:n_dims + 1], dtype=np.float32)
+
+    return vocabulary, vectors
+
+
+def save_word2vec_format(path, vocabulary, vectors, binary=False):
+    """
+    Write embeddings in the original word2vec text or binary format
+
+    Parameters:
+    -----------
+    path : str
+        Output file path
+    vocabulary : list
+        Words in row order
+    vectors : numpy.ndarray
+        (words x dimensions) matrix
+    binary : bool
+        Write the binary format instead of text
+    """
+    vectors = np.asarray(vectors, dtype="<f4")
+
+    with open(path, "wb") as embedding_file:
+        embedding_file.write(f"{len(vocabulary)} {vectors.shape[1]}\n".encode("utf-8"))
+        for word, vector in zip(vocabulary, vectors):
+            if binary:
+                embedding_file.write(word.encode("utf-8") + b" " + vector.tobytes() + b"\n")
+            else:
+                values = " ".join(f"{value:.6f}" for value in vector)
+                embedding_file.write(f"{word} {values}\n".encode("utf-8"))
+
+
+# ===== SEARCH HELPERS =====
+
+def normalize_rows(vectors):
+    """
+    Scale every row to unit length (zero rows stay zero)
+
+    Parameters:
+    -----------
+    vectors : numpy.ndarray
+        (n x dimensions) matrix
+
+    Returns:
+    --------
+    numpy.ndarray
+        float32 matrix whose dot products are cosine similarities
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def top_k(scores, topn, exclude=()):
+    """
+    Indices of the topn highest scores, best first, in O(n) with argpartition
+
+    Parameters:
+    -----------
+    scores : numpy.ndarray
+        (n,) scores
+    topn : int
+        Number of results
+    exclude : iterable
+        Indices that must not be returned (e.g. the query words)
+
+    Returns:
+    --------
+    numpy.ndarray
+        Indices of the best scores
+    """
+    exclude = np.unique(np.asarray(exclude, dtype=np.intp))
+    scores = np.array(scores, dtype=np.float32)
+    scores[exclude] = -np.inf
+
+    topn = min(topn, len(scores) - len(exclude))
+    if topn <= 0:
+        return np.zeros(0, dtype=np.intp)
+
+    best = np.argpartition(-scores, topn - 1)[:topn]
+    return best[np.argsort(-scores[best])]
+
+
+class IVFIndex:
+    """
+    Inverted-file index for approximate cosine search
+
+    Vectors are clustered with spherical k-means; a query only scores the
+    vectors in its n_probe closest clusters, which is a small fraction of
+    the vocabulary, so top-k stays fast as the vocabulary grows.
+    """
+
+    def __init__(self, normalized_vectors, n_lists=None, n_iterations=10, sample_size=50000, seed=0):
+        """
+        Build the index
+
+        Parameters:
+        -----------
+        normalized_vectors : numpy.ndarray
+            (n x dimensions) unit-length rows (see normalize_rows)
+        n_lists : int, optional
+            Number of clusters (default: about sqrt(n))
+        n_iterations : int
+            k-means iterations
+        sample_size : int
+            Vectors used to fit the centroids (all vectors are assigned afterwards)
+        seed : int
+            Random seed
+        """
+        rng = np.random.default_rng(seed)
+        n_vectors = len(normalized_vectors)
+        n_lists = min(n_vectors, n_lists or max(1, int(np.sqrt(n_vectors))))
+
+        self.vectors = normalized_vectors
+
+        sample = normalized_vectors[rng.choice(n_vectors, size=min(sample_size, n_vectors), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+        for _ in range(n_iterations):
+            assignments = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+
+            # Empty clusters keep their old centroid
+            filled = np.bincount(assignments, minlength=n_lists) > 0
+            centroids[filled] = normalize_rows(sums[filled])
+
+        self.centroids = centroids
+
+        # Assign every vector in chunks so the (chunk x lists) score matrix stays small
+        assignments = np.concatenate([
+            (normalized_vectors[start:start + 65536] @ centroids.T).argmax(axis=1)
+            for start in range(0, n_vectors, 65536)
+        ])
+
+        # Vector ids grouped by cluster: list i is order[offsets[i]:offsets[i + 1]]
+        self.order = np.argsort(assignments, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+
+    def search(self, query, topn=10, n_probe=8, exclude=()):
+        """
+        Approximate top-k cosine search
+
+        Parameters:
+        -----------
+        query : numpy.ndarray
+            (dimensions,) unit-length query
+        topn : int
+            Number of results
+        n_probe : int
+            Clusters to scan; more is slower but closer to exact search
+        exclude : iterable
+            Vector ids that must not be returned
+
+        Returns:
+        --------
+        tuple
+            (ids, similarities) best first
+        """
+        closest_lists = top_k(self.centroids @ query, n_probe)
+        candidates = np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in closest_lists])
+
+        scores = self.vectors[candidates] @ query
+        best = top_k(scores, topn, np.flatnonzero(np.isin(candidates, list(exclude))))
+        return candidates[best], scores[best]
+
+
+class WordVectors:
+    """
+    Similarity and analogy queries over a word embedding matrix
+
+    Attributes:
+    -----------
+    vocabulary : list
+        Words in row order
+    word_to_id : dict
+        Word to row id
+    normalized : numpy.ndarray
+        (words x dimensions) unit-length vectors, so one matrix-vector
+        product gives the cosine similarity to every word
+    index : IVFIndex or None
+        Approximate index, once build_index has been called
+    """
+
+    def __init__(self, vocabulary, vectors):
+        self.vocabulary = list(vocabulary)
+        self.word_to_id = {word: word_id for word_id, word in enumerate(self.vocabulary)}
+        self.normalized = normalize_rows(vectors)
+        self.index = None
+
+    @classmethod
+    def load(cls, path, binary=False, limit=None):
+        """
+        Load a word2vec text or binary file (see load_word2vec_format)
+
+        Returns:
+        --------
+        WordVectors
+            Query service over the file's vectors
+        """
+        return cls(*load_word2vec_format(path, binary=binary, limit=limit))
+
+    def __contains__(self, word):
+        return word in self.word_to_id
+
+    def build_index(self, **options):
+        """
+        Build the approximate IVF index used by queries with approximate=True
+
+        Parameters:
+        -----------
+        **options
+            IVFIndex options (n_lists, n_iterations, sample_size, seed)
+        """
+        self.index = IVFIndex(self.normalized, **options)
+        return self.index
+
+    def most_similar(self, positive=(), negative=(), topn=10, approximate=False, n_probe=8):
+        """
+        Find the words closest to the sum of positive minus negative word vectors
+        most_similar(positive=["king", "woman"], negative=["man"]) answers
+        "king - man + woman = ?"
+
+        Parameters:
+        -----------
+        positive : str or list
+            Words added to the query
+        negative : list
+            Words subtracted from the query
+        topn : int
+            Number of results
+        approximate : bool
+            Search the IVF index (build_index) instead of every word
+        n_probe : int
+            Clusters scanned when approximate
+
+        Returns:
+        --------
+        list
+            [(word, cosine similarity), ...] best first, query words excluded
+        """
+        if isinstance(positive, str):
+            positive = [positive]
+
+        missing = [word for word in list(positive) + list(negative) if word not in self.word_to_id]
+        if missing:
+            raise KeyError(f"Words not in vocabulary: {missing}")
+
+        query_ids = [self.word_to_id[word] for word in list(positive) + list(negative)]
+        query = (self.normalized[[self.word_to_id[word] for word in positive]].sum(axis=0)
+                 - self.normalized[[self.word_to_id[word] for word in negative]].sum(axis=0))
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        if approximate:
+            if self.index is None:
+                self.build_index()
+            ids, scores = self.index.search(query, topn, n_probe=n_probe, exclude=query_ids)
+        else:
+            scores = self.normalized @ query
+            ids = top_k(scores, topn, query_ids)
+            scores = scores[ids]
+
+        return [(self.vocabulary[word_id], float(score)) for word_id, score in zip(ids, scores)]
+
+    def analogy(self, a, b, c, topn=1, **options):
+        """
+        Answer "a is to b as c is to ?", i.e. b - a + c
+        analogy("man", "king", "woman") should give "queen"
+
+        Parameters:
+        -----------
+        a, b, c : str
+            Query words
+        topn : int
+            Number of results
+        **options
+            Passed to most_similar (approximate, n_probe)
+
+        Returns:
+        --------
+        list
+            [(word, cosine similarity), ...] best first
+        """
+        return self.most_similar(positive=[b, c], negative=[a], topn=topn, **options)